@@ -2,113 +2,198 @@ import asyncio
 import logging
 
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, List
 
-from app.commands import hash_map_commands, list_commands, set_commands, sorted_set_commands, stream_commands, string_commands, commands
+from app import ShardRouter
+from app.commands import commands, registry, transaction_commands
 import app.utils.encoding_utils as encoding_utils
+from app.utils import clock, eviction, keyspace
+from app.utils.logging_utils import protocol_logger
 if TYPE_CHECKING:
     from .AsyncServer import AsyncServer
 
+READ_BUFFER_SIZE = 65536
+UNKNOWN_COMMAND = commands.UnknownCommand()
+CROSSSLOT_RESPONSE = b"-CROSSSLOT Keys in request don't hash to the same worker\r\n"
+# A transaction run on another worker could leave that worker's channel on a database it does not know of
+SELECT_IN_MULTI_RESPONSE = b"-ERR SELECT inside MULTI is not supported with --workers\r\n"
+# Handled by their own commands even while a transaction is queueing
+TRANSACTION_COMMANDS = frozenset(("MULTI", "EXEC", "DISCARD"))
+
+def arity_error(cmd_name: str) -> bytes:
+    return f"-ERR wrong number of arguments for '{cmd_name.lower()}' command\r\n".encode()
+
 class AsyncRequestHandler:
     def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, server: 'AsyncServer'):
         self.reader = reader
         self.writer = writer
         self.server = server
-        self.memory = server.memory
-        self.expiration = server.expiration
+        self.lazyfree = server.lazyfree
+        self.select(0)
+        self.stats = server.stats
         self.replica_server = server.replica_server
         self.replica_port = server.replica_port
         self.offset = 0
-        self.command_map = {
-            "PING": commands.PingCommand(),
-            "ECHO": commands.EchoCommand(),
-            "SET": string_commands.SetCommand(),
-            "GET": string_commands.GetCommand(),
-            "INFO": commands.InfoCommand(),
-            "REPLCONF": commands.ReplConfCommand(),
-            "PSYNC": commands.PSyncCommand(),
-            "WAIT": commands.WaitCommand(),
-            "CONFIG": commands.ConfigCommand(),
-            "KEYS": commands.KeysCommand(),
-            "TYPE": commands.TypeCommand(),
-            "XADD": stream_commands.XAddCommand(),
-            "XRANGE": stream_commands.XRangeCommand(),
-            "XREAD": stream_commands.XReadCommand(),
-            "LPUSH": list_commands.LPushCommand(),
-            "RPUSH": list_commands.RPushCommand(),
-            "LPOP": list_commands.LPopCommand(),
-            "RPOP": list_commands.RPopCommand(),
-            "LLEN": list_commands.LLenCommand(),
-            "LINDEX": list_commands.LIndexCommand(),
-            "LINSERT": list_commands.LInsertCommand(),
-            "LPUSHX": list_commands.LPushXCommand(),
-            "RPUSHX": list_commands.RPushXCommand(),
-            "LRANGE": list_commands.LRangeCommand(),
-            "LSET": list_commands.LSetCommand(),
-            "DEL": commands.DelCommand(),
-            "SADD": set_commands.SAddCommand(),
-            "SCARD": set_commands.SCardCommand(),
-            "SISMEMBER": set_commands.SIsMemberCommand(),
-            "SMEMBERS": set_commands.SMembersCommand(),
-            "SREM": set_commands.SRemCommand(),
-            "SPOP": set_commands.SPopCommand(),
-            "SUNION": set_commands.SUnionCommand(),
-            "SINTER": set_commands.SInterCommand(),
-            "SDIFF": set_commands.SDiffCommand(),
-            "SMOVE": set_commands.SMoveCommand(),
-            "MSET": string_commands.MSetCommand(),
-            "MGET": string_commands.MGetCommand(),
-            "INCR": string_commands.IncrCommand(),
-            "DECR": string_commands.DecrCommand(),
-            "INCRBY": string_commands.IncrByCommand(),
-            "DECRBY": string_commands.DecrByCommand(),
-            "APPEND": string_commands.AppendCommand(),
-            "HSET": hash_map_commands.HSetCommand(),
-            "HGET": hash_map_commands.HGetCommand(),
-            "HGETALL": hash_map_commands.HGetAllCommand(),
-            "ZADD": sorted_set_commands.ZAddCommand(),
-            "ZREM": sorted_set_commands.ZRemCommand(),
-            "ZRANGE": sorted_set_commands.ZRangeCommand(),
-            "ZRANGEBYSCORE": sorted_set_commands.ZRangeByScoreCommand(),
-            "ZRANK": sorted_set_commands.ZRankCommand(),
-            "ZREVRANK": sorted_set_commands.ZRevRankCommand(),
-            "ZSCORE": sorted_set_commands.ZScoreCommand(),
-            "ZCARD": sorted_set_commands.ZCardCommand(),
-            "ZCOUNT": sorted_set_commands.ZCountCommand(),
-        }
+        # RESP version negotiated with HELLO; replies use RESP3 types only once the client asks for 3
+        self.protocol = 2
+        self.client_name = None
+        # Set in --workers mode; commands for keys owned by another worker are forwarded there
+        self.router = server.router
+        self.has_forwarded = False
+        # Commands queued between MULTI and EXEC, or None outside a transaction
+        self.transaction = None
+        self.transaction_failed = False
+        self.transaction_worker = None
+        peername = writer.get_extra_info("peername")
+        # Unix socket and socketpair peers have no (host, port) address and are never the master link
+        self.is_master_link = self.replica_server is not None and isinstance(peername, tuple) and peername[1] == self.replica_port
+        self.parser = encoding_utils.RespParser(decode=not server.bytes_mode, inline=not self.is_master_link)
+        self.write_high_water = writer.transport.get_write_buffer_limits()[1]
+
+    def select(self, index: int) -> None:
+        # Commands read the selected database's dicts straight off the handler
+        self.db_index = index
+        db = self.server.databases[index]
+        self.memory = db.memory
+        self.expiration = db.expiration
+        self.streamstore = db.streamstore
+        self.key_meta = db.key_meta
 
     async def process_request(self) -> None:
         while True:
-            request = await self.reader.read(1024)
+            request = await self.reader.read(READ_BUFFER_SIZE)
             if not request:
                 break
-            logging.info(f"Request: {request}")
-            await self.handle_request(request)
+            try:
+                await self.handle_request(request)
+            except encoding_utils.ProtocolError as e:
+                protocol_logger.warning("Protocol error from %s: %s", self.writer.get_extra_info("peername"), e)
+                self.writer.write(f"-ERR Protocol error: {e}\r\n".encode())
+                await self.writer.drain()
+                self.writer.close()
+                break
 
     async def handle_request(self, request: bytes) -> None:
-        command_list, lengths = encoding_utils.parse_redis_protocol(request)
+        command_list, lengths = self.parser.feed(request)
         
         if not command_list:
-            logging.info("Received invalid data")
             return
 
+        # Every TTL check in this batch reads the time cached here
+        clock.tick()
+
+        # Checked once per batch so per-command tracing costs a single branch when it is off
+        trace = protocol_logger.isEnabledFor(logging.DEBUG)
+        if trace:
+            protocol_logger.debug("Request from %s: %d commands, %d bytes", self.writer.get_extra_info("peername"), len(command_list), len(request))
+
+        responses = []
         for index, cmd in enumerate(command_list):
-            cmd_name = cmd[0].upper()  # Command names are case-insensitive
-            command_class = self.command_map.get(cmd_name, commands.UnknownCommand())
+            cmd_name = encoding_utils.as_str(cmd[0]).upper()  # Command names are case-insensitive
+            spec = registry.lookup(cmd_name)
 
-            if cmd_name in self.command_map:
-                response = await command_class.execute(self, cmd)
+            if self.transaction is not None and cmd_name not in TRANSACTION_COMMANDS:
+                response = self.queue_command(spec, cmd, cmd_name)
+            elif spec is None:
+                response = UNKNOWN_COMMAND.execute_sync(self, cmd)
+            elif not spec.check_arity(len(cmd)):
+                response = arity_error(cmd_name)
+            elif self.router is not None and (target := self.router.target(spec.get_keys(cmd), spec.all_shards)) != self.router.worker_id:
+                if spec.is_async:
+                    await self.flush(responses)
+                    responses = []
+                response = await self.forward(spec, cmd, target)
+            elif spec.is_async:
+                # Send what the batch has produced so far before a command that may block
+                await self.flush(responses)
+                responses = []
+                response = await spec.command.execute(self, cmd)
+            elif spec.is_write:
+                response = self.execute_write(spec, cmd)
             else:
-                response = await commands.UnknownCommand.execute(self, cmd)
+                response = spec.command.execute_sync(self, cmd)
 
-            if self.replica_server is not None and self.writer.get_extra_info("peername")[1] == self.replica_port:
-                if response.startswith("*3\r\n$8\r\nREPLCONF\r\n$3\r\nACK"):
-                    self.writer.write(response.encode())
-                    await self.writer.drain()
+            if self.is_master_link:
+                if response and response.startswith(b"*3\r\n$8\r\nREPLCONF\r\n$3\r\nACK"):
+                    responses.append(response)
                 self.offset += lengths[index]
             else:
                 if response:
-                    print(f"sending response: {response} to {self.writer.get_extra_info('peername')} command: {cmd}")
-                    self.writer.write(response.encode())
-                    await self.writer.drain()
-                self.offset += lengths[index]
\ No newline at end of file
+                    if trace:
+                        protocol_logger.debug("Command %r -> %r", cmd, response)
+                    responses.append(response)
+                self.offset += lengths[index]
+        await self.flush(responses)
+
+    def execute_write(self, spec: 'registry.CommandSpec', cmd: List[str]) -> bytes:
+        # Writes that can grow the dataset make room under maxmemory first; replicas leave eviction to their master
+        if spec.denyoom and not self.is_master_link and not self.server.evictor.make_room():
+            return eviction.OOM_RESPONSE
+        response = spec.command.execute_sync(self, cmd)
+        keyspace.record_writes(self, spec.get_keys(cmd))
+        return response
+
+    def begin_transaction(self) -> None:
+        self.transaction = []
+        self.transaction_failed = False
+        self.transaction_worker = None
+
+    def end_transaction(self) -> None:
+        self.transaction = None
+        self.transaction_failed = False
+        self.transaction_worker = None
+
+    def queue_command(self, spec: 'registry.CommandSpec', cmd: List[str], cmd_name: str) -> bytes:
+        # Commands are checked as they are queued; any error makes the EXEC that follows fail
+        if spec is None:
+            response = UNKNOWN_COMMAND.execute_sync(self, cmd)
+        elif not spec.check_arity(len(cmd)):
+            response = arity_error(cmd_name)
+        elif self.router is not None and (response := self.route_transaction(spec, cmd)):
+            pass
+        else:
+            self.transaction.append((spec, cmd))
+            return transaction_commands.QUEUED
+        self.transaction_failed = True
+        return response
+
+    def route_transaction(self, spec: 'registry.CommandSpec', cmd: List[str]) -> bytes|None:
+        # All keys in a transaction must belong to one worker, which then runs all of it
+        if spec.all_shards:
+            return CROSSSLOT_RESPONSE
+        if encoding_utils.as_str(cmd[0]).upper() == "SELECT":
+            return SELECT_IN_MULTI_RESPONSE
+        keys = spec.get_keys(cmd)
+        if not keys:
+            return None
+        target = self.router.target(keys)
+        if target == ShardRouter.CROSS_WORKER or (self.transaction_worker is not None and target != self.transaction_worker):
+            return CROSSSLOT_RESPONSE
+        self.transaction_worker = target
+        return None
+
+    async def forward(self, spec: 'registry.CommandSpec', cmd: List[str], target: int) -> bytes|asyncio.Future:
+        if target == ShardRouter.CROSS_WORKER:
+            return CROSSSLOT_RESPONSE
+        if target == ShardRouter.ALL_WORKERS:
+            local = await spec.command.execute(self, cmd)
+            return ShardRouter.merge_array_replies([local] + await self.router.broadcast(cmd, self.protocol, self.db_index))
+        if spec.is_async:
+            return await self.router.forward_blocking(target, cmd, self.protocol, self.db_index)
+        return self.forward_nowait(target, cmd)
+
+    def forward_nowait(self, target: int, cmd: List[str]) -> asyncio.Future:
+        # The reply is collected when the batch is flushed, keeping it in order with the local ones
+        self.has_forwarded = True
+        return self.router.forward_nowait(target, cmd, self.protocol, self.db_index)
+
+    async def flush(self, responses: List[bytes]) -> None:
+        # One write per pipeline batch; only wait for the peer when the transport is over its high-water mark
+        if not responses:
+            return
+        if self.has_forwarded:
+            responses = [response if isinstance(response, bytes) else await response for response in responses]
+            self.has_forwarded = False
+        self.writer.write(responses[0] if len(responses) == 1 else b"".join(responses))
+        if self.writer.transport.get_write_buffer_size() > self.write_high_water:
+            await self.writer.drain()
@@ -1,32 +1,68 @@
 import asyncio
-import logging
+import os
+import stat
 from pathlib import Path
-from typing import List
+from typing import TYPE_CHECKING, Dict, List, Tuple
 
 from app.AsyncHandler import AsyncRequestHandler
+from app.utils.eviction import Evictor
+from app.utils import keyspace
+from app.utils.keyspace import Database, KeyspaceStats
+from app.utils.lazyfree import LAZYFREE_THRESHOLD, LazyFreer
+from app.utils.scan_utils import SnapshotCursors
+from app.utils.expiry_utils import ActiveExpirer
+from app.utils.logging_utils import persistence_logger, replication_logger, server_logger
 from app.utils.rdb_parser import parse_redis_file
 
+if TYPE_CHECKING:
+    from app.ShardRouter import ShardRouter
+
+# Background housekeeping runs this many times a second
+SERVER_CRON_HZ = 10
+DEFAULT_DATABASES = 16
+
 
 class AsyncServer:
-    def __init__(self, host: str = "127.0.0.1", port: int = 6379, replica_server: str = None, replica_port: int = None, dir: str = '', dbfilename: str = ''):
+    def __init__(self, host: str = "127.0.0.1", port: int = 6379, replica_server: str = None, replica_port: int = None, dir: str = '', dbfilename: str = '', bytes_mode: bool = False, router: 'ShardRouter' = None, unixsocket: str = None, maxmemory: int = 0, maxmemory_policy: str = "noeviction", lazyfree_threshold: int = LAZYFREE_THRESHOLD, keys_index: bool = False, databases: int = DEFAULT_DATABASES):
         self.host = host
         self.port = port
         self.replica_server = replica_server
         self.replica_port = replica_port
-        self.memory = {}
-        self.expiration = {}
-        self.streamstore = {}
+        self.lazyfree = LazyFreer(lazyfree_threshold)
+        self.scan_cursors = SnapshotCursors()
+        self.stats = KeyspaceStats()
+        # Connections select one of these with SELECT; each starts on database 0
+        self.databases = [Database(index, self.stats, self.lazyfree, keys_index) for index in range(databases)]
+        self.clients = set()
+        self.peak_memory = 0
         self.writers = []
+        # The database the replication stream last selected, or -1 to select one before the next write
+        self.replication_db = -1
         self.inner_server = None
         self.numacks = 0
-        self.config = {"dir": dir, "dbfilename": dbfilename}
+        self.config = {"dir": dir, "dbfilename": dbfilename, "maxmemory": str(maxmemory), "maxmemory-policy": maxmemory_policy, "lazyfree-threshold": str(lazyfree_threshold), "databases": str(databases)}
+        # When set, keys and values are stored as the raw bytes received instead of decoded str
+        self.bytes_mode = bytes_mode
+        self.router = router
+        # Port 0 disables the TCP listener, leaving only the unix socket
+        self.unixsocket = unixsocket
+        self.servers = []
+        self.expirer = ActiveExpirer(self, time_budget=0.25 / SERVER_CRON_HZ)
+        self.cron_task = None
+        self.evictor = Evictor(self, maxmemory, maxmemory_policy)
 
     @classmethod
-    async def create(cls, host: str = "127.0.0.1", port: int = 6379, replica_server: str = None, replica_port: int = None, dir: str = '', dbfilename: str = ''):
-        instance = cls(host, port, replica_server, replica_port, dir, dbfilename)
+    async def create(cls, host: str = "127.0.0.1", port: int = 6379, replica_server: str = None, replica_port: int = None, dir: str = '', dbfilename: str = '', bytes_mode: bool = False, router: 'ShardRouter' = None, unixsocket: str = None, maxmemory: int = 0, maxmemory_policy: str = "noeviction", lazyfree_threshold: int = LAZYFREE_THRESHOLD, keys_index: bool = False, databases: int = DEFAULT_DATABASES):
+        instance = cls(host, port, replica_server, replica_port, dir, dbfilename, bytes_mode, router, unixsocket, maxmemory, maxmemory_policy, lazyfree_threshold, keys_index, databases)
         if(dir and dbfilename):
-            instance.memory, instance.expiration = parse_redis_file(Path(dir) / dbfilename)
-        instance.inner_server = await instance.start()
+            instance.load_databases(parse_redis_file(Path(dir) / dbfilename, decode=not bytes_mode))
+        if router is not None:
+            await router.start(instance)
+        if port:
+            instance.servers.append(await instance.start())
+        if unixsocket:
+            instance.servers.append(await instance.start_unix())
+        instance.inner_server = instance.servers[0]
         
         if replica_server is not None and replica_port is not None:
             reader, writer = await asyncio.open_connection(replica_server, replica_port)
@@ -38,17 +74,55 @@ class AsyncServer:
             await instance.send_replconf_command(reader, writer, port)
             await instance.send_additional_replconf_command(reader, writer)
             await instance.send_psync_command(reader, writer)
+            replication_logger.info("Replicating from %s:%d", replica_server, replica_port)
             await asyncio.create_task(instance.accept_connections(reader, writer))
             #psync_response = await reader.read(1024)
             
             #writer.close()
             #await writer.wait_closed()
-        async with instance.inner_server as server:
-            print("SERVER STARTED")
-            await server.serve_forever()
+        instance.cron_task = asyncio.create_task(instance.server_cron())
+        try:
+            await asyncio.gather(*(server.serve_forever() for server in instance.servers))
+        finally:
+            instance.cron_task.cancel()
+            for server in instance.servers:
+                server.close()
+            if unixsocket:
+                instance.remove_stale_socket()
             
         return instance
 
+    def load_databases(self, loaded: Dict[int, Tuple[dict, dict]]) -> None:
+        for index, (memory, expiration) in loaded.items():
+            if index >= len(self.databases):
+                persistence_logger.warning("Skipping %d keys of database %d, beyond the %d configured", len(memory), index, len(self.databases))
+                continue
+            if self.router is not None:
+                memory = {key: value for key, value in memory.items() if self.router.owns(key)}
+                expiration = {key: value for key, value in expiration.items() if key in memory}
+            self.databases[index].load(memory, expiration)
+
+    def swap_databases(self, first: int, second: int) -> None:
+        # Only the two databases' contents trade places; clients on either one re-alias what they now select
+        self.databases[first].swap(self.databases[second])
+        keyspace.reselect(self.clients, (first, second))
+
+    def used_memory(self) -> int:
+        used = keyspace.used_memory(self.databases)
+        if used > self.peak_memory:
+            self.peak_memory = used
+        return used
+
+    async def server_cron(self) -> None:
+        # Each tick does a bounded slice of work, so clients never wait on it for long
+        while True:
+            await asyncio.sleep(1 / SERVER_CRON_HZ)
+            try:
+                self.expirer.run_cycle()
+                self.used_memory()
+            except Exception:
+                server_logger.exception("Server cron failed")
+
     async def send_replconf_command(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, port: int) -> None:
         replconf_command = "*3\r\n$8\r\nREPLCONF\r\n$14\r\nlistening-port\r\n$4\r\n" + str(port) + "\r\n"
         writer.write(replconf_command.encode())
@@ -79,26 +153,40 @@ class AsyncServer:
         response = await reader.read(1024)
         return response.decode()
 
-    async def start(self) -> None:
+    async def start(self) -> asyncio.AbstractServer:
+        # Workers each bind the same port and the kernel spreads incoming connections across them
         server = await asyncio.start_server(
-            self.accept_connections, self.host, self.port
+            self.accept_connections, self.host, self.port, reuse_port=self.router is not None
         )
         addr = server.sockets[0].getsockname()
-        logging.info(f"Server started at http://{addr[0]}:{addr[1]}")
+        server_logger.info("Server started at %s:%d", addr[0], addr[1])
+        return server
+
+    async def start_unix(self) -> asyncio.AbstractServer:
+        self.remove_stale_socket()
+        server = await asyncio.start_unix_server(self.accept_connections, self.unixsocket)
+        server_logger.info("Server listening on unix socket %s", self.unixsocket)
         return server
 
+    def remove_stale_socket(self) -> None:
+        # A socket file left by a previous run would make the bind fail; anything else at that path is left alone
+        try:
+            if stat.S_ISSOCK(os.stat(self.unixsocket).st_mode):
+                os.unlink(self.unixsocket)
+        except FileNotFoundError:
+            pass
+
     async def accept_connections(
         self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
     ) -> None:
-        addr = writer.get_extra_info("peername")
-        logging.info(f"Connected by {addr}")
+        server_logger.debug("Connected by %s", writer.get_extra_info("peername"))
         request_handler = AsyncRequestHandler(reader, writer, self)
-        await request_handler.process_request()
+        self.clients.add(request_handler)
+        try:
+            await request_handler.process_request()
+        finally:
+            self.clients.discard(request_handler)
         
-    def get_keys_array(self):
-        hash_map, _ = parse_redis_file(Path(self.config["dir"]) / self.config["dbfilename"])
-        encoded_keys = self.as_array(hash_map.keys())
-        return encoded_keys
 
 
 
@@ -0,0 +1,188 @@
+import asyncio
+import collections
+import socket
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+from app.utils import resp_encoder, slot_utils
+
+if TYPE_CHECKING:
+    from app.AsyncServer import AsyncServer
+
+# Channel 0 to each peer is shared and pipelined; the others are lent out one at a time to
+# blocking commands so a forwarded XREAD BLOCK cannot hold up everything queued behind it.
+CHANNELS_PER_PEER = 4
+CROSS_WORKER = -1
+ALL_WORKERS = -2
+
+
+async def read_raw_reply(reader: asyncio.StreamReader) -> bytes:
+    # Reads exactly one RESP reply and returns its raw bytes, so it can be relayed untouched
+    line = await reader.readuntil(b"\r\n")
+    prefix = line[:1]
+    if prefix in b"$=!":
+        length = int(line[1:-2])
+        if length < 0:
+            return line
+        return line + await reader.readexactly(length + 2)
+    if prefix in b"*~>%":
+        count = int(line[1:-2])
+        if prefix == b"%":
+            count *= 2
+        parts = [line]
+        for _ in range(max(count, 0)):
+            parts.append(await read_raw_reply(reader))
+        return b"".join(parts)
+    return line
+
+def merge_array_replies(replies: List[bytes]) -> bytes:
+    # Concatenates array replies from several workers into one array; anything else returns the first reply
+    if not all(reply.startswith(b"*") for reply in replies):
+        for reply in replies:
+            if reply.startswith(b"-"):
+                return reply
+        return replies[0]
+    total = 0
+    bodies = []
+    for reply in replies:
+        header_end = reply.index(b"\r\n")
+        total += max(int(reply[1:header_end]), 0)
+        bodies.append(reply[header_end + 2:])
+    return resp_encoder.array_prefix(total) + b"".join(bodies)
+
+
+class ForwardChannel:
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.reader = None
+        self.writer = None
+        self.pending = collections.deque()
+        self.reply_task = None
+        # The peer's handler for this channel keeps its own HELLO and SELECT state, which has to follow the callers'
+        self.protocol = 2
+        self.db = 0
+
+    async def open(self) -> None:
+        self.reader, self.writer = await asyncio.open_connection(sock=self.sock)
+        self.reply_task = asyncio.create_task(self._read_replies())
+
+    def send(self, command: List[str], protocol: int = 2, discard_reply: bool = False, db: int = 0) -> asyncio.Future|None:
+        # Replies come back in order, so each one resolves the oldest outstanding future
+        if protocol != self.protocol:
+            self.send(["HELLO", str(protocol)], self.protocol, discard_reply=True, db=self.db)
+            self.protocol = protocol
+        if db != self.db:
+            self.db = db
+            self.send(["SELECT", str(db)], protocol, discard_reply=True, db=db)
+        future = None if discard_reply else asyncio.get_running_loop().create_future()
+        self.pending.append(future)  # a None entry means the reply is read and dropped
+        self.writer.write(resp_encoder.encode_array(command))
+        return future
+
+    async def _read_replies(self) -> None:
+        try:
+            while True:
+                reply = await read_raw_reply(self.reader)
+                future = self.pending.popleft()
+                if future is not None:
+                    future.set_result(reply)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            while self.pending:
+                future = self.pending.popleft()
+                if future is not None:
+                    future.set_exception(ConnectionError("peer worker closed the forwarding channel"))
+
+
+class ShardRouter:
+    """Hash-slot ownership for one worker of a multi-process server.
+
+    Each worker owns a contiguous block of the 16384 hash slots. Commands whose
+    keys belong to another worker are forwarded to it over a socketpair created
+    before the fork, and the raw reply is relayed back to the client.
+    """
+
+    def __init__(self, worker_id: int, num_workers: int, outgoing: Dict[int, List[socket.socket]], incoming: List[socket.socket]):
+        self.worker_id = worker_id
+        self.num_workers = num_workers
+        self.slots = slot_utils.slot_range(worker_id, num_workers)
+        self.outgoing = outgoing
+        self.incoming = incoming
+        self.shared_channels = {}
+        self.blocking_channels = {}
+        # The event loop only keeps weak references to tasks
+        self.peer_tasks = []
+
+    @staticmethod
+    def create_all(num_workers: int) -> List['ShardRouter']:
+        # Called in the parent before forking; worker i keeps routers[i] and closes every other socket
+        pairs: Dict[Tuple[int, int], List[Tuple[socket.socket, socket.socket]]] = {}
+        for source in range(num_workers):
+            for target in range(num_workers):
+                if source != target:
+                    pairs[(source, target)] = [socket.socketpair() for _ in range(CHANNELS_PER_PEER)]
+        routers = []
+        for worker_id in range(num_workers):
+            outgoing = {target: [client for client, _ in pairs[(worker_id, target)]] for target in range(num_workers) if target != worker_id}
+            incoming = [server for (source, target), ends in pairs.items() if target == worker_id for _, server in ends]
+            routers.append(ShardRouter(worker_id, num_workers, outgoing, incoming))
+        return routers
+
+    def own_sockets(self) -> List[socket.socket]:
+        return [sock for socks in self.outgoing.values() for sock in socks] + self.incoming
+
+    def owner(self, key: str|bytes) -> int:
+        return slot_utils.slot_owner(slot_utils.key_hash_slot(key), self.num_workers)
+
+    def owns(self, key: str|bytes) -> bool:
+        return slot_utils.key_hash_slot(key) in self.slots
+
+    def target(self, keys: List[str], all_shards: bool = False) -> int:
+        if not keys:
+            return ALL_WORKERS if all_shards else self.worker_id
+        target = self.owner(keys[0])
+        for key in keys[1:]:
+            if self.owner(key) != target:
+                return CROSS_WORKER
+        return target
+
+    async def start(self, server: 'AsyncServer') -> None:
+        from app.AsyncHandler import AsyncRequestHandler
+
+        for sock in self.incoming:
+            reader, writer = await asyncio.open_connection(sock=sock)
+            handler = AsyncRequestHandler(reader, writer, server)
+            handler.router = None  # commands arriving from a peer always run locally
+            # Registered like any client, so SWAPDB re-selects its database too
+            server.clients.add(handler)
+            self.peer_tasks.append(asyncio.create_task(handler.process_request()))
+        for worker_id, socks in self.outgoing.items():
+            channels = [ForwardChannel(sock) for sock in socks]
+            for channel in channels:
+                await channel.open()
+            self.shared_channels[worker_id] = channels[0]
+            queue = asyncio.Queue()
+            for channel in channels[1:]:
+                queue.put_nowait(channel)
+            self.blocking_channels[worker_id] = queue
+
+    def forward_nowait(self, worker_id: int, command: List[str], protocol: int = 2, db: int = 0) -> asyncio.Future:
+        # Sent immediately so a pipeline's forwarded commands travel together instead of one round trip each
+        return self.shared_channels[worker_id].send(command, protocol, db=db)
+
+    def forward_transaction(self, worker_id: int, commands: List[List[str]], protocol: int = 2, db: int = 0) -> asyncio.Future:
+        # Written without yielding, so nothing else sent on the shared channel can land inside the transaction
+        channel = self.shared_channels[worker_id]
+        channel.send(["MULTI"], protocol, discard_reply=True, db=db)
+        for command in commands:
+            channel.send(command, protocol, discard_reply=True, db=db)
+        return channel.send(["EXEC"], protocol, db=db)
+
+    async def forward_blocking(self, worker_id: int, command: List[str], protocol: int = 2, db: int = 0) -> bytes:
+        queue = self.blocking_channels[worker_id]
+        channel = await queue.get()
+        try:
+            return await channel.send(command, protocol, db=db)
+        finally:
+            queue.put_nowait(channel)
+
+    async def broadcast(self, command: List[str], protocol: int = 2, db: int = 0) -> List[bytes]:
+        return list(await asyncio.gather(*(self.forward_nowait(worker_id, command, protocol, db) for worker_id in self.outgoing)))
@@ -0,0 +1,264 @@
+import asyncio
+import collections
+from typing import List
+
+from app.client.client_commands import CommandsMixin
+from app.utils.encoding_utils import INCOMPLETE, RespReplyParser
+from app.utils.resp_encoder import encode_array
+
+READ_BUFFER_SIZE = 65536
+DEFAULT_CHUNK_SIZE = 10000
+
+
+def is_blocking(command_list: List[str]) -> bool:
+    # These can hold the connection for as long as the server waits, so they don't share one
+    name = command_list[0].upper()
+    return name == "WAIT" or (name == "XREAD" and len(command_list) > 1 and command_list[1].upper() == "BLOCK")
+
+
+class AsyncConnection:
+    """One connection shared by any number of concurrent requests.
+
+    Requests are written as soon as they are made and replies, which the server
+    sends in order, resolve the oldest outstanding future.
+    """
+
+    def __init__(self, host="localhost", port=6379, unix_socket_path=None, protocol=2):
+        self.host = host
+        self.port = port
+        self.unix_socket_path = unix_socket_path
+        self.protocol = protocol
+        self.reader = None
+        self.writer = None
+        self.pending = collections.deque()
+        self.reply_task = None
+        self.closed = False
+
+    def is_connected(self) -> bool:
+        # The reader task may not have seen the connection drop yet, so check the transport too
+        return not self.closed and self.writer is not None and not self.writer.is_closing()
+
+    async def connect(self):
+        if self.unix_socket_path:
+            self.reader, self.writer = await asyncio.open_unix_connection(self.unix_socket_path)
+        else:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.reply_task = asyncio.create_task(self._read_replies())
+        if self.protocol != 2:
+            reply = await self.execute(["HELLO", str(self.protocol)])
+            if isinstance(reply, Exception):
+                await self.disconnect()
+                raise ConnectionError(f"server refused protocol {self.protocol}: {reply}")
+
+    async def disconnect(self):
+        self.closed = True
+        if self.writer is not None:
+            self.writer.close()
+        if self.reply_task is not None:
+            self.reply_task.cancel()
+        self._fail_pending(ConnectionError("connection closed"))
+
+    def send(self, commands: List[List[str]]) -> List[asyncio.Future]:
+        # All commands go out in one write, so nothing sent by another coroutine can land between them
+        if not self.is_connected():
+            raise ConnectionError("connection closed")
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in commands]
+        self.pending.extend(futures)
+        self.writer.write(b"".join([encode_array(command) for command in commands]))
+        return futures
+
+    async def drain(self):
+        try:
+            await self.writer.drain()
+        except ConnectionError:
+            # Sent requests fail through their futures once the reader sees the connection close
+            pass
+
+    async def execute(self, command_list: List[str]):
+        future = self.send([command_list])[0]
+        await self.drain()
+        return await future
+
+    async def _read_replies(self):
+        parser = RespReplyParser()
+        try:
+            while True:
+                data = await self.reader.read(READ_BUFFER_SIZE)
+                if not data:
+                    break
+                parser.feed(data)
+                reply = parser.get_reply()
+                while reply is not INCOMPLETE:
+                    future = self.pending.popleft()
+                    # The caller may have given up waiting; the reply still has to be consumed in order
+                    if not future.done():
+                        future.set_result(reply)
+                    reply = parser.get_reply()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.closed = True
+            self._fail_pending(ConnectionError("connection closed by the server"))
+
+    def _fail_pending(self, error: Exception):
+        while self.pending:
+            future = self.pending.popleft()
+            if not future.done():
+                future.set_exception(error)
+
+
+class AsyncConnectionPool:
+    """Spreads requests over up to max_connections multiplexed connections.
+
+    Each request goes to the connection with the fewest replies outstanding, and a
+    new connection is opened only while every existing one is busy. Blocking
+    commands get a connection of their own for their duration, so they never
+    hold up the requests queued behind them.
+    """
+
+    def __init__(self, host="localhost", port=6379, unix_socket_path=None, max_connections=4, protocol=2):
+        self.host = host
+        self.port = port
+        self.unix_socket_path = unix_socket_path
+        self.max_connections = max_connections
+        self.protocol = protocol
+        self.connections: List[AsyncConnection] = []
+        self.blocking_connections: List[AsyncConnection] = []
+        self.lock = asyncio.Lock()
+
+    def make_connection(self) -> AsyncConnection:
+        return AsyncConnection(self.host, self.port, self.unix_socket_path, self.protocol)
+
+    async def get_connection(self) -> AsyncConnection:
+        self.connections = [connection for connection in self.connections if connection.is_connected()]
+        if self.connections:
+            connection = min(self.connections, key=lambda connection: len(connection.pending))
+            if not connection.pending or len(self.connections) >= self.max_connections:
+                return connection
+        async with self.lock:
+            if len(self.connections) < self.max_connections:
+                connection = self.make_connection()
+                await connection.connect()
+                self.connections.append(connection)
+                return connection
+        return min(self.connections, key=lambda connection: len(connection.pending))
+
+    async def execute(self, command_list: List[str]):
+        if is_blocking(command_list):
+            return await self._execute_blocking(command_list)
+        connection = await self.get_connection()
+        return await connection.execute(command_list)
+
+    async def execute_many(self, commands: List[List[str]], chunk_size: int = DEFAULT_CHUNK_SIZE) -> List:
+        connection = await self.get_connection()
+        futures = []
+        for start in range(0, len(commands), chunk_size):
+            futures.extend(connection.send(commands[start:start + chunk_size]))
+            # Replies are read concurrently, so waiting on the send buffer here cannot deadlock
+            await connection.drain()
+        # Error replies are Exception values, so a raised exception here can only be a lost connection
+        replies = await asyncio.gather(*futures, return_exceptions=True)
+        for reply in replies:
+            if isinstance(reply, ConnectionError):
+                raise reply
+        return replies
+
+    async def _execute_blocking(self, command_list: List[str]):
+        connection = None
+        while self.blocking_connections and connection is None:
+            connection = self.blocking_connections.pop()
+            if not connection.is_connected():
+                connection = None
+        if connection is None:
+            connection = self.make_connection()
+            await connection.connect()
+        try:
+            reply = await connection.execute(command_list)
+        except BaseException:
+            # Cancelled or failed mid-command: the reply may still arrive, so the connection cannot be reused
+            await connection.disconnect()
+            raise
+        self.blocking_connections.append(connection)
+        return reply
+
+    async def disconnect(self):
+        connections, self.connections = self.connections + self.blocking_connections, []
+        self.blocking_connections = []
+        for connection in connections:
+            await connection.disconnect()
+
+
+class AsyncCoolClient(CommandsMixin):
+    # Every command helper returns an awaitable, e.g. `await client.get_value("key")`
+    def __init__(self, host="localhost", port=6379, unix_socket_path=None, connection_pool=None, max_connections=4, protocol=2):
+        self.host = host
+        self.port = port
+        self.unix_socket_path = unix_socket_path
+        self.connection_pool = connection_pool or AsyncConnectionPool(host, port, unix_socket_path, max_connections, protocol)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        await self.connection_pool.disconnect()
+
+    async def execute_command(self, command_list):
+        return await self.connection_pool.execute(command_list)
+
+    async def hello(self, protover=3):
+        # As with CoolClient, the protocol applies to the whole pool: connections are reopened to negotiate it
+        self.connection_pool.protocol = int(protover)
+        await self.connection_pool.disconnect()
+        return await self.send_command(f'HELLO {protover}\n')
+
+    def pipeline(self, transaction=False, chunk_size=None):
+        return AsyncPipeline(self.connection_pool, transaction, chunk_size)
+
+
+class AsyncPipeline(CommandsMixin):
+    """Asyncio counterpart of Pipeline: queue commands, then `await pipe.execute()`.
+
+    Leaving an `async with client.pipeline()` block executes whatever is still queued.
+    """
+
+    def __init__(self, connection_pool: AsyncConnectionPool, transaction=False, chunk_size=None):
+        self.connection_pool = connection_pool
+        self.transaction = transaction
+        self.chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+        self.command_stack: List[List[str]] = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if exc_type is None and self.command_stack:
+            await self.execute()
+        self.reset()
+
+    def __len__(self):
+        return len(self.command_stack)
+
+    def execute_command(self, command_list):
+        self.command_stack.append(command_list)
+        return self
+
+    def reset(self):
+        self.command_stack = []
+
+    async def execute(self) -> List:
+        commands, self.command_stack = self.command_stack, []
+        if not commands:
+            return []
+        if not self.transaction:
+            return await self.connection_pool.execute_many(commands, self.chunk_size)
+        # A transaction goes out as one write so it stays contiguous on the shared connection
+        replies = await self.connection_pool.execute_many([["MULTI"]] + commands + [["EXEC"]], len(commands) + 2)
+        result = replies[-1]
+        if isinstance(result, Exception):
+            errors = [str(reply) for reply in replies[1:-1] if isinstance(reply, Exception)]
+            raise type(result)(f"{result}: {'; '.join(errors)}" if errors else str(result))
+        return result
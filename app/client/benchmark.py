@@ -0,0 +1,271 @@
+import argparse
+import asyncio
+import collections
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+from typing import Dict, List
+
+from app.client.async_client import AsyncConnection
+
+# Each benchmark gets its own key prefix so, for example, GET never runs against a list
+COMMANDS = {
+    "ping": lambda key, value: ["PING"],
+    "set": lambda key, value: ["SET", f"key:{key}", value],
+    "get": lambda key, value: ["GET", f"key:{key}"],
+    "incr": lambda key, value: ["INCR", f"counter:{key}"],
+    "lpush": lambda key, value: ["LPUSH", f"list:{key}", value],
+    "rpush": lambda key, value: ["RPUSH", f"list:{key}", value],
+    "lpop": lambda key, value: ["LPOP", f"list:{key}"],
+    "sadd": lambda key, value: ["SADD", f"set:{key}", value],
+    "hset": lambda key, value: ["HSET", f"hash:{key}", "field", value],
+    "zadd": lambda key, value: ["ZADD", f"zset:{key}", str(random.random()), value],
+    "xadd": lambda key, value: ["XADD", f"stream:{key}", "*", "field", value],
+}
+
+
+class LatencyHistogram:
+    """HDR-style histogram of latencies in microseconds.
+
+    Buckets are exact below 128us and log-linear above, 64 per power of two, so
+    every recorded value is within 1/64 of its bucket and percentiles keep two
+    significant digits at any scale. Histograms from several processes merge by
+    adding their counts.
+    """
+
+    SUB_BUCKETS = 128
+    HALF = SUB_BUCKETS // 2
+
+    def __init__(self):
+        self.counts = collections.Counter()
+        self.total = 0
+        self.sum = 0
+        self.min = None
+        self.max = 0
+
+    @classmethod
+    def bucket_index(cls, value: int) -> int:
+        if value < cls.SUB_BUCKETS:
+            return value
+        shift = value.bit_length() - 7
+        return cls.SUB_BUCKETS + (shift - 1) * cls.HALF + (value >> shift) - cls.HALF
+
+    @classmethod
+    def bucket_value(cls, index: int) -> int:
+        # Highest value that falls in the bucket
+        if index < cls.SUB_BUCKETS:
+            return index
+        shift, sub = divmod(index - cls.SUB_BUCKETS, cls.HALF)
+        return ((sub + cls.HALF + 1) << (shift + 1)) - 1
+
+    def record(self, value: int, count: int = 1):
+        self.counts[self.bucket_index(value)] += count
+        self.total += count
+        self.sum += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: 'LatencyHistogram'):
+        self.counts.update(other.counts)
+        self.total += other.total
+        self.sum += other.sum
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, percent: float) -> int:
+        if not self.total:
+            return 0
+        target = max(1, math.ceil(self.total * percent / 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self.bucket_value(index), self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "min": self.min or 0,
+            "mean": round(self.sum / self.total, 1) if self.total else 0,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "p99.9": self.percentile(99.9),
+            "max": self.max,
+        }
+
+    def to_dict(self) -> Dict:
+        return {"counts": dict(self.counts), "total": self.total, "sum": self.sum, "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'LatencyHistogram':
+        histogram = cls()
+        histogram.counts.update({int(index): count for index, count in data["counts"].items()})
+        histogram.total, histogram.sum, histogram.min, histogram.max = data["total"], data["sum"], data["min"], data["max"]
+        return histogram
+
+
+def parse_mix(tests: str) -> Dict[str, int]:
+    # "set,get" runs an even mix; "set:1,get:9" weights it
+    mix = {}
+    for test in tests.split(","):
+        name, _, weight = test.strip().lower().partition(":")
+        if name not in COMMANDS:
+            raise ValueError(f"unknown test '{name}', expected one of {', '.join(COMMANDS)}")
+        mix[name] = int(weight or 1)
+        if mix[name] < 1:
+            raise ValueError(f"weight for '{name}' must be at least 1")
+    return mix
+
+
+async def run_client(connection: AsyncConnection, args, mix: Dict[str, int], remaining: List[int], stats: Dict):
+    names, weights = list(mix), list(mix.values())
+    value = "x" * args.data_size
+    while remaining[0] > 0:
+        count = min(args.pipeline, remaining[0])
+        remaining[0] -= count
+        batch = random.choices(names, weights, k=count)
+        commands = [COMMANDS[name](random.randrange(args.keyspace), value) for name in batch]
+        start = time.perf_counter_ns()
+        futures = connection.send(commands)
+        await connection.drain()
+        replies = await asyncio.gather(*futures)
+        # As in redis-benchmark, every request in a pipelined batch is charged the whole batch's round trip
+        elapsed = (time.perf_counter_ns() - start) // 1000
+        for name, reply in zip(batch, replies):
+            histogram, errors = stats[name]
+            histogram.record(elapsed)
+            if isinstance(reply, Exception):
+                errors[0] += 1
+
+
+async def run_process(args, mix: Dict[str, int], clients: int, requests: int) -> Dict:
+    connections = [AsyncConnection(args.host, args.port, args.socket) for _ in range(clients)]
+    await asyncio.gather(*[connection.connect() for connection in connections])
+    stats = {name: (LatencyHistogram(), [0]) for name in mix}
+    remaining = [requests]
+    started = time.time()
+    try:
+        await asyncio.gather(*[run_client(connection, args, mix, remaining, stats) for connection in connections])
+    finally:
+        for connection in connections:
+            await connection.disconnect()
+    return {
+        "start": started,
+        "end": time.time(),
+        "commands": {name: {"histogram": histogram.to_dict(), "errors": errors[0]} for name, (histogram, errors) in stats.items()},
+    }
+
+
+def run_worker(args, mix, clients, requests) -> Dict:
+    return asyncio.run(run_process(args, mix, clients, requests))
+
+
+def split(total: int, parts: int) -> List[int]:
+    return [total // parts + (1 if i < total % parts else 0) for i in range(parts)]
+
+
+def run_benchmark(args) -> Dict:
+    mix = parse_mix(args.tests)
+    processes = min(args.processes, args.clients)
+    shares = list(zip(split(args.clients, processes), split(args.requests, processes)))
+    if processes == 1:
+        results = [run_worker(args, mix, *shares[0])]
+    else:
+        # One event loop can only drive one core, so large runs spread the clients over processes
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.starmap(run_worker, [(args, mix, clients, requests) for clients, requests in shares])
+    return summarize(args, results)
+
+
+def summarize(args, results: List[Dict]) -> Dict:
+    elapsed = max(result["end"] for result in results) - min(result["start"] for result in results)
+    overall = LatencyHistogram()
+    commands = {}
+    for name in parse_mix(args.tests):
+        histogram, errors = LatencyHistogram(), 0
+        for result in results:
+            histogram.merge(LatencyHistogram.from_dict(result["commands"][name]["histogram"]))
+            errors += result["commands"][name]["errors"]
+        overall.merge(histogram)
+        commands[name.upper()] = {
+            "requests": histogram.total,
+            "errors": errors,
+            "ops_per_sec": round(histogram.total / elapsed, 1) if elapsed else 0,
+            "latency_us": histogram.summary(),
+        }
+    return {
+        "config": {
+            "target": args.socket or f"{args.host}:{args.port}",
+            "clients": args.clients,
+            "requests": args.requests,
+            "pipeline": args.pipeline,
+            "keyspace": args.keyspace,
+            "data_size": args.data_size,
+            "tests": args.tests,
+            "processes": min(args.processes, args.clients),
+        },
+        "elapsed_sec": round(elapsed, 3),
+        "ops_per_sec": round(overall.total / elapsed, 1) if elapsed else 0,
+        "latency_us": overall.summary(),
+        "commands": commands,
+    }
+
+
+def print_report(report: Dict):
+    for name, stats in report["commands"].items():
+        latency = stats["latency_us"]
+        print(f'{name}: {stats["ops_per_sec"]:.2f} requests per second, '
+              f'p50={latency["p50"] / 1000:.3f} p99={latency["p99"] / 1000:.3f} p99.9={latency["p99.9"] / 1000:.3f} msec'
+              + (f', {stats["errors"]} errors' if stats["errors"] else ''))
+    latency = report["latency_us"]
+    print(f'TOTAL: {report["ops_per_sec"]:.2f} requests per second in {report["elapsed_sec"]} seconds, '
+          f'p50={latency["p50"] / 1000:.3f} p99={latency["p99"] / 1000:.3f} p99.9={latency["p99.9"] / 1000:.3f} msec')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='CoolCache benchmark')
+    parser.add_argument('--host', default=os.environ.get('COOLCACHE_HOST', 'localhost'), help='CoolCache server host')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('COOLCACHE_PORT', 6379)), help='CoolCache server port')
+    parser.add_argument('--socket', default=os.environ.get('COOLCACHE_SOCKET'), help='CoolCache server unix socket path, used instead of host and port')
+    parser.add_argument('-c', '--clients', type=int, default=50, help='Number of parallel connections')
+    parser.add_argument('-n', '--requests', type=int, default=100000, help='Total number of requests')
+    parser.add_argument('-P', '--pipeline', type=int, default=1, help='Requests in flight per connection')
+    parser.add_argument('-r', '--keyspace', type=int, default=10000, help='Number of distinct keys per command')
+    parser.add_argument('-d', '--data-size', type=int, default=3, help='Size of values in bytes')
+    parser.add_argument('-t', '--tests', default='set,get', help=f'Command mix, e.g. set:1,get:9; available: {",".join(COMMANDS)}')
+    parser.add_argument('--processes', type=int, default=1, help='Client processes to spread the connections over')
+    parser.add_argument('--json', help='Write the results to this file, or - for stdout')
+    args = parser.parse_args(argv)
+    for option in ('clients', 'requests', 'pipeline', 'keyspace', 'processes'):
+        if getattr(args, option) < 1:
+            parser.error(f'--{option} must be at least 1')
+    try:
+        parse_mix(args.tests)
+    except ValueError as e:
+        parser.error(str(e))
+    return args
+
+
+def main():
+    args = parse_args()
+    try:
+        report = run_benchmark(args)
+    except OSError as e:
+        print(f'Error: could not connect to {args.socket or f"{args.host}:{args.port}"}: {e}')
+        sys.exit(1)
+    if args.json == '-':
+        print(json.dumps(report, indent=2))
+        return
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -17,18 +17,20 @@ def create_client():
     parser.add_argument('command', nargs='*', help='Command and its arguments')
     parser.add_argument('--host', help='CoolCache server host')
     parser.add_argument('--port', type=int, help='CoolCache server port')
+    parser.add_argument('--socket', help='CoolCache server unix socket path, used instead of host and port')
 
     args = parser.parse_args()
 
     host = args.host or os.environ.get('COOLCACHE_HOST')
     port = args.port or os.environ.get('COOLCACHE_PORT')
     port = int(port) if port else None
+    unix_socket_path = args.socket or os.environ.get('COOLCACHE_SOCKET')
 
-    if not host or not port:
-        print('Error: CoolCache host and port must be specified either as command-line arguments or environment variables.')
+    if not unix_socket_path and (not host or not port):
+        print('Error: CoolCache host and port, or a unix socket path, must be specified either as command-line arguments or environment variables.')
         sys.exit(1)
 
-    client = CoolClient(host, port)
+    client = CoolClient(host, port, unix_socket_path=unix_socket_path)
     return client, args
 
 
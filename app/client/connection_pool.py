@@ -0,0 +1,230 @@
+import collections
+import contextlib
+import select
+import selectors
+import socket
+import threading
+import time
+from typing import Iterator, List
+
+from app.utils.encoding_utils import INCOMPLETE, RespReplyParser
+from app.utils.resp_encoder import encode_array
+
+READ_BUFFER_SIZE = 65536
+
+
+class PoolExhaustedError(ConnectionError):
+    pass
+
+
+class Connection:
+    def __init__(self, host="localhost", port=6379, unix_socket_path=None, protocol=2):
+        self.host = host
+        self.port = port
+        self.unix_socket_path = unix_socket_path
+        self.protocol = protocol
+        self.sock = None
+        self.reply_parser = None
+        self.last_used = time.monotonic()
+
+    def connect(self):
+        if self.unix_socket_path:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(self.unix_socket_path)
+        else:
+            sock = socket.create_connection((self.host, self.port))
+            # Commands are small and latency-bound; don't let Nagle hold them back
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = sock
+        self.reply_parser = RespReplyParser()
+        self.last_used = time.monotonic()
+        if self.protocol != 2:
+            reply = self.send_command(["HELLO", str(self.protocol)])
+            if isinstance(reply, Exception):
+                self.disconnect()
+                raise ConnectionError(f"server refused protocol {self.protocol}: {reply}")
+
+    def disconnect(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            finally:
+                self.sock = None
+                self.reply_parser = None
+
+    def send_packed(self, data: bytes):
+        self.sock.sendall(data)
+        self.last_used = time.monotonic()
+
+    def send_command(self, command_list: List[str]):
+        self.send_packed(encode_array(command_list))
+        return self.read_reply()
+
+    def read_reply(self):
+        # Bytes past the end of this reply stay in the parser for the next call
+        reply = self.reply_parser.get_reply()
+        while reply is INCOMPLETE:
+            data = self.sock.recv(READ_BUFFER_SIZE)
+            if not data:
+                raise ConnectionError("connection closed by the server")
+            self.reply_parser.feed(data)
+            reply = self.reply_parser.get_reply()
+        self.last_used = time.monotonic()
+        return reply
+
+    def send_pipelined(self, data: bytes, count: int) -> List:
+        # Writes and reads at the same time: a batch bigger than the socket buffers would otherwise
+        # deadlock, with the server blocked on us reading its replies while we are blocked sending
+        replies = []
+        view = memoryview(data)
+        sent = 0
+        self.sock.setblocking(False)
+        try:
+            with selectors.DefaultSelector() as selector:
+                selector.register(self.sock, selectors.EVENT_READ | selectors.EVENT_WRITE)
+                while sent < len(data):
+                    for _, events in selector.select():
+                        if events & selectors.EVENT_WRITE:
+                            try:
+                                sent += self.sock.send(view[sent:sent + READ_BUFFER_SIZE])
+                            except BlockingIOError:
+                                pass
+                        if events & selectors.EVENT_READ:
+                            try:
+                                chunk = self.sock.recv(READ_BUFFER_SIZE)
+                            except BlockingIOError:
+                                continue
+                            if not chunk:
+                                raise ConnectionError("connection closed by the server")
+                            self.reply_parser.feed(chunk)
+                            reply = self.reply_parser.get_reply()
+                            while reply is not INCOMPLETE:
+                                replies.append(reply)
+                                reply = self.reply_parser.get_reply()
+        finally:
+            self.sock.setblocking(True)
+        while len(replies) < count:
+            replies.append(self.read_reply())
+        self.last_used = time.monotonic()
+        return replies
+
+    def has_unread_data(self) -> bool:
+        # An idle connection should have nothing to read; readable means EOF or a stray reply
+        readable, _, _ = select.select([self.sock], [], [], 0)
+        return bool(readable) or bool(self.reply_parser.buffer)
+
+
+class ConnectionPool:
+    """Thread-safe pool of connections to one server.
+
+    At most max_connections exist at once. get_connection waits up to timeout
+    seconds for one to be released (None waits forever) unless block is False.
+    A connection idle for more than health_check_interval seconds is checked
+    with PING before it is handed out, and idle connections older than
+    idle_timeout are closed the next time the pool is used.
+    """
+
+    def __init__(self, host="localhost", port=6379, unix_socket_path=None, max_connections=50, timeout=None, health_check_interval=30, idle_timeout=300, protocol=2):
+        self.host = host
+        self.port = port
+        self.unix_socket_path = unix_socket_path
+        # RESP version every connection negotiates with HELLO when it connects
+        self.protocol = protocol
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.idle_timeout = idle_timeout
+        # Most recently released connections are at the right and are reused first, leaving the stale ones to be reaped
+        self.idle = collections.deque()
+        self.created = 0
+        self.condition = threading.Condition()
+
+    def make_connection(self) -> Connection:
+        return Connection(self.host, self.port, self.unix_socket_path, self.protocol)
+
+    def get_connection(self, block=True, timeout=None) -> Connection:
+        timeout = self.timeout if timeout is None else timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while True:
+                self._reap_idle()
+                if self.idle:
+                    connection = self.idle.pop()
+                    break
+                if self.created < self.max_connections:
+                    connection = None
+                    self.created += 1
+                    break
+                if not block:
+                    raise PoolExhaustedError(f"all {self.max_connections} connections are in use")
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise PoolExhaustedError(f"no connection became available within {timeout} seconds")
+                self.condition.wait(remaining)
+
+        # Connecting and health checks happen outside the lock so other threads are not held up by the network
+        try:
+            if connection is None:
+                connection = self.make_connection()
+                connection.connect()
+            else:
+                self._ensure_healthy(connection)
+        except BaseException:
+            self._discard(connection)
+            raise
+        return connection
+
+    def release(self, connection: Connection) -> None:
+        if connection.sock is None or connection.protocol != self.protocol:
+            self._discard(connection)
+            return
+        with self.condition:
+            self.idle.append(connection)
+            self.condition.notify()
+
+    @contextlib.contextmanager
+    def connection(self, block=True, timeout=None) -> Iterator[Connection]:
+        connection = self.get_connection(block, timeout)
+        try:
+            yield connection
+        except BaseException:
+            # The reply stream may be out of step with the commands sent, so the connection cannot be reused
+            connection.disconnect()
+            raise
+        finally:
+            self.release(connection)
+
+    def disconnect(self) -> None:
+        # Closes idle connections; ones currently checked out go back to the pool when released
+        with self.condition:
+            while self.idle:
+                self.idle.pop().disconnect()
+                self.created -= 1
+            self.condition.notify_all()
+
+    def _ensure_healthy(self, connection: Connection) -> None:
+        if connection.has_unread_data():
+            connection.disconnect()
+        elif self.health_check_interval and time.monotonic() - connection.last_used > self.health_check_interval:
+            try:
+                if connection.send_command(["PING"]) != "PONG":
+                    connection.disconnect()
+            except OSError:
+                connection.disconnect()
+        if connection.sock is None:
+            connection.connect()
+
+    def _reap_idle(self) -> None:
+        if not self.idle_timeout:
+            return
+        cutoff = time.monotonic() - self.idle_timeout
+        while self.idle and self.idle[0].last_used < cutoff:
+            self.idle.popleft().disconnect()
+            self.created -= 1
+
+    def _discard(self, connection: Connection|None) -> None:
+        if connection is not None:
+            connection.disconnect()
+        with self.condition:
+            self.created -= 1
+            self.condition.notify()
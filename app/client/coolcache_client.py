@@ -1,107 +1,37 @@
-import re
-import socket
+from app.client.client_commands import CommandsMixin
+from app.client.connection_pool import ConnectionPool
+from app.client.pipeline import Pipeline
 
-from app.utils.encoding_utils import generate_redis_array, parse_element, parse_redis_protocol
 
-
-class CoolClient:
-    def __init__(self, host="localhost", port=6379):
+class CoolClient(CommandsMixin):
+    # Safe to share between threads: each command borrows a connection from the pool for its duration
+    def __init__(self, host="localhost", port=6379, unix_socket_path=None, connection_pool=None, max_connections=50):
         self.host = host
         self.port = port
-        print(f'Connecting to {host}:{port}')
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.sock.connect((self.host, self.port))
+        self.unix_socket_path = unix_socket_path
+        if connection_pool is None:
+            # Unix sockets skip the loopback TCP stack when the server runs on the same host
+            print(f'Connecting to {unix_socket_path or f"{host}:{port}"}')
+            connection_pool = ConnectionPool(host, port, unix_socket_path, max_connections=max_connections)
+            # Connect straight away so an unreachable server is reported here rather than on first use
+            connection_pool.release(connection_pool.get_connection())
+        self.connection_pool = connection_pool
 
     def close(self):
-        self.sock.close()
+        self.connection_pool.disconnect()
         
-    def send_command(self, command):
-        command_list = re.split(r'\s+', command.strip())
-        redis_command = generate_redis_array(string="", lst=command_list)
-        self.sock.sendall(redis_command.encode())
-        response = self.sock.recv(1024)
-        response = parse_element(response, 0)
-        return response[0]
-
-    def keys(self):
-        command = 'KEYS\n'
-        response = self.send_command(command)
-        return response
-
-    def type(self, key):
-        command = f'TYPE {key}\n'
-        response = self.send_command(command)
-        return response
-
-    def config(self, *params):
-        command = f'CONFIG {" ".join(params)}\n'
-        response = self.send_command(command)
-        return response
+    def execute_command(self, command_list):
+        with self.connection_pool.connection() as connection:
+            return connection.send_command(command_list)
 
-    def wait(self, num_replicas, max_wait_ms):
-        command = f'WAIT {num_replicas} {max_wait_ms}\n'
+    def hello(self, protover=3):
+        # The protocol is a per-connection setting, so it is applied to the whole pool:
+        # pooled connections are replaced by ones that negotiate it when they connect
+        self.connection_pool.protocol = int(protover)
+        self.connection_pool.disconnect()
+        command = f'HELLO {protover}\n'
         response = self.send_command(command)
         return response
 
-    def ping(self):
-        command = 'PING\n'
-        response = self.send_command(command)
-        return response
-
-    def replconf(self, *params):
-        command = f'REPLCONF {" ".join(params)}\n'
-        response = self.send_command(command)
-        return response
-
-    def psync(self, replication_id, offset):
-        command = f'PSYNC {replication_id} {offset}\n'
-        response = self.send_command(command)
-        return response
-
-    def info(self, section):
-        command = f'INFO {section}\n'
-        response = self.send_command(command)
-        return response
-
-    def echo(self, message):
-        command = f'ECHO {message}\n'
-        response = self.send_command(command)
-        return response
-
-    def set_value(self, key, value, *options):
-        command = f'SET {key} {value}'
-        if options:
-            command += f' {" ".join(options)}'
-        command += '\n'
-        response = self.send_command(command)
-        return response
-
-    def get_value(self, key):
-        command = f'GET {key}\n'
-        response = self.send_command(command)
-        return response
-
-    def xadd(self, stream_key, stream_id, *field_value_pairs):
-        command = f'XADD {stream_key} {stream_id} {" ".join(field_value_pairs)}\n'
-        response = self.send_command(command)
-        return response
-
-    def xrange(self, stream_key, lower, upper):
-        command = f'XRANGE {stream_key} {lower} {upper}\n'
-        response = self.send_command(command)
-        return response
-
-    def xread(self, stream_keys, stream_ids, blocking=False, block_interval=0, only_new=False):
-        command = 'XREAD'
-        if blocking:
-            command += f' BLOCK {block_interval}'
-        for stream_key in stream_keys:
-            command += f' {stream_key}'
-        if blocking and only_new:
-            command += ' $'
-        else:
-            for stream_id in stream_ids:
-                command += f' {stream_id}'
-        command += '\n'
-        response = self.send_command(command)
-        return response
+    def pipeline(self, transaction=False, chunk_size=None):
+        return Pipeline(self.connection_pool, transaction, chunk_size)
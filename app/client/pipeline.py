@@ -0,0 +1,69 @@
+from typing import List
+
+from app.client.client_commands import CommandsMixin
+from app.client.connection_pool import ConnectionPool
+from app.utils.resp_encoder import encode_array
+
+DEFAULT_CHUNK_SIZE = 10000
+
+
+class Pipeline(CommandsMixin):
+    """Queues commands and sends them to the server in batches.
+
+    Every command helper returns the pipeline, so calls can be chained, and
+    execute() sends the queue and returns the replies in order. Leaving a
+    `with client.pipeline()` block executes whatever is still queued.
+
+    Batches are split into chunks of chunk_size commands so memory stays bounded
+    however many commands are queued. With transaction=True the whole queue is
+    wrapped in MULTI/EXEC and sent as a single chunk, since a transaction cannot
+    be split; execute() then returns EXEC's replies and raises the server's error
+    if it discarded the transaction.
+    """
+
+    def __init__(self, connection_pool: ConnectionPool, transaction=False, chunk_size=None):
+        self.connection_pool = connection_pool
+        self.transaction = transaction
+        self.chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+        self.command_stack: List[List[str]] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None and self.command_stack:
+            self.execute()
+        self.reset()
+
+    def __len__(self):
+        return len(self.command_stack)
+
+    def execute_command(self, command_list):
+        self.command_stack.append(command_list)
+        return self
+
+    def reset(self):
+        self.command_stack = []
+
+    def execute(self) -> List:
+        commands, self.command_stack = self.command_stack, []
+        if not commands:
+            return []
+        with self.connection_pool.connection() as connection:
+            if self.transaction:
+                return self._execute_transaction(connection, commands)
+            replies = []
+            for start in range(0, len(commands), self.chunk_size):
+                chunk = commands[start:start + self.chunk_size]
+                replies.extend(connection.send_pipelined(b"".join([encode_array(command) for command in chunk]), len(chunk)))
+            return replies
+
+    def _execute_transaction(self, connection, commands: List[List[str]]) -> List:
+        commands = [["MULTI"]] + commands + [["EXEC"]]
+        replies = connection.send_pipelined(b"".join([encode_array(command) for command in commands]), len(commands))
+        result = replies[-1]
+        if isinstance(result, Exception):
+            # The transaction was discarded; the queueing errors say which commands were rejected
+            errors = [str(reply) for reply in replies[1:-1] if isinstance(reply, Exception)]
+            raise type(result)(f"{result}: {'; '.join(errors)}" if errors else str(result))
+        return result
@@ -1,58 +1,86 @@
 from abc import ABC, abstractmethod
 import asyncio
 import time
+from pathlib import Path
 from typing import List
 import app.utils.encoding_utils as encoding_utils
+from app.utils import keyspace, memory_utils, resp_encoder
+from app.utils import rdb_writer
+from app.utils.constants import NON_INT_ERROR
+from app.utils.logging_utils import persistence_logger, replication_logger
 
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
     from app.AsyncHandler import AsyncRequestHandler
 
+DB_INDEX_ERROR = b"-ERR DB index is out of range\r\n"
+# A replica whose unsent stream grows past this is disconnected, as Redis' client-output-buffer-limit for replicas does
+REPLICA_OUTPUT_BUFFER_LIMIT = 256 * 1024 * 1024
+
 class RedisCommand(ABC):
     @abstractmethod
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
+        pass
+
+class SyncRedisCommand(RedisCommand):
+    # Commands that never wait on I/O implement execute_sync, which the dispatcher calls
+    # directly instead of creating and awaiting a coroutine per command.
+    @abstractmethod
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         pass
 
-class KeysCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
-        keys = handler.server.get_keys_array()
-        return keys
+    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
+        return self.execute_sync(handler, command)
 
-class TypeCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class KeysCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
+        return resp_encoder.encode_array(keyspace.match_keys(handler, command[1]))
+
+class TypeCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         key = command[1]
-        if key in handler.memory and (not handler.expiration.get(key) or handler.expiration[key] >= time.time()):
-            value = handler.memory[key]
-            if isinstance(value, list):
-                return "+list\r\n"
-            elif isinstance(value, str):
-                return "+string\r\n"
-            elif isinstance(value, set):
-                return "+set\r\n"
-            else:
-                return "+none\r\n"
-        elif key in handler.server.streamstore:
-            return "+stream\r\n"
+        value = keyspace.lookup(handler, key)
+        if value is not None:
+            return resp_encoder.encode_simple_string(memory_utils.TYPE_NAMES[memory_utils.type_of(value)])
+        elif keyspace.key_exists(handler, key):
+            return b"+stream\r\n"
         else:
-            return "+none\r\n"
+            return b"+none\r\n"
 
-class ConfigCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class ConfigCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
+        if len(command) > 1 and encoding_utils.as_str(command[1]).upper() == "SET":
+            return self.set_params(handler, command[2:])
         if len(command) > 1:
-            config_params = command[2:]
-            response = []
-            for param in config_params:
-                response.append(param)
-                if param in handler.server.config:
-                    value = handler.server.config[param]
-                    response.append(value)
+            config_params = [encoding_utils.as_str(param) for param in command[2:]]
+            # Parameters that are not set are left out of the reply rather than paired with a placeholder
+            return resp_encoder.encode_map({param: handler.server.config[param] for param in config_params if param in handler.server.config}, handler.protocol)
+        return b"-ERR wrong number of arguments for 'config' command\r\n"
+
+    def set_params(self, handler: 'AsyncRequestHandler', args: List[str]) -> bytes:
+        # Only the memory settings can change at runtime
+        if not args or len(args) % 2:
+            return b"-ERR wrong number of arguments for 'config|set' command\r\n"
+        evictor = handler.server.evictor
+        for index in range(0, len(args), 2):
+            param, value = encoding_utils.as_str(args[index]).lower(), encoding_utils.as_str(args[index + 1])
+            try:
+                if param == "maxmemory":
+                    evictor.maxmemory = memory_utils.parse_memory(value)
+                elif param == "maxmemory-policy":
+                    evictor.set_policy(value.lower())
+                elif param == "lazyfree-threshold":
+                    handler.lazyfree.threshold = int(value)
                 else:
-                    response.append("(nil)")
-            return handler.server.as_array(response)
+                    return f"-ERR Unknown option or number of arguments for CONFIG SET - '{param}'\r\n".encode()
+            except ValueError as e:
+                return f"-ERR CONFIG SET failed (possibly related to argument '{param}') - {e}\r\n".encode()
+            handler.server.config[param] = {"maxmemory": str(evictor.maxmemory), "maxmemory-policy": evictor.policy}.get(param, value)
+        return resp_encoder.OK
 
 class WaitCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         max_wait_ms = int(command[2])
         num_replicas = int(command[1])
         for writer in handler.server.writers:
@@ -61,86 +89,284 @@ class WaitCommand(RedisCommand):
         
         start_time = time.time()
         while handler.server.numacks < num_replicas and (time.time() - start_time) < (max_wait_ms / 1000):
-            print(f"NUMACKS: {handler.server.numacks} num_replicas: {num_replicas} max_wait_ms: {max_wait_ms} time: {time.time()} start_time: {start_time}")
             await asyncio.sleep(0.1)
-        print("SENDING BACK", handler.server.numacks)
-        return f":{handler.server.numacks}\r\n"
+        replication_logger.debug("WAIT for %d replicas finished with %d acks", num_replicas, handler.server.numacks)
+        return resp_encoder.encode_integer(handler.server.numacks)
 
-class PingCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
-        return "+PONG\r\n"
+class PingCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
+        return resp_encoder.PONG
 
-class ReplConfCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class ReplConfCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         writer = handler.writer
-        if len(command) > 2 and command[1] == "listening-port":
+        subcommand = encoding_utils.as_str(command[1]) if len(command) > 1 else ""
+        if len(command) > 2 and subcommand == "listening-port":
             handler.server.writers.append(writer)
-        elif len(command) > 2 and command[1] == "GETACK":
-            response = f"*3\r\n$8\r\nREPLCONF\r\n$3\r\nACK\r\n${len(str(handler.offset))}\r\n{handler.offset}\r\n"
-            print(f"REPLCONF ACK: {response}")
+            # The new replica has not seen a SELECT yet
+            handler.server.replication_db = -1
+        elif len(command) > 2 and subcommand == "GETACK":
+            response = resp_encoder.encode_array(["REPLCONF", "ACK", str(handler.offset)])
+            replication_logger.debug("Acknowledging offset %d", handler.offset)
             return response
-        elif len(command) > 2 and command[1] == "ACK":
-            print("Incrementing num acks")
+        elif len(command) > 2 and subcommand == "ACK":
             handler.server.numacks += 1
-            return ""
-        return "+OK\r\n"
+            return b""
+        return resp_encoder.OK
 
-class PSyncCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
-        response = "+FULLRESYNC 8371b4fb1155b71f4a04d3e1bc3e18c4a990aeeb 0\r\n"
+class PSyncCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
+        response = b"+FULLRESYNC 8371b4fb1155b71f4a04d3e1bc3e18c4a990aeeb 0\r\n"
         rdb_hex = "524544495330303131fa0972656469732d76657205372e322e30fa0a72656469732d62697473c040fa056374696d65c26d08bc65fa08757365642d6d656dc2b0c41000fa08616f662d62617365c000fff06e3bfec0ff5aa2"
         binary_data = bytes.fromhex(rdb_hex)
-        header = f"${len(binary_data)}\r\n"
-        handler.writer.write(response.encode())
-        handler.writer.write(header.encode())
-        handler.writer.write(binary_data)
-        await handler.writer.drain()
+        header = resp_encoder.bulk_prefix(len(binary_data))
         handler.server.numacks += 1
-        return ""
+        # Returned rather than written directly so it stays ordered with the rest of the batch's replies
+        return response + header + binary_data
 
-class InfoCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
-        if command[1].lower() == "replication":
+class InfoCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
+        if encoding_utils.as_str(command[1]).lower() == "replication":
             if handler.replica_server is None:
                 master_replid = encoding_utils.generate_random_string(40)
                 master_repl_offset = "0"
                 payload = f"role:master\nmaster_replid:{master_replid}\nmaster_repl_offset:{master_repl_offset}"
-                response = encoding_utils.as_bulk_string(payload)
+                response = resp_encoder.encode_bulk_string(payload)
                 return response
             else:
-                return "+role:slave\r\n"
+                return b"+role:slave\r\n"
+        elif encoding_utils.as_str(command[1]).lower() == "memory":
+            server, evictor = handler.server, handler.server.evictor
+            used = server.used_memory()
+            lines = ["# Memory",
+                     f"used_memory:{used}",
+                     f"used_memory_human:{memory_utils.format_memory(used)}",
+                     f"used_memory_peak:{server.peak_memory}",
+                     f"used_memory_peak_human:{memory_utils.format_memory(server.peak_memory)}"]
+            type_memory = [sum(sizes) for sizes in zip(*(db.key_meta.type_memory for db in server.databases))]
+            lines += [f"used_memory_{name}:{size}" for name, size in zip(memory_utils.TYPE_NAMES, type_memory)]
+            lines += [f"maxmemory:{evictor.maxmemory}",
+                      f"maxmemory_human:{memory_utils.format_memory(evictor.maxmemory)}",
+                      f"maxmemory_policy:{evictor.policy}",
+                      f"lazyfree_pending_objects:{handler.lazyfree.pending()}",
+                      f"lazyfreed_objects:{handler.lazyfree.freed}"]
+            return resp_encoder.encode_bulk_string("\n".join(lines))
+        elif encoding_utils.as_str(command[1]).lower() == "stats":
+            stats = handler.stats
+            payload = f"# Stats\nkeyspace_hits:{stats.hits}\nkeyspace_misses:{stats.misses}\nexpired_keys:{stats.expired}\nevicted_keys:{stats.evicted}"
+            return resp_encoder.encode_bulk_string(payload)
+        elif encoding_utils.as_str(command[1]).lower() == "keyspace":
+            # Empty databases are left out, as in Redis
+            lines = ["# Keyspace"]
+            lines += [f"db{db.index}:keys={db.size()},expires={len(db.expiration)},avg_ttl=0" for db in handler.server.databases if db.size()]
+            return resp_encoder.encode_bulk_string("\n".join(lines))
         else:
-            return "-ERR unknown INFO section\r\n"
+            return b"-ERR unknown INFO section\r\n"
+
+class MemoryCommand(SyncRedisCommand):
+    # Sizes are the estimates kept for maxmemory, not what the interpreter allocated
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
+        subcommand = encoding_utils.as_str(command[1]).upper()
+        if subcommand == "USAGE" and len(command) in (3, 5):
+            samples = memory_utils.DEFAULT_SAMPLES
+            if len(command) == 5:
+                if encoding_utils.as_str(command[3]).upper() != "SAMPLES":
+                    return b"-ERR syntax error\r\n"
+                try:
+                    samples = int(command[4])
+                except ValueError:
+                    return NON_INT_ERROR
+                if samples < 0:
+                    return b"-ERR samples must be positive\r\n"
+            return self.usage(handler, command[2], samples)
+        if subcommand == "STATS" and len(command) == 2:
+            return self.stats(handler)
+        return f"-ERR unknown subcommand or wrong number of arguments for 'MEMORY|{subcommand}'\r\n".encode()
+
+    def usage(self, handler: 'AsyncRequestHandler', key, samples: int) -> bytes:
+        keyspace.expire_if_needed(handler, key)
+        value = handler.memory.get(key)
+        if value is None:
+            value = handler.streamstore.get(key)
+        if value is None:
+            return resp_encoder.encode_null(handler.protocol)
+        return resp_encoder.encode_integer(memory_utils.estimate_size(key, value, samples))
+
+    def stats(self, handler: 'AsyncRequestHandler') -> bytes:
+        server = handler.server
+        used = server.used_memory()
+        keys = sum(len(db.key_meta) for db in server.databases)
+        stats = {
+            "peak.allocated": server.peak_memory,
+            "total.allocated": used,
+            "keys.count": keys,
+            "keys.bytes-per-key": used // keys if keys else 0,
+            "overhead.total": keys * memory_utils.KEY_OVERHEAD,
+            "dataset.bytes": used - keys * memory_utils.KEY_OVERHEAD,
+        }
+        for db in server.databases:
+            if db.key_meta:
+                stats[f"db.{db.index}"] = {"keys": len(db.key_meta), "expires": len(db.expiration), "bytes": db.key_meta.used_memory}
+        type_memory = [sum(sizes) for sizes in zip(*(db.key_meta.type_memory for db in server.databases))]
+        for name, size in zip(memory_utils.TYPE_NAMES, type_memory):
+            stats[f"{name}.bytes"] = size
+        return resp_encoder.encode_value(stats, handler.protocol)
+
+
+def memory_keys(command: List[str]) -> List[str]:
+    # Only MEMORY USAGE names a key
+    if len(command) > 2 and encoding_utils.as_str(command[1]).upper() == "USAGE":
+        return command[2:3]
+    return []
+
+class HelloCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
+        protocol = handler.protocol
+        arguments = [encoding_utils.as_str(argument) for argument in command[1:]]
+        if arguments:
+            if not arguments[0].isdigit() or int(arguments[0]) not in (2, 3):
+                return b"-NOPROTO unsupported protocol version\r\n"
+            protocol = int(arguments[0])
+        index = 1
+        client_name = handler.client_name
+        while index < len(arguments):
+            option = arguments[index].upper()
+            if option == "SETNAME" and index + 1 < len(arguments):
+                client_name = command[index + 2]
+                index += 2
+            elif option == "AUTH":
+                return b"-ERR AUTH is not supported\r\n"
+            else:
+                return resp_encoder.encode_error(f"ERR Syntax error in HELLO option '{arguments[index]}'")
+        # Options are validated before anything changes, so a rejected HELLO leaves the connection as it was
+        handler.protocol = protocol
+        handler.client_name = client_name
+        return resp_encoder.encode_value({
+            "server": "coolcache",
+            "version": "1.0",
+            "proto": protocol,
+            "mode": "standalone",
+            "role": "master" if handler.replica_server is None else "replica",
+            "modules": [],
+        }, protocol)
 
-class EchoCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
-        return f"+{command[1]}\r\n"
+class EchoCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
+        return resp_encoder.encode_simple_string(command[1])
 
     
-class DelCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
-        print("DELETING KEYS", command)
+class DelCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         keys = command[1:]
         count = 0
         for key in keys:
-            if key in handler.memory:
-                handler.memory.pop(key, None)
-                handler.expiration.pop(key, None)
+            # An expired key is gone already and does not count as deleted
+            if not keyspace.expire_if_needed(handler, key) and keyspace.delete_key(handler, key):
                 count += 1
-                print(f"DELETING KEY {key}")
-            else:
-                print(f"KEY {key} NOT FOUND")
-        return f":{count}\r\n"
-    
-class FlushAllCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
-        handler.memory.clear()
-        handler.expiration.clear()
-        return "+OK\r\n"
+        return resp_encoder.encode_integer(count)
     
+class UnlinkCommand(SyncRedisCommand):
+    # DEL that leaves freeing large values to the background freer
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
+        count = 0
+        for key in command[1:]:
+            if not keyspace.expire_if_needed(handler, key) and keyspace.delete_key(handler, key, lazy=True):
+                count += 1
+        return resp_encoder.encode_integer(count)
+
+class FlushAllCommand(SyncRedisCommand):
+    # FLUSHALL empties every database, FLUSHDB only the selected one
+    def __init__(self, all_databases: bool = True):
+        self.all_databases = all_databases
+
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
+        mode = encoding_utils.as_str(command[1]).upper() if len(command) > 1 else "SYNC"
+        if len(command) > 2 or mode not in ("SYNC", "ASYNC"):
+            return b"-ERR syntax error\r\n"
+        databases = handler.server.databases if self.all_databases else [handler.server.databases[handler.db_index]]
+        for db in databases:
+            db.flush(lazy=mode == "ASYNC")
+        keyspace.reselect(handler.server.clients, [db.index for db in databases])
+        propagate(handler, command)
+        return resp_encoder.OK
+
+def parse_db_index(handler: 'AsyncRequestHandler', text: str) -> int|bytes:
+    try:
+        index = int(text)
+    except ValueError:
+        return NON_INT_ERROR
+    if not 0 <= index < len(handler.server.databases):
+        return DB_INDEX_ERROR
+    return index
+
+class SelectCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
+        index = parse_db_index(handler, command[1])
+        if isinstance(index, bytes):
+            return index
+        handler.select(index)
+        return resp_encoder.OK
+
+class MoveCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
+        index = parse_db_index(handler, command[2])
+        if isinstance(index, bytes):
+            return index
+        if index == handler.db_index:
+            return b"-ERR source and destination objects are the same\r\n"
+        moved = keyspace.move_key(handler, handler.server.databases[index], command[1])
+        if moved:
+            propagate(handler, command)
+        return resp_encoder.encode_integer(int(moved))
+
+class SwapDbCommand(SyncRedisCommand):
+    # Exchanges the two databases' dicts, so it takes the same time however many keys they hold
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
+        first = parse_db_index(handler, command[1])
+        second = parse_db_index(handler, command[2])
+        for index in (first, second):
+            if isinstance(index, bytes):
+                return index
+        handler.server.swap_databases(first, second)
+        propagate(handler, command)
+        return resp_encoder.OK
+
+class SaveCommand(SyncRedisCommand):
+    # Writes every database to dir/dbfilename, blocking like Redis' SAVE
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
+        if handler.server.router is not None:
+            return b"-ERR SAVE is not supported with --workers\r\n"
+        config = handler.server.config
+        path = Path(config["dir"] or ".") / (config["dbfilename"] or "dump.rdb")
+        try:
+            rdb_writer.write_redis_file(path, handler.server.databases)
+        except OSError as e:
+            persistence_logger.error("SAVE to %s failed: %s", path, e)
+            return resp_encoder.encode_error(f"ERR {e}")
+        return resp_encoder.OK
+
+def propagate(handler: 'AsyncRequestHandler', command: List[str]) -> None:
+    server = handler.server
+    server.numacks = 0
+    if not server.writers:
+        return
+    replication_logger.debug("Propagating %r to %d replicas", command, len(server.writers))
+    payload = resp_encoder.encode_array(command)
+    if handler.db_index != server.replication_db:
+        # Replicas apply the stream on one connection, so a SELECT is only needed when the database changes
+        payload = resp_encoder.encode_array(["SELECT", str(handler.db_index)]) + payload
+        server.replication_db = handler.db_index
+    # Writes cannot wait here, so a replica that stops reading is dropped rather than buffered without bound
+    for writer in list(server.writers):
+        writer.write(payload)
+        if writer.transport.get_write_buffer_size() > REPLICA_OUTPUT_BUFFER_LIMIT:
+            replication_logger.warning("Disconnecting replica %s, which is over %d bytes behind", writer.get_extra_info("peername"), REPLICA_OUTPUT_BUFFER_LIMIT)
+            server.writers.remove(writer)
+            writer.close()
+
 
 
 
-class UnknownCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
-        return "-ERR unknown command\r\n"
\ No newline at end of file
+class UnknownCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
+        return b"-ERR unknown command\r\n"
\ No newline at end of file
@@ -1,34 +1,27 @@
 from typing import TYPE_CHECKING, Dict, List, Set
-from app.utils import encoding_utils
+from app.utils import keyspace, resp_encoder, scan_utils
 from app.utils.constants import NIL_RESPONSE, WRONG_TYPE_RESPONSE
-from app.commands.commands import RedisCommand
+from app.commands.commands import SyncRedisCommand
 
 if TYPE_CHECKING:
     from app.AsyncHandler import AsyncRequestHandler
     
 
 def get_hash_map_from_memory(handler: 'AsyncRequestHandler', key: str) -> Dict:
-    if key not in handler.memory:
-        return {}
-    elif not isinstance(handler.memory[key], dict):
-        return WRONG_TYPE_RESPONSE
-    return handler.memory[key]
+    value = keyspace.lookup(handler, key, dict)
+    return {} if value is None else value
 
 
-class HGetAllCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class HGetAllCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         key = command[1]
         existing_hash_map = get_hash_map_from_memory(handler, key)
         if existing_hash_map == WRONG_TYPE_RESPONSE:
             return WRONG_TYPE_RESPONSE
-        response = []
-        for k, v in existing_hash_map.items():
-            response.append(k)
-            response.append(v)
-        return encoding_utils.generate_redis_array(lst=response)
+        return resp_encoder.encode_map(existing_hash_map, handler.protocol)
     
-class HGetCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class HGetCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         key = command[1]
         field = command[2]
         existing_hash_map = get_hash_map_from_memory(handler, key)
@@ -36,10 +29,10 @@ class HGetCommand(RedisCommand):
             return WRONG_TYPE_RESPONSE
         if field not in existing_hash_map:
             return NIL_RESPONSE
-        return encoding_utils.as_bulk_string(existing_hash_map[field])
+        return resp_encoder.encode_bulk_string(existing_hash_map[field])
 
-class HSetCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class HSetCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         key = command[1]
         existing_hash_map = get_hash_map_from_memory(handler, key)
         if existing_hash_map == WRONG_TYPE_RESPONSE:
@@ -47,4 +40,15 @@ class HSetCommand(RedisCommand):
         for i in range(2, len(command), 2):
             existing_hash_map[command[i]] = command[i + 1]
         handler.memory[key] = existing_hash_map
-        return "+OK\r\n"
+        return resp_encoder.OK
+
+class HScanCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
+        hash_map = keyspace.lookup(handler, command[1], dict)
+        if hash_map == WRONG_TYPE_RESPONSE:
+            return WRONG_TYPE_RESPONSE
+        result = scan_utils.scan_members(handler, command, hash_map)
+        if isinstance(result, bytes):
+            return result
+        cursor, fields = result
+        return resp_encoder.encode_value([str(cursor), [item for field in fields for item in (field, hash_map[field])]], handler.protocol)
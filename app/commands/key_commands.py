@@ -0,0 +1,146 @@
+import asyncio
+from typing import TYPE_CHECKING, List
+from app.commands.commands import SyncRedisCommand, propagate
+from app.utils import clock, keyspace, resp_encoder, scan_utils
+from app.utils.constants import NON_INT_ERROR
+from app.utils.encoding_utils import as_str
+from app.utils.memory_utils import TYPE_NAMES, type_of
+
+if TYPE_CHECKING:
+    from app.AsyncHandler import AsyncRequestHandler
+
+NX_CONFLICT_ERROR = b"-ERR NX and XX, GT or LT options at the same time are not compatible\r\n"
+GT_LT_CONFLICT_ERROR = b"-ERR GT and LT options at the same time are not compatible\r\n"
+# Under --workers a SCAN cursor holds the worker it continues on above its slot number
+WORKER_CURSOR_STRIDE = 1 << 48
+
+
+def parse_expire_options(options: List[str]) -> bytes|set:
+    flags = set()
+    for option in options:
+        option = as_str(option).upper()
+        if option not in ("NX", "XX", "GT", "LT"):
+            return f"-ERR Unsupported option {option}\r\n".encode()
+        flags.add(option)
+    if "NX" in flags and len(flags) > 1:
+        return NX_CONFLICT_ERROR
+    if "GT" in flags and "LT" in flags:
+        return GT_LT_CONFLICT_ERROR
+    return flags
+
+
+class ExpireCommand(SyncRedisCommand):
+    """EXPIRE, PEXPIRE, EXPIREAT and PEXPIREAT: one command per time unit and reference point.
+
+    A key without a TTL counts as never expiring, so GT never applies to it and LT always does.
+    """
+
+    def __init__(self, unit_ms: int, absolute: bool):
+        self.unit_ms = unit_ms
+        self.absolute = absolute
+
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
+        key = command[1]
+        try:
+            amount = int(command[2])
+        except ValueError:
+            return NON_INT_ERROR
+        flags = parse_expire_options(command[3:])
+        if isinstance(flags, bytes):
+            return flags
+        if not keyspace.key_exists(handler, key):
+            return resp_encoder.encode_integer(0)
+        expires_at_ms = amount * self.unit_ms if self.absolute else clock.now_ms() + amount * self.unit_ms
+        current = keyspace.get_expiry(handler, key)
+        if ("NX" in flags and current is not None) or ("XX" in flags and current is None):
+            return resp_encoder.encode_integer(0)
+        if "GT" in flags and (current is None or expires_at_ms <= current * 1000):
+            return resp_encoder.encode_integer(0)
+        if "LT" in flags and current is not None and expires_at_ms >= current * 1000:
+            return resp_encoder.encode_integer(0)
+        keyspace.set_expiry(handler, key, expires_at_ms / 1000)
+        # Replicas get absolute times, so a delay in replication does not extend the TTL
+        propagate(handler, ["PEXPIREAT", key, str(expires_at_ms)])
+        return resp_encoder.encode_integer(1)
+
+
+class TtlCommand(SyncRedisCommand):
+    def __init__(self, unit_ms: int):
+        self.unit_ms = unit_ms
+
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
+        ttl_ms = keyspace.get_ttl_ms(handler, command[1])
+        if ttl_ms < 0:
+            return resp_encoder.encode_integer(ttl_ms)
+        # Rounded to the nearest unit, like Redis
+        return resp_encoder.encode_integer((ttl_ms + self.unit_ms // 2) // self.unit_ms)
+
+
+class ExpireTimeCommand(SyncRedisCommand):
+    def __init__(self, unit_ms: int):
+        self.unit_ms = unit_ms
+
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
+        key = command[1]
+        if not keyspace.key_exists(handler, key):
+            return resp_encoder.encode_integer(keyspace.KEY_MISSING)
+        expires_at = keyspace.get_expiry(handler, key)
+        if expires_at is None:
+            return resp_encoder.encode_integer(keyspace.NO_TTL)
+        return resp_encoder.encode_integer(round(expires_at * 1000) // self.unit_ms)
+
+
+class PersistCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
+        key = command[1]
+        if not keyspace.key_exists(handler, key) or not keyspace.persist(handler, key):
+            return resp_encoder.encode_integer(0)
+        propagate(handler, command)
+        return resp_encoder.encode_integer(1)
+
+
+class ScanCommand(SyncRedisCommand):
+    """SCAN cursor [MATCH pattern] [COUNT n] [TYPE type], walking the keyspace's scan slots.
+
+    COUNT bounds the slots visited rather than the keys returned, so MATCH
+    and TYPE can leave a reply empty while the cursor still moves on. Under
+    --workers each worker's keyspace is walked in turn: a cursor naming
+    another worker is forwarded to it without waiting, like a command whose
+    key lives there, and a worker that has finished hands the iteration on
+    to the next one.
+    """
+
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes|asyncio.Future:
+        cursor = scan_utils.parse_cursor(command[1])
+        if cursor is None:
+            return scan_utils.INVALID_CURSOR
+        options = scan_utils.parse_scan_options(command[2:], allow_type=True)
+        if isinstance(options, bytes):
+            return options
+        pattern, count, type_name = options
+        if type_name is not None and type_name not in TYPE_NAMES:
+            return f"-ERR unknown type name '{type_name}'\r\n".encode()
+        # Peer handlers have no router of their own, but the cursors they hand out still name their worker
+        router = handler.server.router
+        worker = 0
+        if router is not None:
+            worker, cursor = divmod(cursor, WORKER_CURSOR_STRIDE)
+            if worker >= router.num_workers:
+                return scan_utils.INVALID_CURSOR
+            if worker != router.worker_id:
+                return handler.forward_nowait(worker, command)
+        cursor, keys = handler.key_meta.slots.scan(cursor, count)
+        if router is not None:
+            if cursor:
+                cursor += worker * WORKER_CURSOR_STRIDE
+            elif worker + 1 < router.num_workers:
+                cursor = (worker + 1) * WORKER_CURSOR_STRIDE
+        memory, streamstore, expiration = handler.memory, handler.streamstore, handler.expiration
+        now = clock.now()
+        keys = [key for key in keys if (key in memory or key in streamstore) and not (key in expiration and expiration[key] < now)]
+        matches = scan_utils.matcher(pattern)
+        if matches is not None:
+            keys = [key for key in keys if matches(key)]
+        if type_name is not None:
+            keys = [key for key in keys if (TYPE_NAMES[type_of(memory[key])] if key in memory else "stream") == type_name]
+        return resp_encoder.encode_value([str(cursor), keys], handler.protocol)
@@ -1,23 +1,21 @@
 from app.utils.constants import  NON_INT_ERROR, SYNTAX_ERROR, WRONG_TYPE_RESPONSE, NIL_RESPONSE, WRONG_TYPE_RESPONSE
-from app.commands.commands import RedisCommand
+from app.commands.commands import SyncRedisCommand
 from typing import List, TYPE_CHECKING
 
-from app.utils.encoding_utils import generate_redis_array
+from app.utils import keyspace, resp_encoder
+from app.utils.encoding_utils import as_str
 
 if TYPE_CHECKING:
     from app.AsyncHandler import AsyncRequestHandler
 
 def get_list_from_memory(handler: 'AsyncRequestHandler', key: str) -> List[str]:
-    if key not in handler.memory:
-        return []
-    elif not isinstance(handler.memory[key], list):
-        return WRONG_TYPE_RESPONSE
-    return handler.memory[key]
+    value = keyspace.lookup(handler, key, list)
+    return [] if value is None else value
 
-class LInsertCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class LInsertCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         key = command[1]
-        position = command[2].lower()
+        position = as_str(command[2]).lower()
         pivot = command[3]
         value = command[4]
         existing_list = get_list_from_memory(handler, key)
@@ -31,10 +29,10 @@ class LInsertCommand(RedisCommand):
             existing_list.insert(existing_list.index(pivot) + 1, value)
         else:
             return SYNTAX_ERROR
-        return f":{len(existing_list)}\r\n"
+        return resp_encoder.encode_integer(len(existing_list))
 
-class LPopCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class LPopCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         key = command[1]
         existing_list = get_list_from_memory(handler, key)
         if existing_list == WRONG_TYPE_RESPONSE:
@@ -44,10 +42,10 @@ class LPopCommand(RedisCommand):
         value = existing_list.pop(0)
         if not existing_list:
             handler.memory.pop(key)
-        return f"${len(value)}\r\n{value}\r\n"
+        return resp_encoder.encode_bulk_string(value)
     
-class LPushXCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class LPushXCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         key = command[1]
         existing_list = get_list_from_memory(handler, key)
         if existing_list == WRONG_TYPE_RESPONSE:
@@ -57,10 +55,10 @@ class LPushXCommand(RedisCommand):
         values = command[2:][::-1]
         values.extend(existing_list)
         handler.memory[key] = values
-        return f":{len(handler.memory[key])}\r\n"
+        return resp_encoder.encode_integer(len(handler.memory[key]))
     
-class RPushXCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class RPushXCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         key = command[1]
         existing_list = get_list_from_memory(handler, key)
         if existing_list == WRONG_TYPE_RESPONSE:
@@ -69,10 +67,10 @@ class RPushXCommand(RedisCommand):
             return WRONG_TYPE_RESPONSE
         values = command[2:]
         existing_list.extend(values)
-        return f":{len(handler.memory[key])}\r\n"
+        return resp_encoder.encode_integer(len(handler.memory[key]))
 
-class RPopCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class RPopCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         key = command[1]
         existing_list = get_list_from_memory(handler, key)
         if existing_list == WRONG_TYPE_RESPONSE:
@@ -83,10 +81,10 @@ class RPopCommand(RedisCommand):
         if not existing_list:
             handler.memory.pop(key)
 
-        return f"${len(value)}\r\n{value}\r\n"
+        return resp_encoder.encode_bulk_string(value)
 
-class LPushCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class LPushCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         key = command[1]
         existing_list = get_list_from_memory(handler, key)
         if existing_list == WRONG_TYPE_RESPONSE:
@@ -94,17 +92,17 @@ class LPushCommand(RedisCommand):
         values = command[2:][::-1]
         values.extend(existing_list)
         handler.memory[key] = values
-        return f":{len(handler.memory[key])}\r\n"
+        return resp_encoder.encode_integer(len(handler.memory[key]))
     
-class LRangeCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class LRangeCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         key = command[1]
         existing_list = get_list_from_memory(handler, key)
         if existing_list == WRONG_TYPE_RESPONSE:
             return WRONG_TYPE_RESPONSE
         start = int(command[2])
         stop = int(command[3])
-        values = handler.memory.get(key, [])
+        values = existing_list
         if start < 0:
             start = len(values) + start
         if stop < 0:
@@ -113,19 +111,19 @@ class LRangeCommand(RedisCommand):
         stop = max(0, stop)
         start = min(len(values) - 1, start)
         stop = min(len(values) - 1, stop)
-        return generate_redis_array(lst= values[start:stop+1])
+        return resp_encoder.encode_array(values[start:stop+1])
 
-class LLenCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class LLenCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         key = command[1]
         existing_list = get_list_from_memory(handler, key)
         if existing_list == WRONG_TYPE_RESPONSE:
             return WRONG_TYPE_RESPONSE
-        return f":{len(existing_list)}\r\n"
+        return resp_encoder.encode_integer(len(existing_list))
 
 
-class LIndexCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class LIndexCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         key = command[1]
         index = command[2]
         try:
@@ -139,10 +137,10 @@ class LIndexCommand(RedisCommand):
             index = len(existing_list) + index
         if index < 0 or index >= len(existing_list):
             return NIL_RESPONSE
-        return f"${len(existing_list[index])}\r\n{existing_list[index]}\r\n"
+        return resp_encoder.encode_bulk_string(existing_list[index])
     
-class LSetCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class LSetCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         key = command[1]
         index = command[2]
         try: 
@@ -158,11 +156,11 @@ class LSetCommand(RedisCommand):
         if index < 0 or index >= len(existing_list):
             return NON_INT_ERROR
         existing_list[index] = value
-        return "+OK\r\n"
+        return resp_encoder.OK
 
 
-class RPushCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class RPushCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         key = command[1]
         existing_list = get_list_from_memory(handler, key)
         if existing_list == WRONG_TYPE_RESPONSE:
@@ -170,4 +168,4 @@ class RPushCommand(RedisCommand):
         values = command[2:]
         existing_list.extend(values)
         handler.memory[key] = existing_list
-        return f":{len(handler.memory[key])}\r\n"
\ No newline at end of file
+        return resp_encoder.encode_integer(len(handler.memory[key]))
\ No newline at end of file
@@ -0,0 +1,171 @@
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List
+
+from app.commands import commands, hash_map_commands, key_commands, list_commands, set_commands, sorted_set_commands, stream_commands, string_commands, transaction_commands
+from app.commands.commands import RedisCommand, SyncRedisCommand
+from app.utils import encoding_utils, resp_encoder, stream_utils
+
+if TYPE_CHECKING:
+    from app.AsyncHandler import AsyncRequestHandler
+
+
+class CommandSpec:
+    """One command table record, shared by every connection.
+
+    arity follows the Redis convention: a positive value is the exact argument
+    count including the command name, a negative value the minimum. first_key,
+    last_key and step give the key positions; last_key -1 means the last argument.
+    Commands whose keys cannot be described that way supply a key_finder, and
+    all_shards marks keyless commands that must run on every worker.
+    """
+
+    def __init__(self, name: str, command: RedisCommand, arity: int, flags: Iterable[str] = (), first_key: int = 0, last_key: int = 0, step: int = 0, key_finder: Callable[[List[str]], List[str]] = None, all_shards: bool = False):
+        self.name = name
+        self.command = command
+        self.arity = arity
+        self.flags = frozenset(flags)
+        self.first_key = first_key
+        self.last_key = last_key
+        self.step = step
+        self.key_finder = key_finder
+        self.all_shards = all_shards
+        self.is_async = not isinstance(command, SyncRedisCommand)
+        self.is_write = "write" in self.flags
+        # Refused rather than run when the server is over maxmemory and cannot evict
+        self.denyoom = "denyoom" in self.flags
+
+    def check_arity(self, argc: int) -> bool:
+        if self.arity >= 0:
+            return argc == self.arity
+        return argc >= -self.arity
+
+    def get_keys(self, command: List[str]) -> List[str]:
+        if self.key_finder is not None:
+            return self.key_finder(command)
+        if self.first_key == 0:
+            return []
+        last_key = self.last_key if self.last_key >= 0 else len(command) + self.last_key
+        return command[self.first_key:last_key + 1:self.step]
+
+    def as_info(self) -> List:
+        return [self.name.lower(), self.arity, sorted(self.flags), self.first_key, self.last_key, self.step]
+
+
+COMMAND_TABLE: Dict[str, CommandSpec] = {}
+
+def register(name: str, command: RedisCommand, arity: int, flags: Iterable[str] = (), first_key: int = 0, last_key: int = 0, step: int = 0, key_finder: Callable[[List[str]], List[str]] = None, all_shards: bool = False) -> None:
+    COMMAND_TABLE[name] = CommandSpec(name, command, arity, flags, first_key, last_key, step, key_finder, all_shards)
+
+def lookup(name: str) -> CommandSpec|None:
+    return COMMAND_TABLE.get(name)
+
+
+class CommandCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
+        if len(command) == 1:
+            return resp_encoder.encode_nested_array([spec.as_info() for spec in COMMAND_TABLE.values()])
+        subcommand = encoding_utils.as_str(command[1]).upper()
+        if subcommand == "COUNT":
+            return resp_encoder.encode_integer(len(COMMAND_TABLE))
+        if subcommand == "INFO":
+            specs = [lookup(encoding_utils.as_str(name).upper()) for name in command[2:]]
+            return resp_encoder.encode_nested_array([spec.as_info() if spec else None for spec in specs])
+        if subcommand == "GETKEYS" and len(command) > 2:
+            spec = lookup(encoding_utils.as_str(command[2]).upper())
+            if spec is None:
+                return b"-ERR Invalid command specified\r\n"
+            if not spec.check_arity(len(command) - 2):
+                return b"-ERR Invalid number of arguments specified for command\r\n"
+            keys = spec.get_keys(command[2:])
+            if not keys:
+                return b"-ERR The command has no key arguments\r\n"
+            return resp_encoder.encode_array(keys)
+        return b"-ERR unknown subcommand or wrong number of arguments for 'COMMAND'\r\n"
+
+
+register("PING", commands.PingCommand(), -1)
+register("ECHO", commands.EchoCommand(), 2)
+register("HELLO", commands.HelloCommand(), -1)
+register("INFO", commands.InfoCommand(), -2)
+register("REPLCONF", commands.ReplConfCommand(), -1, ["admin"])
+register("PSYNC", commands.PSyncCommand(), -3, ["admin"])
+register("WAIT", commands.WaitCommand(), 3, ["blocking"])
+register("CONFIG", commands.ConfigCommand(), -2, ["admin"])
+register("MEMORY", commands.MemoryCommand(), -2, ["readonly"], key_finder=commands.memory_keys)
+register("COMMAND", CommandCommand(), -1)
+register("KEYS", commands.KeysCommand(), 2, ["readonly"], all_shards=True)
+register("TYPE", commands.TypeCommand(), 2, ["readonly"], 1, 1, 1)
+register("DEL", commands.DelCommand(), -2, ["write"], 1, -1, 1)
+register("UNLINK", commands.UnlinkCommand(), -2, ["write"], 1, -1, 1)
+register("FLUSHALL", commands.FlushAllCommand(), -1, ["write"], all_shards=True)
+register("FLUSHDB", commands.FlushAllCommand(all_databases=False), -1, ["write"], all_shards=True)
+register("SELECT", commands.SelectCommand(), 2)
+register("MOVE", commands.MoveCommand(), 3, ["write"], 1, 1, 1)
+register("SWAPDB", commands.SwapDbCommand(), 3, ["write"], all_shards=True)
+register("SAVE", commands.SaveCommand(), 1, ["admin"])
+register("EXPIRE", key_commands.ExpireCommand(1000, absolute=False), -3, ["write"], 1, 1, 1)
+register("PEXPIRE", key_commands.ExpireCommand(1, absolute=False), -3, ["write"], 1, 1, 1)
+register("EXPIREAT", key_commands.ExpireCommand(1000, absolute=True), -3, ["write"], 1, 1, 1)
+register("PEXPIREAT", key_commands.ExpireCommand(1, absolute=True), -3, ["write"], 1, 1, 1)
+register("TTL", key_commands.TtlCommand(1000), 2, ["readonly"], 1, 1, 1)
+register("PTTL", key_commands.TtlCommand(1), 2, ["readonly"], 1, 1, 1)
+register("EXPIRETIME", key_commands.ExpireTimeCommand(1000), 2, ["readonly"], 1, 1, 1)
+register("PEXPIRETIME", key_commands.ExpireTimeCommand(1), 2, ["readonly"], 1, 1, 1)
+register("PERSIST", key_commands.PersistCommand(), 2, ["write"], 1, 1, 1)
+register("SCAN", key_commands.ScanCommand(), -2, ["readonly"])
+register("MULTI", transaction_commands.MultiCommand(), 1)
+register("EXEC", transaction_commands.ExecCommand(), 1)
+register("DISCARD", transaction_commands.DiscardCommand(), 1)
+
+register("SET", string_commands.SetCommand(), -3, ["write", "denyoom"], 1, 1, 1)
+register("GET", string_commands.GetCommand(), 2, ["readonly"], 1, 1, 1)
+register("MSET", string_commands.MSetCommand(), -3, ["write", "denyoom"], 1, -1, 2)
+register("MGET", string_commands.MGetCommand(), -2, ["readonly"], 1, -1, 1)
+register("INCR", string_commands.IncrCommand(), 2, ["write", "denyoom"], 1, 1, 1)
+register("DECR", string_commands.DecrCommand(), 2, ["write", "denyoom"], 1, 1, 1)
+register("INCRBY", string_commands.IncrByCommand(), 3, ["write", "denyoom"], 1, 1, 1)
+register("DECRBY", string_commands.DecrByCommand(), 3, ["write", "denyoom"], 1, 1, 1)
+register("APPEND", string_commands.AppendCommand(), 3, ["write", "denyoom"], 1, 1, 1)
+
+register("XADD", stream_commands.XAddCommand(), -5, ["write", "denyoom"], 1, 1, 1)
+register("XRANGE", stream_commands.XRangeCommand(), -4, ["readonly"], 1, 1, 1)
+register("XREAD", stream_commands.XReadCommand(), -4, ["readonly", "blocking"], key_finder=stream_utils.get_xread_keys)
+
+register("LPUSH", list_commands.LPushCommand(), -3, ["write", "denyoom"], 1, 1, 1)
+register("RPUSH", list_commands.RPushCommand(), -3, ["write", "denyoom"], 1, 1, 1)
+register("LPOP", list_commands.LPopCommand(), -2, ["write"], 1, 1, 1)
+register("RPOP", list_commands.RPopCommand(), -2, ["write"], 1, 1, 1)
+register("LLEN", list_commands.LLenCommand(), 2, ["readonly"], 1, 1, 1)
+register("LINDEX", list_commands.LIndexCommand(), 3, ["readonly"], 1, 1, 1)
+register("LINSERT", list_commands.LInsertCommand(), 5, ["write", "denyoom"], 1, 1, 1)
+register("LPUSHX", list_commands.LPushXCommand(), -3, ["write", "denyoom"], 1, 1, 1)
+register("RPUSHX", list_commands.RPushXCommand(), -3, ["write", "denyoom"], 1, 1, 1)
+register("LRANGE", list_commands.LRangeCommand(), 4, ["readonly"], 1, 1, 1)
+register("LSET", list_commands.LSetCommand(), 4, ["write", "denyoom"], 1, 1, 1)
+
+register("SADD", set_commands.SAddCommand(), -3, ["write", "denyoom"], 1, 1, 1)
+register("SCARD", set_commands.SCardCommand(), 2, ["readonly"], 1, 1, 1)
+register("SISMEMBER", set_commands.SIsMemberCommand(), 3, ["readonly"], 1, 1, 1)
+register("SMEMBERS", set_commands.SMembersCommand(), 2, ["readonly"], 1, 1, 1)
+register("SREM", set_commands.SRemCommand(), -3, ["write"], 1, 1, 1)
+register("SPOP", set_commands.SPopCommand(), -2, ["write"], 1, 1, 1)
+register("SUNION", set_commands.SUnionCommand(), -2, ["readonly"], 1, -1, 1)
+register("SINTER", set_commands.SInterCommand(), -2, ["readonly"], 1, -1, 1)
+register("SDIFF", set_commands.SDiffCommand(), 3, ["readonly"], 1, 2, 1)
+register("SSCAN", set_commands.SScanCommand(), -3, ["readonly"], 1, 1, 1)
+register("SMOVE", set_commands.SMoveCommand(), 4, ["write", "denyoom"], 1, 2, 1)
+
+register("HSET", hash_map_commands.HSetCommand(), -4, ["write", "denyoom"], 1, 1, 1)
+register("HGET", hash_map_commands.HGetCommand(), 3, ["readonly"], 1, 1, 1)
+register("HGETALL", hash_map_commands.HGetAllCommand(), 2, ["readonly"], 1, 1, 1)
+register("HSCAN", hash_map_commands.HScanCommand(), -3, ["readonly"], 1, 1, 1)
+
+register("ZADD", sorted_set_commands.ZAddCommand(), -4, ["write", "denyoom"], 1, 1, 1)
+register("ZREM", sorted_set_commands.ZRemCommand(), -3, ["write"], 1, 1, 1)
+register("ZRANGE", sorted_set_commands.ZRangeCommand(), -4, ["readonly"], 1, 1, 1)
+register("ZRANGEBYSCORE", sorted_set_commands.ZRangeByScoreCommand(), -4, ["readonly"], 1, 1, 1)
+register("ZRANK", sorted_set_commands.ZRankCommand(), 3, ["readonly"], 1, 1, 1)
+register("ZREVRANK", sorted_set_commands.ZRevRankCommand(), 3, ["readonly"], 1, 1, 1)
+register("ZSCORE", sorted_set_commands.ZScoreCommand(), 3, ["readonly"], 1, 1, 1)
+register("ZSCAN", sorted_set_commands.ZScanCommand(), -3, ["readonly"], 1, 1, 1)
+register("ZCARD", sorted_set_commands.ZCardCommand(), 2, ["readonly"], 1, 1, 1)
+register("ZCOUNT", sorted_set_commands.ZCountCommand(), 4, ["readonly"], 1, 1, 1)
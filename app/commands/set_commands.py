@@ -1,21 +1,18 @@
 from typing import List, Set, TYPE_CHECKING
-from app.commands.commands import RedisCommand
-from app.utils import encoding_utils
+from app.commands.commands import SyncRedisCommand
+from app.utils import keyspace, resp_encoder, scan_utils
 from app.utils.constants import WRONG_TYPE_RESPONSE
 
 if TYPE_CHECKING:
     from app.AsyncHandler import AsyncRequestHandler
 
 def get_set_from_memory(handler: 'AsyncRequestHandler', key: str) -> Set[str]:
-    if key not in handler.memory:
-        return set()
-    elif not isinstance(handler.memory[key], set):
-        return WRONG_TYPE_RESPONSE
-    return handler.memory[key]
+    value = keyspace.lookup(handler, key, set)
+    return set() if value is None else value
 
 
-class SAddCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class SAddCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         key = command[1]
         existing_set = get_set_from_memory(handler, key)
         if existing_set == WRONG_TYPE_RESPONSE:
@@ -26,19 +23,18 @@ class SAddCommand(RedisCommand):
                 existing_set.add(value)
                 added += 1
         handler.memory[key] = existing_set
-        print(f"Memory: {handler.memory}")
-        return f":{added}\r\n"
+        return resp_encoder.encode_integer(added)
     
-class SMembersCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class SMembersCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         key = command[1]
         existing_set = get_set_from_memory(handler, key)
         if existing_set == WRONG_TYPE_RESPONSE:
             return WRONG_TYPE_RESPONSE
-        return encoding_utils.generate_redis_array(lst=list(existing_set))
+        return resp_encoder.encode_set(existing_set, handler.protocol)
     
-class SRemCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class SRemCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         key = command[1]
         existing_set = get_set_from_memory(handler, key)
         if existing_set == WRONG_TYPE_RESPONSE:
@@ -48,26 +44,26 @@ class SRemCommand(RedisCommand):
             if value in existing_set:
                 existing_set.remove(value)
                 removed += 1
-        return f":{removed}\r\n"
+        return resp_encoder.encode_integer(removed)
     
-class SIsMemberCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class SIsMemberCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         key = command[1]
         existing_set = get_set_from_memory(handler, key)
         if existing_set == WRONG_TYPE_RESPONSE:
             return WRONG_TYPE_RESPONSE
-        return f":{int(command[2] in existing_set)}\r\n"
+        return resp_encoder.encode_integer(int(command[2] in existing_set))
     
-class SCardCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class SCardCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         key = command[1]
         existing_set = get_set_from_memory(handler, key)
         if existing_set == WRONG_TYPE_RESPONSE:
             return WRONG_TYPE_RESPONSE
-        return f":{len(existing_set)}\r\n"
+        return resp_encoder.encode_integer(len(existing_set))
     
-class SDiffCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class SDiffCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         key1 = command[1]
         key2 = command[2]
         existing_set1 = get_set_from_memory(handler, key1)
@@ -77,10 +73,10 @@ class SDiffCommand(RedisCommand):
         if existing_set2 == WRONG_TYPE_RESPONSE:
             return WRONG_TYPE_RESPONSE
         diff = existing_set1 - existing_set2
-        return encoding_utils.generate_redis_array(lst=list(diff))
+        return resp_encoder.encode_set(diff, handler.protocol)
     
-class SUnionCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class SUnionCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         sets = []
         for key in command[1:]:
             existing_set = get_set_from_memory(handler, key)
@@ -88,11 +84,11 @@ class SUnionCommand(RedisCommand):
                 return WRONG_TYPE_RESPONSE
             sets.append(existing_set)
         union = set.union(*sets)
-        return encoding_utils.generate_redis_array(lst=list(union))
+        return resp_encoder.encode_set(union, handler.protocol)
 
 
-class SInterCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class SInterCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         sets = []
         for key in command[1:]:
             existing_set = get_set_from_memory(handler, key)
@@ -100,24 +96,21 @@ class SInterCommand(RedisCommand):
                 return WRONG_TYPE_RESPONSE
             sets.append(existing_set)
         intersection = set.intersection(*sets)
-        print(f"Sets: {sets}")
-        print(f"Intersection: {intersection}")
-        return encoding_utils.generate_redis_array(lst=list(intersection))
+        return resp_encoder.encode_set(intersection, handler.protocol)
     
-class SPopCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class SPopCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         key = command[1]
         existing_set = get_set_from_memory(handler, key)
         if existing_set == WRONG_TYPE_RESPONSE:
             return WRONG_TYPE_RESPONSE
         if not existing_set:
-            return "$-1\r\n"
+            return resp_encoder.encode_null(handler.protocol)
         value = existing_set.pop()
-        print(f"MEMORY {handler.memory[key]}")
-        return f"${len(value)}\r\n{value}\r\n"
+        return resp_encoder.encode_bulk_string(value)
 
-class SMoveCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class SMoveCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         source_key = command[1]
         dest_key = command[2]
         value = command[3]
@@ -125,10 +118,21 @@ class SMoveCommand(RedisCommand):
         if source_set == WRONG_TYPE_RESPONSE:
             return WRONG_TYPE_RESPONSE
         if value not in source_set:
-            return ":0\r\n"
+            return resp_encoder.encode_integer(0)
         dest_set = get_set_from_memory(handler, dest_key)
         if dest_set == WRONG_TYPE_RESPONSE:
             return WRONG_TYPE_RESPONSE
         source_set.remove(value)
         dest_set.add(value)
-        return ":1\r\n"
\ No newline at end of file
+        return resp_encoder.encode_integer(1)
+
+class SScanCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
+        members = keyspace.lookup(handler, command[1], set)
+        if members == WRONG_TYPE_RESPONSE:
+            return WRONG_TYPE_RESPONSE
+        result = scan_utils.scan_members(handler, command, members)
+        if isinstance(result, bytes):
+            return result
+        cursor, found = result
+        return resp_encoder.encode_value([str(cursor), found], handler.protocol)
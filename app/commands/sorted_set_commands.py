@@ -1,10 +1,10 @@
 
 from typing import TYPE_CHECKING, List, Tuple
-from app.commands.commands import RedisCommand
+from app.commands.commands import SyncRedisCommand
 from sortedcontainers import SortedSet
 
-from app.utils import encoding_utils
-from app.utils.constants import FLOAT_ERROR_MESSAGE, NOT_FOUND_RESPONSE, WRONG_TYPE_RESPONSE
+from app.utils import encoding_utils, keyspace, resp_encoder, scan_utils
+from app.utils.constants import FLOAT_ERROR_MESSAGE, NON_INT_ERROR, SYNTAX_ERROR, WRONG_TYPE_RESPONSE
 
 if TYPE_CHECKING:
     from app.AsyncHandler import AsyncRequestHandler
@@ -42,7 +42,6 @@ class CoolCacheSortedSet:
 
         if not self.check_conditions(score, member, only_if_not_exists, only_if_exists, only_if_greater, only_if_less, incr):
             return False
-        print(f"score: {score}, member: {member}, only_if_not_exists: {only_if_not_exists}, only_if_exists: {only_if_exists}, only_if_greater: {only_if_greater}, only_if_less: {only_if_less}, incr: {incr}, count_changed: {count_changed}")
         changed = False
         existed = False
         if member in self.scores:
@@ -74,11 +73,9 @@ class CoolCacheSortedSet:
             end = len(self.data) + end
         ret_list = []
         for i in range(start, end+1):
-            print(i, len(self.data))
             if i >= len(self.data):
                 break
             ret_list.append(self.data[i][1])
-        print(ret_list)
         return ret_list
     
     def zrangebyscore(self, min_score, max_score):
@@ -107,14 +104,11 @@ class CoolCacheSortedSet:
 
 
 def get_sorted_set_from_memory(handler: 'AsyncRequestHandler', key: str) -> CoolCacheSortedSet:
-    if key not in handler.memory:
-        return CoolCacheSortedSet()
-    elif not isinstance(handler.memory[key], CoolCacheSortedSet):
-        return WRONG_TYPE_RESPONSE
-    return handler.memory[key]
+    value = keyspace.lookup(handler, key, CoolCacheSortedSet)
+    return CoolCacheSortedSet() if value is None else value
 
 
-class ZAddCommand(RedisCommand):
+class ZAddCommand(SyncRedisCommand):
     
     def parse_options(self, command: List[str]) -> None|Tuple[bool, bool, bool, bool, bool, bool, int]:
         nx = False
@@ -126,17 +120,18 @@ class ZAddCommand(RedisCommand):
         first_num = 2
 
         for i in range(2, len(command)):
-            if command[i] == "NX":
+            option = encoding_utils.as_str(command[i])
+            if option == "NX":
                 nx = True
-            elif command[i] == "XX":
+            elif option == "XX":
                 xx = True
-            elif command[i] == "INCR":
+            elif option == "INCR":
                 incr = True
-            elif command[i] == "GT":
+            elif option == "GT":
                 gt = True
-            elif command[i] == "CH":
+            elif option == "CH":
                 ch = True
-            elif command[i] == "LT":
+            elif option == "LT":
                 lt = True
             else:
                 try:
@@ -151,12 +146,12 @@ class ZAddCommand(RedisCommand):
 
         return nx, xx, incr, gt, ch, lt, first_num
 
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         key = command[1]
         options = self.parse_options(command)
-        nx, xx, incr, gt, ch, lt, first_num = options
         if options is None:
-            return "Invalid options"
+            return SYNTAX_ERROR
+        nx, xx, incr, gt, ch, lt, first_num = options
         existing_set = get_sorted_set_from_memory(handler, key)
         if existing_set == WRONG_TYPE_RESPONSE:
             return WRONG_TYPE_RESPONSE
@@ -170,10 +165,10 @@ class ZAddCommand(RedisCommand):
             if existing_set.zadd(score, member, only_if_exists=xx, only_if_not_exists=nx, only_if_greater=gt, only_if_less=lt, incr=incr, count_changed=ch):
                 added += 1
                 handler.memory[key] = existing_set
-        return f":{added}\r\n"
+        return resp_encoder.encode_integer(added)
     
-class ZRemCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class ZRemCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         key = command[1]
         existing_set = get_sorted_set_from_memory(handler, key)
         if existing_set == WRONG_TYPE_RESPONSE:
@@ -183,24 +178,24 @@ class ZRemCommand(RedisCommand):
             if existing_set.zrem(member):
                 removed += 1
                 handler.memory[key] = existing_set
-        return f":{removed}\r\n"
+        return resp_encoder.encode_integer(removed)
     
-class ZRangeCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class ZRangeCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         key = command[1]
         try:
             start = int(command[2])
             stop = int(command[3])
         except ValueError:
-            return "Invalid start or stop index"
+            return NON_INT_ERROR
         existing_set = get_sorted_set_from_memory(handler, key)
         if existing_set == WRONG_TYPE_RESPONSE:
             return WRONG_TYPE_RESPONSE
         members = existing_set.zrange(start, stop)
-        return encoding_utils.generate_redis_array(lst = members)
+        return resp_encoder.encode_array(members)
     
-class ZRangeByScoreCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class ZRangeByScoreCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         key = command[1]
         try:
             min_score = float(command[2])
@@ -212,15 +207,15 @@ class ZRangeByScoreCommand(RedisCommand):
             return WRONG_TYPE_RESPONSE
         
         #put small epsilon so we query by tuples
-        members = existing_set.zrangebyscore((min_score-1e-5, "0"), (max_score+1e-5, "0"))
+        members = existing_set.zrangebyscore((min_score-1e-5,), (max_score+1e-5,))
         
         #we must filter members whose score is less than min_score or greater than max_score
         members = [member for member in members if existing_set.scores[member] >= min_score and existing_set.scores[member] <= max_score]
         
-        return encoding_utils.generate_redis_array(members)
+        return resp_encoder.encode_array(members)
 
-class ZRankCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class ZRankCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         key = command[1]
         member = command[2]
         existing_set = get_sorted_set_from_memory(handler, key)
@@ -228,11 +223,11 @@ class ZRankCommand(RedisCommand):
             return WRONG_TYPE_RESPONSE
         rank = existing_set.zrank(member)
         if rank is None:
-            return NOT_FOUND_RESPONSE
-        return f":{rank}\r\n"
+            return resp_encoder.encode_null(handler.protocol)
+        return resp_encoder.encode_integer(rank)
 
-class ZRevRankCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class ZRevRankCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         key = command[1]
         member = command[2]
         existing_set = get_sorted_set_from_memory(handler, key)
@@ -240,11 +235,11 @@ class ZRevRankCommand(RedisCommand):
             return WRONG_TYPE_RESPONSE
         rank = existing_set.zrevrank(member)
         if rank is None:
-            return NOT_FOUND_RESPONSE
-        return f":{rank}\r\n"
+            return resp_encoder.encode_null(handler.protocol)
+        return resp_encoder.encode_integer(rank)
     
-class ZScoreCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class ZScoreCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         key = command[1]
         member = command[2]
         existing_set = get_sorted_set_from_memory(handler, key)
@@ -252,19 +247,19 @@ class ZScoreCommand(RedisCommand):
             return WRONG_TYPE_RESPONSE
         score = existing_set.zscore(member)
         if score is None:
-            return NOT_FOUND_RESPONSE
-        return f":{score}\r\n"
+            return resp_encoder.encode_null(handler.protocol)
+        return resp_encoder.encode_double(score, handler.protocol)
 
-class ZCardCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class ZCardCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         key = command[1]
         existing_set = get_sorted_set_from_memory(handler, key)
         if existing_set == WRONG_TYPE_RESPONSE:
             return WRONG_TYPE_RESPONSE
-        return f":{existing_set.zcard()}\r\n"
+        return resp_encoder.encode_integer(existing_set.zcard())
     
-class ZCountCommand(RedisCommand):
-    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> str:
+class ZCountCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
         key = command[1]
         try:
             min_score = float(command[2])
@@ -275,8 +270,22 @@ class ZCountCommand(RedisCommand):
         if existing_set == WRONG_TYPE_RESPONSE:
             return WRONG_TYPE_RESPONSE
                 #put small epsilon so we query by tuples
-        members = existing_set.zrangebyscore((min_score-1e-5, "0"), (max_score+1e-5, "0"))
+        members = existing_set.zrangebyscore((min_score-1e-5,), (max_score+1e-5,))
         #we must filter members whose score is less than min_score or greater than max_score
         members = [member for member in members if existing_set.scores[member] >= min_score and existing_set.scores[member] <= max_score]
         
-        return f":{len(members)}\r\n"
\ No newline at end of file
+        return resp_encoder.encode_integer(len(members))
+
+class ZScanCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
+        sorted_set = keyspace.lookup(handler, command[1], CoolCacheSortedSet)
+        if sorted_set == WRONG_TYPE_RESPONSE:
+            return WRONG_TYPE_RESPONSE
+        scores = None if sorted_set is None else sorted_set.scores
+        result = scan_utils.scan_members(handler, command, scores)
+        if isinstance(result, bytes):
+            return result
+        cursor, members = result
+        # Scores are sent as strings in both protocols, as Redis does for ZSCAN
+        reply = [item for member in members for item in (member, resp_encoder.format_double(scores[member]))]
+        return resp_encoder.encode_value([str(cursor), reply], handler.protocol)
@@ -0,0 +1,48 @@
+from typing import TYPE_CHECKING, List
+from app.commands.commands import RedisCommand, SyncRedisCommand
+from app.utils import resp_encoder
+
+if TYPE_CHECKING:
+    from app.AsyncHandler import AsyncRequestHandler
+
+QUEUED = b"+QUEUED\r\n"
+EXECABORT = b"-EXECABORT Transaction discarded because of previous errors.\r\n"
+
+
+class MultiCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
+        if handler.transaction is not None:
+            return b"-ERR MULTI calls can not be nested\r\n"
+        handler.begin_transaction()
+        return resp_encoder.OK
+
+class DiscardCommand(SyncRedisCommand):
+    def execute_sync(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
+        if handler.transaction is None:
+            return b"-ERR DISCARD without MULTI\r\n"
+        handler.end_transaction()
+        return resp_encoder.OK
+
+class ExecCommand(RedisCommand):
+    async def execute(self, handler: 'AsyncRequestHandler', command: List[str]) -> bytes:
+        if handler.transaction is None:
+            return b"-ERR EXEC without MULTI\r\n"
+        queued, failed, worker_id = handler.transaction, handler.transaction_failed, handler.transaction_worker
+        handler.end_transaction()
+        if failed:
+            return EXECABORT
+        if handler.router is not None and worker_id is not None and worker_id != handler.router.worker_id:
+            # Every key belongs to one other worker, so the whole transaction runs there
+            return await handler.router.forward_transaction(worker_id, [cmd for _, cmd in queued], handler.protocol, handler.db_index)
+        replies = []
+        for spec, cmd in queued:
+            # Synchronous commands run back to back without yielding to the loop, which is what makes the batch atomic
+            if spec.is_async:
+                replies.append(await spec.command.execute(handler, cmd))
+            elif spec.is_write:
+                replies.append(handler.execute_write(spec, cmd))
+            else:
+                replies.append(spec.command.execute_sync(handler, cmd))
+        # A SCAN cursor of another worker is answered there, once the local commands have all run
+        replies = [reply if isinstance(reply, bytes) else await reply for reply in replies]
+        return resp_encoder.array_prefix(len(replies)) + b"".join(replies)
@@ -1,19 +1,49 @@
 import argparse
 import asyncio
-import logging
-from app.AsyncServer import AsyncServer
-
-async def main() -> None:
-    global ping_count
-    ping_count = 0
-    
-    logging.basicConfig(level=logging.INFO)
+import os
+import signal
+import socket
+from typing import List
+from app.AsyncServer import DEFAULT_DATABASES, AsyncServer
+from app.ShardRouter import ShardRouter
+from app.utils.eviction import POLICIES
+from app.utils.lazyfree import LAZYFREE_THRESHOLD
+from app.utils.memory_utils import parse_memory
+from app.utils.logging_utils import LOG_LEVELS, configure_logging, server_logger
+
+def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Run the Async Redis-like server.")
-    parser.add_argument('--port', type=int, default=6379, help='Port to run the server on')
+    parser.add_argument('--port', type=int, default=6379, help='Port to run the server on, or 0 to disable TCP')
     parser.add_argument('--replicaof', type=str, default=None, help='Replicate data from a master server')
     parser.add_argument('--dir', type=str, default='', help='Path to the directory where the RDB file is stored')
     parser.add_argument('--dbfilename', type=str, default='', help='Name of the RDB file')
+    parser.add_argument('--bytes-mode', action='store_true', help='Store keys and values as raw bytes instead of decoded UTF-8 strings')
+    parser.add_argument('--unixsocket', type=str, default=None, help='Path of a unix domain socket to serve on, alongside TCP or instead of it with --port 0')
+    parser.add_argument('--loglevel', choices=LOG_LEVELS, default='info', help='Minimum level of log messages to emit')
+    parser.add_argument('--maxmemory', type=parse_memory, default=0, help='Estimated dataset size (e.g. 100mb) above which keys are evicted, per worker; 0 for no limit')
+    parser.add_argument('--maxmemory-policy', choices=POLICIES, default='noeviction', help='Which keys to evict when maxmemory is reached')
+    parser.add_argument('--lazyfree-threshold', type=int, default=LAZYFREE_THRESHOLD, help='Values with more elements than this are freed in the background by UNLINK, FLUSHALL ASYNC, expiry and eviction')
+    parser.add_argument('--keys-index', action='store_true', help='Keep keys sorted so KEYS patterns with a literal prefix only visit matching keys')
+    parser.add_argument('--databases', type=int, default=DEFAULT_DATABASES, help='Number of logical databases clients can SELECT')
+    parser.add_argument('--workers', type=int, default=1, help='Number of worker processes sharing the port, each owning a slice of the key space')
     args = parser.parse_args()
+    if not args.port and not args.unixsocket:
+        parser.error("--port 0 requires --unixsocket")
+    if args.databases < 1:
+        parser.error("--databases must be at least 1")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.workers > 1:
+        if args.replicaof:
+            parser.error("--workers cannot be combined with --replicaof")
+        if args.unixsocket:
+            # Only one process can listen on a socket path, so workers could not share it the way they share the port
+            parser.error("--workers cannot be combined with --unixsocket")
+        if not hasattr(os, "fork") or not hasattr(socket, "SO_REUSEPORT"):
+            parser.error("--workers needs os.fork and SO_REUSEPORT, which this platform does not provide")
+    return args
+
+async def serve(args: argparse.Namespace, router: ShardRouter = None) -> None:
     replica_server, replica_port = None, None
 
     if args.replicaof:
@@ -24,8 +54,51 @@ async def main() -> None:
         replica_port = int(replica_info[1])
         # Use replica_server and replica_port as needed
 
-    logging.basicConfig(level=logging.INFO)
-    await AsyncServer.create(port=args.port, replica_server=replica_server, replica_port=replica_port, dir=args.dir, dbfilename=args.dbfilename)
+    await AsyncServer.create(port=args.port, replica_server=replica_server, replica_port=replica_port, dir=args.dir, dbfilename=args.dbfilename, bytes_mode=args.bytes_mode, router=router, unixsocket=args.unixsocket, maxmemory=args.maxmemory, maxmemory_policy=args.maxmemory_policy, lazyfree_threshold=args.lazyfree_threshold, keys_index=args.keys_index, databases=args.databases)
+
+def run_workers(args: argparse.Namespace) -> None:
+    # The forwarding socketpairs must exist before forking so every worker inherits its ends
+    routers = ShardRouter.create_all(args.workers)
+    pids: List[int] = []
+    for router in routers:
+        pid = os.fork()
+        if pid == 0:
+            for other in routers:
+                if other is not router:
+                    for sock in other.own_sockets():
+                        sock.close()
+            try:
+                asyncio.run(serve(args, router))
+            except KeyboardInterrupt:
+                pass
+            finally:
+                os._exit(0)
+        pids.append(pid)
+
+    for router in routers:
+        for sock in router.own_sockets():
+            sock.close()
+
+    def stop_workers(signum, frame):
+        for pid in pids:
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop_workers)
+    signal.signal(signal.SIGTERM, stop_workers)
+    server_logger.info("Started %d workers: %s", len(pids), pids)
+    for pid in pids:
+        os.waitpid(pid, 0)
+
+def main() -> None:
+    args = parse_args()
+    configure_logging(args.loglevel)
+    if args.workers > 1:
+        run_workers(args)
+    else:
+        asyncio.run(serve(args))
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
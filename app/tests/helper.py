@@ -1,20 +1,79 @@
+import asyncio
+import threading
 import pytest
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, MagicMock
+from app.utils import clock
+from app.utils import keyspace
+from app.utils.keyspace import Database, KeyspaceStats
+from app.utils.lazyfree import LazyFreer
+from app.utils.scan_utils import SnapshotCursors
 
 from typing import TYPE_CHECKING, Any, List
 
 if TYPE_CHECKING:
     from app.AsyncHandler import AsyncRequestHandler
-import time
+
+@pytest.fixture
+def unix_server_path(tmp_path):
+    # A real server on a unix socket, with its event loop in a background thread for blocking clients
+    from app.AsyncServer import AsyncServer
+    path = str(tmp_path / "coolcache.sock")
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    server = asyncio.run_coroutine_threadsafe(AsyncServer(port=0, unixsocket=path).start_unix(), loop).result()
+    yield path
+
+    async def shutdown():
+        server.close()
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run_coroutine_threadsafe(shutdown(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+@pytest.fixture
+def frozen_clock():
+    # Stands in for the server's clock until the test ends; move it with advance()
+    frozen = clock.FrozenClock()
+    previous = clock.use_clock(frozen)
+    yield frozen
+    clock.use_clock(previous)
+
 
 @pytest.fixture
 def setup_handler():
     handler = AsyncMock()
-    handler.memory = {}
-    handler.expiration = {}
+    handler.stats = KeyspaceStats()
+    handler.lazyfree = LazyFreer()
+    handler.server.databases = [Database(index, handler.stats, handler.lazyfree) for index in range(16)]
+    handler.server.peak_memory = 0
+    handler.server.used_memory = lambda: keyspace.used_memory(handler.server.databases)
+    handler.server.router = None
+    handler.server.clients = {handler}
+
+    def select(index):
+        db = handler.server.databases[index]
+        handler.db_index = index
+        handler.memory, handler.expiration, handler.streamstore, handler.key_meta = db.memory, db.expiration, db.streamstore, db.key_meta
+
+    # The handler works on database 0, as a new connection does
+    handler.select = select
+    select(0)
+    handler.server.replication_db = 0
+    handler.protocol = 2
+    handler.server.scan_cursors = SnapshotCursors()
     handler.server.writers = []
     handler.server.numacks = 0
-    mock_writer = AsyncMock()
+    # Replica writers are written to synchronously; only WAIT drains them
+    mock_writer = MagicMock()
+    mock_writer.drain = AsyncMock()
+    mock_writer.transport.get_write_buffer_size.return_value = 0
     handler.server.writers = [mock_writer]
     return handler
 
@@ -22,7 +81,7 @@ def setup_handler():
 def get_keys_for_test(handler: 'AsyncRequestHandler', include_expired: bool = False) -> List[str]:
     keys = []
     for key in handler.memory.keys():
-        if include_expired or (key not in handler.expiration or not handler.expiration[key] or handler.expiration[key] >= time.time()):
+        if include_expired or (key not in handler.expiration or not handler.expiration[key] or handler.expiration[key] >= clock.now()):
             keys.append(key)
     return keys
 
@@ -0,0 +1,66 @@
+import asyncio
+import pytest
+from app.client.async_client import AsyncConnectionPool, AsyncCoolClient
+from app.tests.helper import unix_server_path
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_a_connection(unix_server_path):
+    async with AsyncCoolClient(unix_socket_path=unix_server_path, max_connections=1) as client:
+        await asyncio.gather(*[client.set_value(f"key{i}", str(i)) for i in range(200)])
+        values = await asyncio.gather(*[client.get_value(f"key{i}") for i in range(200)])
+        assert values == [str(i) for i in range(200)]
+        assert len(client.connection_pool.connections) == 1
+
+
+@pytest.mark.asyncio
+async def test_pool_opens_connections_while_busy(unix_server_path):
+    pool = AsyncConnectionPool(unix_socket_path=unix_server_path, max_connections=3)
+    client = AsyncCoolClient(connection_pool=pool)
+    assert await client.ping() == "PONG"
+    assert len(pool.connections) == 1
+    await asyncio.gather(*[client.ping() for _ in range(50)])
+    assert 1 <= len(pool.connections) <= 3
+    await client.close()
+    assert pool.connections == []
+
+
+@pytest.mark.asyncio
+async def test_blocking_read_does_not_hold_up_other_requests(unix_server_path):
+    async with AsyncCoolClient(unix_socket_path=unix_server_path, max_connections=1) as client:
+        reader = asyncio.create_task(client.send_command("XREAD BLOCK 0 STREAMS stream 0-0"))
+        await asyncio.sleep(0.05)
+        assert await client.xadd("stream", "1-1", "field", "value") == "1-1"
+        assert await asyncio.wait_for(reader, 5) == [["stream", [["1-1", ["field", "value"]]]]]
+
+
+@pytest.mark.asyncio
+async def test_async_pipeline_and_transaction(unix_server_path):
+    async with AsyncCoolClient(unix_socket_path=unix_server_path) as client:
+        async with client.pipeline(chunk_size=3) as pipe:
+            for i in range(10):
+                pipe.set_value(f"key{i}", str(i))
+            pipe.get_value("key7")
+            assert await pipe.execute() == ["OK"] * 10 + ["7"]
+
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.set_value("counter", "1").send_command("INCR counter")
+        assert await client.get_value("counter") == "2"
+
+        with pytest.raises(Exception, match="EXECABORT"):
+            await client.pipeline(transaction=True).send_command("NOSUCHCOMMAND").execute()
+
+
+@pytest.mark.asyncio
+async def test_requests_fail_when_the_server_goes_away(unix_server_path):
+    pool = AsyncConnectionPool(unix_socket_path=unix_server_path)
+    client = AsyncCoolClient(connection_pool=pool)
+    await client.ping()
+    connection = pool.connections[0]
+    connection.writer.transport.abort()
+    with pytest.raises(ConnectionError):
+        await connection.execute(["PING"])
+    # A closed connection is dropped and replaced on the next request
+    assert await client.ping() == "PONG"
+    assert pool.connections[0] is not connection
+    await client.close()
@@ -0,0 +1,40 @@
+import pytest
+from app.client.benchmark import LatencyHistogram, parse_args, parse_mix, run_benchmark
+from app.tests.helper import unix_server_path
+
+
+def test_histogram_percentiles_are_within_bucket_precision():
+    histogram = LatencyHistogram()
+    for value in range(1, 100001):
+        histogram.record(value)
+    assert histogram.percentile(50) == pytest.approx(50000, rel=1 / 64)
+    assert histogram.percentile(99) == pytest.approx(99000, rel=1 / 64)
+    assert histogram.percentile(99.9) == pytest.approx(99900, rel=1 / 64)
+    assert histogram.percentile(100) == 100000
+    assert len(histogram.counts) < 1200
+
+
+def test_histograms_merge_through_dicts():
+    first, second = LatencyHistogram(), LatencyHistogram()
+    first.record(10, 99)
+    second.record(5000)
+    first.merge(LatencyHistogram.from_dict(second.to_dict()))
+    assert first.total == 100 and first.min == 10 and first.max == 5000
+    assert first.percentile(99) == 10
+    assert first.percentile(100) == 5000
+
+
+def test_parse_mix():
+    assert parse_mix("set,GET") == {"set": 1, "get": 1}
+    assert parse_mix("set:1,get:9") == {"set": 1, "get": 9}
+    with pytest.raises(ValueError):
+        parse_mix("nosuch")
+
+
+def test_benchmark_run(unix_server_path):
+    args = parse_args(["--socket", unix_server_path, "-c", "4", "-n", "400", "-P", "8", "-t", "set:1,get:1,lpush,xadd"])
+    report = run_benchmark(args)
+    assert sum(stats["requests"] for stats in report["commands"].values()) == 400
+    assert all(stats["errors"] == 0 for stats in report["commands"].values())
+    assert report["ops_per_sec"] > 0
+    assert report["latency_us"]["p50"] <= report["latency_us"]["p99.9"] <= report["latency_us"]["max"]
@@ -1,7 +1,12 @@
 
 import pytest
+from unittest.mock import MagicMock
 from app.commands import commands, string_commands
-from app.tests.helper import get_key_value_for_test, get_keys_for_test, setup_handler
+from app.tests.helper import frozen_clock, get_key_value_for_test, get_keys_for_test, setup_handler
+from app.utils import keyspace, resp_encoder
+from app.utils.encoding_utils import RespReplyParser
+from app.utils.eviction import Evictor
+from app.utils.keyspace import KeyMetadata
 
 
 
@@ -9,13 +14,13 @@ from app.tests.helper import get_key_value_for_test, get_keys_for_test, setup_ha
 async def test_ping_command(setup_handler):
     command = commands.PingCommand()
     response = await command.execute(setup_handler, ["PING"])
-    assert response == "+PONG\r\n"
+    assert response == b"+PONG\r\n"
 
 @pytest.mark.asyncio
 async def test_echo_command(setup_handler):
     command = commands.EchoCommand()
     response = await command.execute(setup_handler, ["ECHO", "Hello"])
-    assert response == "+Hello\r\n"
+    assert response == b"+Hello\r\n"
     
     
 @pytest.mark.asyncio
@@ -32,8 +37,114 @@ async def test_del_command(setup_handler):
     response = await command.execute(handler, ["DEL", "key1", "key2"])
 
     # Check the response
-    assert response == ":2\r\n"
+    assert response == b":2\r\n"
     assert get_keys_for_test(handler) == ["key3"]
     assert get_key_value_for_test(handler, "key1") is None
     assert get_key_value_for_test(handler, "key2") is None
     assert get_key_value_for_test(handler, "key3") == "value3"
+
+
+def test_sync_commands_run_without_awaiting(setup_handler):
+    response = string_commands.SetCommand().execute_sync(setup_handler, ["SET", "key", "value"])
+    assert response == b"+OK\r\n"
+    response = string_commands.GetCommand().execute_sync(setup_handler, ["GET", "key"])
+    assert response == b"$5\r\nvalue\r\n"
+    assert isinstance(commands.PingCommand(), commands.SyncRedisCommand)
+    assert not isinstance(commands.WaitCommand(), commands.SyncRedisCommand)
+
+@pytest.mark.asyncio
+async def test_hello_command(setup_handler):
+    setup_handler.protocol = 2
+    setup_handler.client_name = None
+    setup_handler.replica_server = None
+    command = commands.HelloCommand()
+
+    response = await command.execute(setup_handler, ["HELLO", "3", "SETNAME", "worker"])
+    assert response.startswith(b"%6\r\n$6\r\nserver\r\n$9\r\ncoolcache\r\n")
+    assert b"$5\r\nproto\r\n:3\r\n" in response
+    assert setup_handler.protocol == 3
+    assert setup_handler.client_name == "worker"
+
+    response = await command.execute(setup_handler, ["HELLO", "4"])
+    assert response == b"-NOPROTO unsupported protocol version\r\n"
+    assert setup_handler.protocol == 3
+
+    response = await command.execute(setup_handler, ["HELLO", "2"])
+    assert response.startswith(b"*12\r\n")
+    assert setup_handler.protocol == 2
+
+
+@pytest.mark.asyncio
+async def test_memory_usage_and_stats(setup_handler):
+    handler = setup_handler
+    handler.protocol = 2
+    handler.memory["short"] = "x"
+    handler.memory["long"] = list(range(1000))
+    keyspace.record_writes(handler, ["short", "long"])
+    memory = commands.MemoryCommand()
+    usage = int(memory.execute_sync(handler, ["MEMORY", "USAGE", "long"])[1:-2])
+    exact = int(memory.execute_sync(handler, ["MEMORY", "USAGE", "long", "SAMPLES", "0"])[1:-2])
+    assert usage == handler.key_meta.size_of("long") and abs(usage - exact) < exact // 10
+    assert memory.execute_sync(handler, ["MEMORY", "USAGE", "missing"]) == b"$-1\r\n"
+    assert memory.execute_sync(handler, ["MEMORY", "USAGE", "long", "SAMPLES", "x"]) == b"-ERR value is not an integer or out of range\r\n"
+    handler.protocol = 3
+    parser = RespReplyParser()
+    parser.feed(memory.execute_sync(handler, ["MEMORY", "STATS"]))
+    stats = parser.get_reply()
+    assert stats["keys.count"] == 2 and stats["total.allocated"] == handler.key_meta.used_memory
+    assert stats["list.bytes"] == usage and stats["string.bytes"] == handler.key_meta.size_of("short")
+
+
+@pytest.mark.asyncio
+async def test_info_memory(setup_handler):
+    handler = setup_handler
+    handler.server.evictor = Evictor(handler.server, 1024 * 1024, "allkeys-lru")
+    handler.memory["key"] = "value"
+    keyspace.record_writes(handler, ["key"])
+    info = commands.InfoCommand().execute_sync(handler, ["INFO", "memory"]).decode()
+    size = handler.key_meta.used_memory
+    assert f"\nused_memory:{size}\n" in info and f"\nused_memory_string:{size}\n" in info
+    assert "\nmaxmemory_human:1.00M\nmaxmemory_policy:allkeys-lru\n" in info
+
+
+@pytest.mark.asyncio
+async def test_keys_command(setup_handler, frozen_clock):
+    handler = setup_handler
+    for key in ("user:1", "user:2", "user:10", "session:1", "expired:1"):
+        handler.memory[key] = "value"
+    handler.streamstore["user:stream"] = {}
+    handler.expiration["expired:1"] = frozen_clock.now() - 1
+    keys = commands.KeysCommand()
+    assert sorted(keyspace.match_keys(handler, "*")) == ["session:1", "user:1", "user:10", "user:2", "user:stream"]
+    assert sorted(keyspace.match_keys(handler, "user:?")) == ["user:1", "user:2"]
+    assert keyspace.match_keys(handler, "expired:*") == []
+    assert keys.execute_sync(handler, ["KEYS", "session:1"]) == b"*1\r\n$9\r\nsession:1\r\n"
+    assert keys.execute_sync(handler, ["KEYS", "nothing*"]) == b"*0\r\n"
+
+
+@pytest.mark.asyncio
+async def test_keys_prefix_index(setup_handler):
+    handler = setup_handler
+    handler.key_meta = KeyMetadata(index=True)
+    for key in ("user:1", "user:2", "usex", "admin:1"):
+        handler.memory[key] = "value"
+    keyspace.record_writes(handler, list(handler.memory))
+    assert list(handler.key_meta.index) == ["admin:1", "user:1", "user:2", "usex"]
+    assert keyspace.match_keys(handler, "user:*") == ["user:1", "user:2"]
+    keyspace.delete_key(handler, "user:1")
+    assert keyspace.match_keys(handler, "user:*") == ["user:2"]
+    # A key dropped from the keyspace without its metadata is still filtered out
+    del handler.memory["user:2"]
+    assert keyspace.match_keys(handler, "us*") == ["usex"]
+
+
+@pytest.mark.asyncio
+async def test_bytes_mode_non_utf8_names_and_options_get_error_replies():
+    from app.AsyncHandler import AsyncRequestHandler
+    from app.AsyncServer import AsyncServer
+    writer = MagicMock()
+    writer.transport.get_write_buffer_limits.return_value = (0, 65536)
+    writer.transport.get_write_buffer_size.return_value = 0
+    handler = AsyncRequestHandler(MagicMock(), writer, AsyncServer(port=0, bytes_mode=True))
+    await handler.handle_request(resp_encoder.encode_array([b"\xff"]) + resp_encoder.encode_array([b"CONFIG", b"GET", b"\xff"]))
+    assert writer.write.call_args.args[0] == b"-ERR unknown command\r\n*0\r\n"
@@ -0,0 +1,65 @@
+import threading
+import time
+import pytest
+from app.client.connection_pool import ConnectionPool, PoolExhaustedError
+from app.client.coolcache_client import CoolClient
+from app.tests.helper import unix_server_path
+
+
+def test_connections_are_reused(unix_server_path):
+    pool = ConnectionPool(unix_socket_path=unix_server_path, max_connections=2)
+    with pool.connection() as connection:
+        assert connection.send_command(["SET", "key", "value"]) == "OK"
+    with pool.connection() as second:
+        assert second is connection
+        assert second.send_command(["GET", "key"]) == "value"
+    assert pool.created == 1
+
+
+def test_checkout_blocks_or_fails_when_exhausted(unix_server_path):
+    pool = ConnectionPool(unix_socket_path=unix_server_path, max_connections=1)
+    connection = pool.get_connection()
+    with pytest.raises(PoolExhaustedError):
+        pool.get_connection(block=False)
+    with pytest.raises(PoolExhaustedError):
+        pool.get_connection(timeout=0.05)
+    threading.Timer(0.05, pool.release, [connection]).start()
+    assert pool.get_connection(timeout=5) is connection
+
+
+def test_broken_and_idle_connections_are_replaced(unix_server_path):
+    pool = ConnectionPool(unix_socket_path=unix_server_path, idle_timeout=60)
+    connection = pool.get_connection()
+    connection.sock.close()
+    connection.sock = None
+    pool.release(connection)
+    assert pool.created == 0
+
+    first = pool.get_connection()
+    second = pool.get_connection()
+    pool.release(first)
+    pool.release(second)
+    first.last_used = time.monotonic() - 120
+    third = pool.get_connection()
+    assert third is second
+    assert pool.created == 1 and first.sock is None
+
+
+def test_client_shared_between_threads(unix_server_path):
+    client = CoolClient(unix_socket_path=unix_server_path, max_connections=4)
+    errors = []
+
+    def work(worker):
+        for i in range(50):
+            client.set_value(f"{worker}-{i}", str(i))
+            if client.get_value(f"{worker}-{i}") != str(i):
+                errors.append((worker, i))
+
+    threads = [threading.Thread(target=work, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert client.connection_pool.created <= 4
+    client.close()
@@ -0,0 +1,198 @@
+import io
+import pytest
+from unittest.mock import MagicMock
+from app.commands import commands, registry
+from app.tests.helper import frozen_clock
+from app.utils import keyspace, rdb_parser, rdb_writer, resp_encoder
+from app.utils.encoding_utils import RespParser
+from app.utils.rdb_parser import parse_redis_file
+
+
+def make_server(**kwargs):
+    from app.AsyncServer import AsyncServer
+    return AsyncServer(port=0, **kwargs)
+
+
+def connect(server):
+    from app.AsyncHandler import AsyncRequestHandler
+    writer = MagicMock()
+    writer.get_extra_info.return_value = ("127.0.0.1", 50000)
+    handler = AsyncRequestHandler(MagicMock(), writer, server)
+    server.clients.add(handler)
+    return handler
+
+
+def run(handler, *command):
+    spec = registry.lookup(command[0])
+    if spec.is_write:
+        return handler.execute_write(spec, list(command))
+    return spec.command.execute_sync(handler, list(command))
+
+
+@pytest.mark.asyncio
+async def test_select_switches_keyspace():
+    server = make_server(databases=4)
+    handler = connect(server)
+    assert run(handler, "SET", "key", "zero") == resp_encoder.OK
+    assert run(handler, "SELECT", "2") == resp_encoder.OK
+    assert run(handler, "GET", "key") == b"$-1\r\n"
+    run(handler, "SET", "key", "two")
+    assert run(handler, "SELECT", "0") == resp_encoder.OK
+    assert run(handler, "GET", "key") == b"$4\r\nzero\r\n"
+    assert run(handler, "SELECT", "4") == b"-ERR DB index is out of range\r\n"
+    assert run(handler, "SELECT", "one") == b"-ERR value is not an integer or out of range\r\n"
+    assert run(handler, "INFO", "keyspace") == resp_encoder.encode_bulk_string(
+        "# Keyspace\ndb0:keys=1,expires=0,avg_ttl=0\ndb2:keys=1,expires=0,avg_ttl=0")
+
+
+@pytest.mark.asyncio
+async def test_move_takes_value_and_ttl(frozen_clock):
+    server = make_server(databases=4)
+    handler = connect(server)
+    run(handler, "SET", "key", "value", "PX", "10000")
+    run(handler, "SET", "taken", "here")
+    assert run(handler, "MOVE", "key", "1") == b":1\r\n"
+    assert "key" not in handler.memory and "key" not in handler.key_meta
+    assert run(handler, "MOVE", "key", "1") == b":0\r\n"
+    assert run(handler, "MOVE", "taken", "0") == b"-ERR source and destination objects are the same\r\n"
+    run(handler, "SELECT", "1")
+    assert run(handler, "PTTL", "key") == b":10000\r\n"
+    assert handler.key_meta.size_of("key") > 0
+    run(handler, "SET", "taken", "there")
+    run(handler, "SELECT", "0")
+    assert run(handler, "MOVE", "taken", "1") == b":0\r\n"
+    assert run(handler, "GET", "taken") == b"$4\r\nhere\r\n"
+
+
+@pytest.mark.asyncio
+async def test_swapdb_is_seen_by_every_client():
+    server = make_server(databases=4)
+    first, second = connect(server), connect(server)
+    run(first, "SET", "key", "zero")
+    run(second, "SELECT", "1")
+    run(second, "SET", "key", "one")
+    run(second, "SET", "other", "one")
+    assert run(first, "SWAPDB", "0", "1") == resp_encoder.OK
+    assert run(first, "GET", "key") == b"$3\r\none\r\n"
+    assert run(second, "GET", "key") == b"$4\r\nzero\r\n"
+    assert sorted(keyspace.match_keys(first, "*")) == ["key", "other"]
+    assert run(first, "SWAPDB", "0", "9") == b"-ERR DB index is out of range\r\n"
+
+
+@pytest.mark.asyncio
+async def test_flushdb_only_empties_the_selected_database():
+    server = make_server(databases=4)
+    handler = connect(server)
+    for index in range(3):
+        run(handler, "SELECT", str(index))
+        run(handler, "SET", "key", str(index))
+    assert run(handler, "FLUSHDB", "ASYNC") == resp_encoder.OK
+    assert [len(db.memory) for db in server.databases] == [1, 1, 0, 0]
+    assert handler.key_meta.used_memory == 0
+    assert run(handler, "FLUSHALL") == resp_encoder.OK
+    assert [len(db.memory) for db in server.databases] == [0, 0, 0, 0]
+
+
+@pytest.mark.asyncio
+async def test_replication_selects_the_database_once():
+    server = make_server(databases=4)
+    handler = connect(server)
+    writer = MagicMock()
+    writer.transport.get_write_buffer_size.return_value = 0
+    server.writers.append(writer)
+    run(handler, "SELECT", "2")
+    run(handler, "SET", "key", "value")
+    assert writer.write.call_args.args[0] == resp_encoder.encode_array(["SELECT", "2"]) + resp_encoder.encode_array(["SET", "key", "value"])
+    run(handler, "SET", "key", "again")
+    assert writer.write.call_args.args[0] == resp_encoder.encode_array(["SET", "key", "again"])
+    # A replica that stops reading is dropped once its backlog passes the limit
+    writer.transport.get_write_buffer_size.return_value = commands.REPLICA_OUTPUT_BUFFER_LIMIT + 1
+    run(handler, "SET", "key", "lost")
+    assert server.writers == [] and writer.close.called
+
+
+@pytest.mark.asyncio
+async def test_replica_follows_swap_move_and_flush():
+    master, replica = make_server(databases=4), make_server(databases=4)
+    handler, replica_handler = connect(master), connect(replica)
+    writer = MagicMock()
+    writer.transport.get_write_buffer_size.return_value = 0
+    master.writers.append(writer)
+
+    def replicate():
+        # Applies everything propagated so far to the replica, as its master link would
+        parser = RespParser()
+        for call in writer.write.call_args_list:
+            for command in parser.feed(call.args[0])[0]:
+                run(replica_handler, *command)
+        writer.write.reset_mock()
+
+    run(handler, "SET", "key", "zero")
+    run(handler, "SET", "other", "zero")
+    run(handler, "SWAPDB", "0", "1")
+    run(handler, "SELECT", "1")
+    run(handler, "MOVE", "other", "2")
+    run(handler, "FLUSHDB")
+    replicate()
+    assert [dict(db.memory) for db in replica.databases] == [dict(db.memory) for db in master.databases] == [{}, {}, {"other": "zero"}, {}]
+    run(handler, "FLUSHALL", "ASYNC")
+    replicate()
+    assert all(not db.memory for db in replica.databases)
+
+
+@pytest.mark.asyncio
+async def test_eviction_covers_every_database():
+    server = make_server(databases=2, maxmemory_policy="allkeys-random")
+    handler = connect(server)
+    run(handler, "SELECT", "1")
+    for i in range(10):
+        run(handler, "SET", f"key{i}", "value")
+    server.evictor.maxmemory = handler.key_meta.used_memory // 2
+    run(handler, "SELECT", "0")
+    assert run(handler, "SET", "new", "value") == resp_encoder.OK
+    assert len(server.databases[1].memory) < 10 and server.stats.evicted > 0
+
+
+@pytest.mark.asyncio
+async def test_save_and_load_every_database(tmp_path, frozen_clock):
+    server = make_server(databases=4, dir=str(tmp_path), dbfilename="dump.rdb")
+    handler = connect(server)
+    run(handler, "SET", "string", "value")
+    run(handler, "SET", "volatile", "value", "PX", "5000")
+    run(handler, "RPUSH", "list", "a", "b", "a")
+    run(handler, "SELECT", "3")
+    run(handler, "SADD", "set", "x", "y")
+    run(handler, "HSET", "hash", "field", "value")
+    run(handler, "ZADD", "zset", "1.5", "one", "-2", "two")
+    assert run(handler, "SAVE") == resp_encoder.OK
+
+    loaded = parse_redis_file(tmp_path / "dump.rdb")
+    assert sorted(loaded) == [0, 3]
+    memory, expiration = loaded[0]
+    assert memory == {"string": "value", "volatile": "value", "list": ["a", "b", "a"]}
+    assert expiration == {"volatile": frozen_clock.now() + 5}
+    memory, expiration = loaded[3]
+    assert memory["set"] == {"x", "y"} and memory["hash"] == {"field": "value"} and expiration == {}
+    assert memory["zset"].scores == {"one": 1.5, "two": -2}
+
+    restored = make_server(databases=4)
+    restored.load_databases(loaded)
+    other = connect(restored)
+    restored.swap_databases(0, 3)
+    assert run(other, "ZSCORE", "zset", "one") == b"$3\r\n1.5\r\n"
+    assert other.key_meta.size_of("hash") > 0
+
+    frozen_clock.advance(10)
+    assert parse_redis_file(tmp_path / "dump.rdb")[0][0].keys() == {"string", "list"}
+
+
+def test_parser_reads_compact_encodings():
+    # 5 as a 7-bit int, "ab" as a short string and -1 as a 13-bit int, each followed by its length
+    listpack = bytes(6) + bytes([0x05, 1, 0x82]) + b"ab" + bytes([3, 0xDF, 0xFF, 2, 0xFF])
+    assert rdb_parser.parse_listpack(listpack) == [b"5", b"ab", b"-1"]
+    intset = (2).to_bytes(4, "little") + (2).to_bytes(4, "little") + (-3).to_bytes(2, "little", signed=True) + (7).to_bytes(2, "little")
+    assert rdb_parser.parse_intset(intset) == [b"-3", b"7"]
+    # A literal run of "abc" and then a three byte copy from three bytes back
+    assert rdb_parser.lzf_decompress(b"\x02abc\x20\x02", 6) == b"abcabc"
+    for length in (5, 300, 70000):
+        assert rdb_parser.read_length(io.BytesIO(rdb_writer.encode_length(length))) == (length, False)
@@ -0,0 +1,124 @@
+import pytest
+from app.utils.encoding_utils import INCOMPLETE, IncompleteReply, ProtocolError, PushMessage, RespParser, RespReplyParser, encode_redis_protocol, parse_element
+from app.utils import resp_encoder
+
+
+def test_resp_parser_single_command():
+    parser = RespParser()
+    commands, lengths = parser.feed(b"*3\r\n$3\r\nSET\r\n$3\r\nkey\r\n$5\r\nvalue\r\n")
+    assert commands == [["SET", "key", "value"]]
+    assert lengths == [33]
+    assert parser.buffer == b""
+
+
+def test_resp_parser_pipelined_commands():
+    parser = RespParser()
+    data = encode_redis_protocol(["SET", "a", "1"]) + encode_redis_protocol(["GET", "a"]) + encode_redis_protocol(["PING"])
+    commands, lengths = parser.feed(data)
+    assert commands == [["SET", "a", "1"], ["GET", "a"], ["PING"]]
+    assert sum(lengths) == len(data)
+
+
+def test_resp_parser_frames_split_across_reads():
+    parser = RespParser()
+    data = encode_redis_protocol(["SET", "key", "value"]) + encode_redis_protocol(["GET", "key"])
+    received = []
+    for i in range(len(data)):
+        commands, _ = parser.feed(data[i:i + 1])
+        received.extend(commands)
+    assert received == [["SET", "key", "value"], ["GET", "key"]]
+    assert parser.buffer == b""
+
+
+def test_resp_parser_values_containing_crlf():
+    parser = RespParser()
+    commands, _ = parser.feed(b"*3\r\n$3\r\nSET\r\n$3\r\nkey\r\n$7\r\nab\r\ncd\n\r\n")
+    assert commands == [["SET", "key", "ab\r\ncd\n"]]
+
+
+def test_resp_parser_keeps_partial_frame():
+    parser = RespParser()
+    commands, _ = parser.feed(b"*2\r\n$3\r\nGET\r\n$3\r\nke")
+    assert commands == []
+    commands, lengths = parser.feed(b"y\r\n*1\r\n$4\r\nPI")
+    assert commands == [["GET", "key"]]
+    assert lengths == [22]
+    commands, _ = parser.feed(b"NG\r\n")
+    assert commands == [["PING"]]
+
+
+def test_resp_parser_skips_replication_preamble():
+    parser = RespParser()
+    rdb = b"REDIS0011\xfa\x00*\r\n\xff"
+    data = b"+FULLRESYNC abc 0\r\n$" + str(len(rdb)).encode() + b"\r\n" + rdb + encode_redis_protocol(["SET", "k", "v"])
+    commands, lengths = parser.feed(data)
+    assert commands == [["SET", "k", "v"]]
+    assert lengths == [len(encode_redis_protocol(["SET", "k", "v"]))]
+
+
+def test_resp_parser_bytes_mode():
+    parser = RespParser(decode=False)
+    commands, _ = parser.feed(b"*2\r\n$3\r\nGET\r\n$2\r\n\xff\x00\r\n")
+    assert commands == [[b"GET", b"\xff\x00"]]
+
+
+def test_resp_parser_inline_commands():
+    parser = RespParser(inline=True)
+    commands, lengths = parser.feed(b"PING\r\n\r\nSET  key value\r\n" + encode_redis_protocol(["GET", "key"]))
+    assert commands == [["PING"], ["SET", "key", "value"], ["GET", "key"]]
+    assert lengths[:2] == [6, 16]
+
+
+def test_resp_parser_rejects_invalid_utf8():
+    parser = RespParser()
+    with pytest.raises(ProtocolError, match="UTF-8"):
+        parser.feed(b"*2\r\n$3\r\nGET\r\n$1\r\n\xff\r\n")
+
+
+def test_resp_parser_invalid_length():
+    parser = RespParser()
+    with pytest.raises(ProtocolError):
+        parser.feed(b"*x\r\n")
+
+
+def test_parse_element_resp3_types():
+    assert parse_element(b"%2\r\n$1\r\na\r\n:1\r\n$1\r\nb\r\n,2.5\r\n", 0) == ({"a": 1, "b": 2.5}, 28)
+    assert parse_element(b"~2\r\n$1\r\nx\r\n$1\r\ny\r\n", 0)[0] == {"x", "y"}
+    assert parse_element(b"_\r\n", 0) == ("(nil)", 3)
+    assert parse_element(b"#f\r\n", 0) == (False, 4)
+    assert parse_element(b",-inf\r\n", 0)[0] == float("-inf")
+    push, _ = parse_element(b">2\r\n$10\r\ninvalidate\r\n*1\r\n$3\r\nkey\r\n", 0)
+    assert isinstance(push, PushMessage) and push == ["invalidate", ["key"]]
+    # Attributes, empty or not, are dropped in front of the value they describe
+    assert parse_element(b"*2\r\n|0\r\n:1\r\n:2\r\n", 0) == ([1, 2], 16)
+    assert parse_element(b"|1\r\n+ttl\r\n:3\r\n:4\r\n", 0) == (4, 18)
+
+
+def test_parse_element_deeply_nested():
+    depth = 10000
+    data = b"*1\r\n" * depth + b":1\r\n"
+    value, index = parse_element(data, 0)
+    assert index == len(data)
+    for _ in range(depth):
+        value = value[0]
+    assert value == 1
+
+
+def test_parse_element_incomplete():
+    with pytest.raises(IncompleteReply):
+        parse_element(b"*2\r\n$3\r\nabc\r\n$3\r\nde", 0)
+
+
+def test_reply_parser_across_chunks():
+    parser = RespReplyParser()
+    large = resp_encoder.encode_array([f"field{i}" for i in range(1000)])
+    data = large + resp_encoder.OK + resp_encoder.encode_map({"a": "b"}, 3)
+    replies = []
+    for i in range(0, len(data), 7):
+        parser.feed(data[i:i + 7])
+        reply = parser.get_reply()
+        while reply is not INCOMPLETE:
+            replies.append(reply)
+            reply = parser.get_reply()
+    assert replies == [[f"field{i}" for i in range(1000)], "OK", {"a": "b"}]
+    assert parser.buffer == b""
@@ -0,0 +1,157 @@
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from app.commands import registry
+from app.tests.helper import frozen_clock, setup_handler
+from app.utils import eviction, keyspace, memory_utils
+from app.utils.eviction import Evictor
+from app.utils.keyspace import Database, KeyMetadata, KeyspaceStats
+from app.utils.lazyfree import LazyFreer
+
+
+def make_server(maxmemory, policy, keys=0):
+    # A server with one database, which tests read through the server's own attributes
+    stats, lazyfree = KeyspaceStats(), LazyFreer()
+    db = Database(0, stats, lazyfree)
+    server = SimpleNamespace(databases=[db], stats=stats, lazyfree=lazyfree, memory=db.memory, expiration=db.expiration, streamstore=db.streamstore, key_meta=db.key_meta)
+    server.evictor = Evictor(server, maxmemory, policy)
+    for i in range(keys):
+        write(server, f"key{i}", "value")
+    return server
+
+
+def write(server, key, value):
+    server.memory[key] = value
+    keyspace.record_writes(server, [key])
+
+
+def test_parse_memory():
+    assert memory_utils.parse_memory("100") == 100
+    assert memory_utils.parse_memory("5k") == 5000
+    assert memory_utils.parse_memory("100mb") == 100 * 1024 * 1024
+    assert memory_utils.parse_memory("1GB") == 1024 ** 3
+    with pytest.raises(ValueError):
+        memory_utils.parse_memory("10 parsecs")
+
+
+def test_estimates_scale_samples_to_the_container():
+    small = memory_utils.sizeof(list(range(10)))
+    large = memory_utils.sizeof(list(range(1000)))
+    assert large > 50 * small
+    assert memory_utils.estimate_size("key", "value") > memory_utils.sizeof("value")
+
+
+def test_used_memory_follows_writes_and_deletes():
+    server = make_server(0, "noeviction", keys=3)
+    sizes = [server.key_meta.size_of(f"key{i}") for i in range(3)]
+    assert server.key_meta.used_memory == sum(sizes) > 0
+    write(server, "key0", "a much longer value than before")
+    assert server.key_meta.size_of("key0") > sizes[0]
+    write(server, "key1", ["a", "list", "now"])
+    assert server.key_meta.type_memory[1] == server.key_meta.size_of("key1")
+    keyspace.delete_key(server, "key0")
+    assert server.key_meta.type_memory[0] == sizes[2]
+    assert server.key_meta.used_memory == server.key_meta.size_of("key1") + sizes[2]
+
+
+def test_noeviction_refuses_writes_over_the_limit():
+    server = make_server(1, "noeviction", keys=2)
+    assert not server.evictor.make_room()
+    assert len(server.memory) == 2 and server.stats.evicted == 0
+
+
+def test_allkeys_lru_evicts_idle_keys(frozen_clock):
+    server = make_server(0, "allkeys-lru", keys=50)
+    frozen_clock.advance(100)
+    for i in range(25, 50):
+        keyspace.lookup(server, f"key{i}")
+    server.evictor.maxmemory = server.key_meta.used_memory * 3 // 4
+    assert server.evictor.make_room()
+    assert server.key_meta.used_memory <= server.evictor.maxmemory
+    # Sampling is approximate, but a recently used key is only taken after every idle key in the pool
+    recent = sum(f"key{i}" in server.memory for i in range(25, 50))
+    assert recent > 20 and server.stats.evicted >= 12
+
+
+def test_allkeys_lfu_keeps_frequently_used_keys(frozen_clock):
+    server = make_server(0, "allkeys-lfu", keys=50)
+    for _ in range(200):
+        for i in range(25, 50):
+            keyspace.lookup(server, f"key{i}")
+    assert keyspace.lfu_counter(server.key_meta["key30"] & keyspace.ACCESS_MASK) > keyspace.LFU_INIT_VAL
+    server.evictor.maxmemory = server.key_meta.used_memory * 3 // 4
+    assert server.evictor.make_room()
+    assert sum(f"key{i}" in server.memory for i in range(25, 50)) > 20
+
+
+def test_lfu_counters_decay(frozen_clock):
+    meta = KeyMetadata()
+    meta.set_policy(lfu=True)
+    meta.record_size("key", 10)
+    assert keyspace.lfu_counter(meta["key"] & keyspace.ACCESS_MASK) == keyspace.LFU_INIT_VAL
+    frozen_clock.advance(3 * 60)
+    assert keyspace.lfu_counter(meta["key"] & keyspace.ACCESS_MASK) == keyspace.LFU_INIT_VAL - 3
+
+
+def test_samples_come_from_live_slots():
+    server = make_server(0, "allkeys-random", keys=3000)
+    # Emptying the first block frees it, and moves its last keys to the end
+    for i in range(800):
+        keyspace.delete_key(server, f"key{i}")
+    slots = server.key_meta.slots
+    assert slots.blocks[0] is None and 0 not in slots.occupied
+    write(server, "new", "value")
+    sampled = set()
+    for _ in range(2000):
+        sampled.update(slots.sample(5))
+    assert sampled <= set(server.memory) and "new" in sampled
+    slots.clear()
+    assert slots.sample(5) == []
+
+
+def test_volatile_policies_only_evict_keys_with_a_ttl(frozen_clock):
+    for policy in ("volatile-lru", "volatile-lfu", "volatile-random", "volatile-ttl"):
+        server = make_server(0, policy, keys=10)
+        for i in range(3):
+            keyspace.set_expiry(server, f"key{i}", frozen_clock.now() + 100 - i)
+        server.evictor.maxmemory = 1
+        assert not server.evictor.make_room()
+        assert sorted(server.memory) == sorted(f"key{i}" for i in range(3, 10))
+        assert server.stats.evicted == 3
+
+
+def test_volatile_ttl_evicts_soonest_expiring_first(frozen_clock):
+    server = make_server(0, "volatile-ttl", keys=4)
+    for i, ttl in enumerate((30, 10, 20)):
+        keyspace.set_expiry(server, f"key{i}", frozen_clock.now() + ttl)
+    server.expiration["key1"] = frozen_clock.now() + 40
+    server.evictor.maxmemory = server.key_meta.used_memory - 1
+    assert server.evictor.make_room()
+    assert "key2" not in server.memory and len(server.memory) == 3
+
+
+def test_config_set_changes_the_limit_and_policy(setup_handler):
+    handler = setup_handler
+    handler.server.config = {}
+    handler.server.evictor = Evictor(handler.server)
+    config = registry.lookup("CONFIG").command
+    assert config.execute_sync(handler, ["CONFIG", "SET", "maxmemory", "1mb", "maxmemory-policy", "allkeys-lfu"]) == b"+OK\r\n"
+    assert handler.server.evictor.maxmemory == 1024 * 1024 and handler.key_meta.lfu
+    assert handler.server.config == {"maxmemory": "1048576", "maxmemory-policy": "allkeys-lfu"}
+    assert config.execute_sync(handler, ["CONFIG", "SET", "maxmemory-policy", "mostly-lru"]).startswith(b"-ERR CONFIG SET failed")
+
+
+@pytest.mark.asyncio
+async def test_denyoom_writes_fail_under_noeviction():
+    from app.AsyncServer import AsyncServer
+    from app.AsyncHandler import AsyncRequestHandler
+    server = AsyncServer(port=0, maxmemory=1)
+    writer = MagicMock()
+    writer.get_extra_info.return_value = ("127.0.0.1", 50000)
+    handler = AsyncRequestHandler(MagicMock(), writer, server)
+    spec = registry.lookup("SET")
+    assert handler.execute_write(spec, ["SET", "a", "1"]) == b"+OK\r\n"
+    assert handler.execute_write(spec, ["SET", "b", "2"]) == eviction.OOM_RESPONSE
+    # Commands that only shrink the dataset still run
+    assert handler.execute_write(registry.lookup("DEL"), ["DEL", "a"]) == b":1\r\n"
+    assert server.databases[0].key_meta.used_memory == 0
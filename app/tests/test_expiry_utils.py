@@ -0,0 +1,73 @@
+import time
+from types import SimpleNamespace
+from app.utils import expiry_utils
+from app.utils.expiry_utils import ActiveExpirer, ExpiryIndex
+from app.utils.keyspace import Database, KeyspaceStats
+from app.utils.lazyfree import LazyFreer
+
+
+def make_server(expired=0, live=0, persistent=0):
+    stats, lazyfree = KeyspaceStats(), LazyFreer()
+    db = Database(0, stats, lazyfree)
+    server = SimpleNamespace(databases=[db], memory=db.memory, expiration=db.expiration, stats=stats, lazyfree=lazyfree)
+    now = time.time()
+    for i in range(expired):
+        server.memory[f"expired{i}"] = "value"
+        server.expiration[f"expired{i}"] = now - 1 - i
+    for i in range(live):
+        server.memory[f"live{i}"] = "value"
+        server.expiration[f"live{i}"] = now + 100
+    for i in range(persistent):
+        server.memory[f"persistent{i}"] = "value"
+    return server
+
+
+def test_index_holds_only_keys_with_a_ttl():
+    index = ExpiryIndex({"a": 10.0, "b": None})
+    index["c"] = 5.0
+    index["c"] = None
+    assert dict(index) == {"a": 10.0}
+    assert index.get("b") is None and "c" not in index
+
+
+def test_pop_due_skips_stale_entries():
+    index = ExpiryIndex()
+    index["a"] = 5.0
+    index["b"] = 1.0
+    index["a"] = 50.0
+    index.pop("b")
+    index["c"] = 2.0
+    assert index.pop_due(10.0, 10) == ["c"]
+    assert index.pop_due(100.0, 10) == ["a"]
+    assert len(index) == 0 and index.heap == []
+
+
+def test_pop_due_returns_earliest_first_up_to_limit():
+    index = ExpiryIndex({f"key{i}": float(i) for i in range(10)})
+    assert index.pop_due(5.0, 3) == ["key0", "key1", "key2"]
+    assert index.pop_due(5.0, 10) == ["key3", "key4"]
+    assert sorted(index) == [f"key{i}" for i in range(5, 10)]
+
+
+def test_heap_is_compacted_when_ttls_are_rewritten():
+    index = ExpiryIndex()
+    for i in range(10000):
+        index["key"] = float(i)
+    assert len(index.heap) <= expiry_utils.COMPACT_MIN_SIZE + 1
+    assert index.pop_due(20000.0, 10) == ["key"]
+
+
+def test_cycle_removes_only_expired_keys():
+    server = make_server(expired=500, live=10, persistent=10)
+    assert ActiveExpirer(server).run_cycle() == 500
+    assert len(server.memory) == 20
+    assert sorted(server.expiration) == sorted(f"live{i}" for i in range(10))
+
+
+def test_cycle_respects_time_budget():
+    server = make_server(expired=10000)
+    expirer = ActiveExpirer(server, time_budget=0)
+    assert expirer.run_cycle() == expiry_utils.KEYS_PER_LOOP
+    # The rest are due and are taken by the following cycles
+    assert ActiveExpirer(server).run_cycle() == 10000 - expiry_utils.KEYS_PER_LOOP
+    assert server.memory == {}
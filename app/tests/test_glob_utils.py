@@ -0,0 +1,30 @@
+import pytest
+from app.utils.glob_utils import compile_glob, is_literal, literal_prefix
+
+
+@pytest.mark.parametrize("pattern,key,matches", [
+    ("h?llo", "hello", True),
+    ("h?llo", "hllo", False),
+    ("h*llo", "heeeello", True),
+    ("h[ae]llo", "hallo", True),
+    ("h[ae]llo", "hillo", False),
+    ("h[^e]llo", "hallo", True),
+    ("h[^e]llo", "hello", False),
+    ("h[a-b]llo", "hbllo", True),
+    ("a\\*b", "a*b", True),
+    ("a\\*b", "axb", False),
+    ("x.y", "xzy", False),
+    ("**x**", "abxcd", True),
+    ("*", "", True),
+])
+def test_compile_glob(pattern, key, matches):
+    assert compile_glob(pattern)(key) is matches
+    assert compile_glob(pattern.encode())(key.encode()) is matches
+
+
+def test_literal_prefix():
+    assert literal_prefix("user:*") == "user:"
+    assert literal_prefix("a\\*b*") == "a*b"
+    assert literal_prefix(b"ab?c") == b"ab"
+    assert literal_prefix("*") == ""
+    assert is_literal("user:1") and not is_literal("user:?")
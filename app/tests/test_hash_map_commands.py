@@ -1,6 +1,7 @@
 import pytest
 from app.commands import string_commands
-from app.commands.hash_map_commands import HGetAllCommand, HGetCommand, HSetCommand
+from app.commands.hash_map_commands import HGetAllCommand, HGetCommand, HScanCommand, HSetCommand
+from app.utils.encoding_utils import RespReplyParser
 from app.tests.helper import setup_handler,  get_key_value_for_test, get_keys_for_test, get_key_expiry_for_test
 from app.utils.constants import EMPTY_ARRAY_RESPONSE, NIL_RESPONSE, WRONG_TYPE_RESPONSE
 
@@ -10,13 +11,13 @@ async def test_hset_command(setup_handler):
     
     #test creating a new hash map
     response = await command.execute(setup_handler, ["HSET", "key", "field1", "value1", "field2", "value2"])
-    assert response == "+OK\r\n"
+    assert response == b"+OK\r\n"
     assert get_keys_for_test(setup_handler) == ["key"]
     assert get_key_value_for_test(setup_handler, "key") == {"field1": "value1", "field2": "value2"}
     
     #test overwriting in existing values
     response = await command.execute(setup_handler, ["HSET", "key", "field1", "value3", "field2", "value4"])
-    assert response == "+OK\r\n"
+    assert response == b"+OK\r\n"
     assert get_keys_for_test(setup_handler) == ["key"]
     assert get_key_value_for_test(setup_handler, "key") == {"field1": "value3", "field2": "value4"}
     
@@ -34,7 +35,13 @@ async def test_hgetall_command(setup_handler):
     #test getting all values from a hash map
     await set_command.execute(setup_handler, ["HSET", "key", "field1", "value1", "field2", "value2"])
     response = await get_command.execute(setup_handler, ["HGETALL", "key"])
-    assert response == "*4\r\n$6\r\nfield1\r\n$6\r\nvalue1\r\n$6\r\nfield2\r\n$6\r\nvalue2\r\n"
+    assert response == b"*4\r\n$6\r\nfield1\r\n$6\r\nvalue1\r\n$6\r\nfield2\r\n$6\r\nvalue2\r\n"
+
+    #test getting a native map after HELLO 3
+    setup_handler.protocol = 3
+    response = await get_command.execute(setup_handler, ["HGETALL", "key"])
+    assert response == b"%2\r\n$6\r\nfield1\r\n$6\r\nvalue1\r\n$6\r\nfield2\r\n$6\r\nvalue2\r\n"
+    setup_handler.protocol = 2
     
     #test getting all values from a hash map that doesn't exist
     response = await get_command.execute(setup_handler, ["HGETALL", "key2"])
@@ -53,7 +60,7 @@ async def test_hget_command(setup_handler):
     #test getting a value= from a hash map
     await set_command.execute(setup_handler, ["HSET", "key", "field1", "value1", "field2", "value2"])
     response = await get_command.execute(setup_handler, ["HGET", "key", "field1"])
-    assert response == "$6\r\nvalue1\r\n"
+    assert response == b"$6\r\nvalue1\r\n"
     
     #test getting a non existent value from a hash map
     response = await get_command.execute(setup_handler, ["HGET", "key", "field3"])
@@ -66,4 +73,22 @@ async def test_hget_command(setup_handler):
     #test getting a value from a hash map that is not a hash map
     await string_commands.SetCommand().execute(setup_handler, ["SET", "key", "value"])
     response = await get_command.execute(setup_handler, ["HGET", "key", "field1"])
-    assert response == WRONG_TYPE_RESPONSE
\ No newline at end of file
+    assert response == WRONG_TYPE_RESPONSE
+
+@pytest.mark.asyncio
+async def test_hscan_command(setup_handler):
+    handler = setup_handler
+    handler.protocol = 2
+    handler.memory["key"] = {f"field{i}": str(i) for i in range(300)}
+    handler.memory["string"] = "value"
+    command = HScanCommand()
+    items, cursor = [], "0"
+    while True:
+        parser = RespReplyParser()
+        parser.feed(command.execute_sync(handler, ["HSCAN", "key", cursor, "COUNT", "50"]))
+        cursor, page = parser.get_reply()
+        items.extend(page)
+        if cursor == "0":
+            break
+    assert dict(zip(items[::2], items[1::2])) == handler.memory["key"]
+    assert command.execute_sync(handler, ["HSCAN", "string", "0"]) == WRONG_TYPE_RESPONSE
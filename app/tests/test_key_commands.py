@@ -0,0 +1,188 @@
+import pytest
+from app.commands import commands, hash_map_commands, list_commands, registry, stream_commands, string_commands
+from app.tests.helper import frozen_clock, setup_handler
+from app.utils import clock, encoding_utils, keyspace
+
+
+def run(handler, *command):
+    return registry.lookup(command[0]).command.execute_sync(handler, list(command))
+
+
+@pytest.mark.asyncio
+async def test_expire_and_ttl(setup_handler, frozen_clock):
+    handler = setup_handler
+    assert run(handler, "TTL", "key") == b":-2\r\n"
+    assert run(handler, "EXPIRE", "key", "10") == b":0\r\n"
+    run(handler, "SET", "key", "value")
+    assert run(handler, "TTL", "key") == b":-1\r\n"
+    assert run(handler, "EXPIRE", "key", "10") == b":1\r\n"
+    assert run(handler, "TTL", "key") == b":10\r\n"
+    assert run(handler, "PTTL", "key") == b":10000\r\n"
+    frozen_clock.advance(2.4)
+    assert run(handler, "TTL", "key") == b":8\r\n"
+    assert run(handler, "PEXPIRE", "key", "500") == b":1\r\n"
+    assert run(handler, "PTTL", "key") == b":500\r\n"
+    frozen_clock.advance(0.501)
+    assert run(handler, "GET", "key") == b"$-1\r\n"
+    assert run(handler, "TTL", "key") == b":-2\r\n"
+
+
+@pytest.mark.asyncio
+async def test_expireat_and_expiretime(setup_handler, frozen_clock):
+    handler = setup_handler
+    run(handler, "SET", "key", "value")
+    at = int(frozen_clock.now()) + 100
+    assert run(handler, "EXPIREAT", "key", str(at)) == b":1\r\n"
+    assert run(handler, "EXPIRETIME", "key") == f":{at}\r\n".encode()
+    assert run(handler, "PEXPIRETIME", "key") == f":{at * 1000}\r\n".encode()
+    assert run(handler, "PEXPIREAT", "key", str(at * 1000 + 1500)) == b":1\r\n"
+    assert run(handler, "PTTL", "key") == b":101500\r\n"
+    # A time in the past deletes the key
+    assert run(handler, "EXPIREAT", "key", "1") == b":1\r\n"
+    assert "key" not in handler.memory and "key" not in handler.expiration
+
+
+@pytest.mark.asyncio
+async def test_expire_options(setup_handler, frozen_clock):
+    handler = setup_handler
+    run(handler, "SET", "key", "value")
+    assert run(handler, "EXPIRE", "key", "100", "XX") == b":0\r\n"
+    assert run(handler, "EXPIRE", "key", "100", "GT") == b":0\r\n"
+    assert run(handler, "EXPIRE", "key", "100", "LT") == b":1\r\n"
+    assert run(handler, "EXPIRE", "key", "50", "NX") == b":0\r\n"
+    assert run(handler, "EXPIRE", "key", "200", "LT") == b":0\r\n"
+    assert run(handler, "EXPIRE", "key", "200", "gt") == b":1\r\n"
+    assert run(handler, "EXPIRE", "key", "50", "XX", "LT") == b":1\r\n"
+    assert run(handler, "TTL", "key") == b":50\r\n"
+    assert run(handler, "EXPIRE", "key", "50", "NX", "XX").startswith(b"-ERR NX and XX")
+    assert run(handler, "EXPIRE", "key", "50", "GT", "LT").startswith(b"-ERR GT and LT")
+    assert run(handler, "EXPIRE", "key", "50", "SOON") == b"-ERR Unsupported option SOON\r\n"
+    assert run(handler, "EXPIRE", "key", "soon") == b"-ERR value is not an integer or out of range\r\n"
+
+
+@pytest.mark.asyncio
+async def test_persist_and_set_clear_ttl(setup_handler, frozen_clock):
+    handler = setup_handler
+    run(handler, "SET", "key", "value", "PX", "1000")
+    assert run(handler, "PERSIST", "key") == b":1\r\n"
+    assert run(handler, "PERSIST", "key") == b":0\r\n"
+    assert run(handler, "TTL", "key") == b":-1\r\n"
+    run(handler, "EXPIRE", "key", "10")
+    run(handler, "SET", "key", "other")
+    assert run(handler, "TTL", "key") == b":-1\r\n"
+
+
+@pytest.mark.asyncio
+async def test_ttl_applies_to_every_type(setup_handler, frozen_clock):
+    handler = setup_handler
+    run(handler, "RPUSH", "list", "a")
+    run(handler, "HSET", "hash", "field", "value")
+    run(handler, "SADD", "set", "member")
+    run(handler, "ZADD", "zset", "1", "member")
+    run(handler, "XADD", "stream", "1-1", "field", "value")
+    for key in ("list", "hash", "set", "zset", "stream"):
+        assert run(handler, "TYPE", key) == b"+" + key.encode() + b"\r\n"
+        assert run(handler, "EXPIRE", key, "1") == b":1\r\n"
+    frozen_clock.advance(2)
+    assert run(handler, "LLEN", "list") == b":0\r\n"
+    assert run(handler, "HGET", "hash", "field") == b"+nil\r\n"
+    assert run(handler, "SCARD", "set") == b":0\r\n"
+    assert run(handler, "ZCARD", "zset") == b":0\r\n"
+    assert run(handler, "TYPE", "stream") == b"+none\r\n"
+    assert handler.memory == {} and handler.streamstore == {} and len(handler.expiration) == 0
+
+
+@pytest.mark.asyncio
+async def test_del_does_not_count_expired_keys(setup_handler, frozen_clock):
+    handler = setup_handler
+    run(handler, "SET", "live", "value")
+    run(handler, "SET", "expired", "value", "PX", "10")
+    frozen_clock.advance(1)
+    assert run(handler, "DEL", "live", "expired", "missing") == b":1\r\n"
+
+
+def test_clock_is_cached_until_ticked():
+    real = clock.Clock()
+    previous = clock.use_clock(real)
+    try:
+        cached = clock.now()
+        assert clock.now() == cached
+        assert clock.tick() >= cached and clock.now() >= cached
+    finally:
+        clock.use_clock(previous)
+
+
+@pytest.mark.asyncio
+async def test_lookups_update_stats_and_access_fields(setup_handler, frozen_clock):
+    handler = setup_handler
+    run(handler, "SET", "key", "value")
+    keyspace.record_writes(handler, ["key"])
+    run(handler, "RPUSH", "list", "a")
+    run(handler, "GET", "key")
+    run(handler, "GET", "missing")
+    assert run(handler, "LLEN", "key") == b"-WRONGTYPE Operation against a key holding the wrong kind of value\r\n"
+    run(handler, "SET", "short", "value", "PX", "10")
+    frozen_clock.advance(1)
+    run(handler, "GET", "short")
+    # Only keys whose writes were recorded have metadata for lookups to update
+    assert list(handler.key_meta) == ["key"]
+    assert handler.key_meta["key"] & keyspace.ACCESS_MASK == int(frozen_clock.now() - 1) & keyspace.ACCESS_MASK
+    stats = handler.stats
+    assert (stats.hits, stats.expired) == (2, 1)
+    assert run(handler, "INFO", "stats") == b"$71\r\n# Stats\nkeyspace_hits:2\nkeyspace_misses:3\nexpired_keys:1\nevicted_keys:0\r\n"
+
+
+def scan_all(handler, *options, churn=None):
+    # Every key SCAN returns over a full iteration; churn runs between calls
+    cursor, seen = "0", []
+    while True:
+        response = run(handler, "SCAN", cursor, *options)
+        parser = encoding_utils.RespReplyParser()
+        parser.feed(response)
+        cursor, keys = parser.get_reply()
+        seen.extend(keys)
+        if cursor == "0":
+            return seen
+        if churn:
+            churn()
+
+
+@pytest.mark.asyncio
+async def test_scan_returns_every_key_present_throughout(setup_handler):
+    handler = setup_handler
+    handler.protocol = 2
+    for i in range(5000):
+        handler.memory[f"key{i}"] = "value"
+    keyspace.record_writes(handler, list(handler.memory))
+    added = iter(range(100000))
+
+    def churn():
+        # Deletes most of the oldest keys, which compacts their slot blocks, and adds new ones
+        for _ in range(150):
+            i = next(added)
+            if i % 10:
+                keyspace.delete_key(handler, f"key{i}")
+            if i % 3 == 0:
+                handler.memory[f"new{i}"] = "value"
+                keyspace.record_writes(handler, [f"new{i}"])
+
+    seen = set(scan_all(handler, "COUNT", "100", churn=churn))
+    survivors = {key for key in handler.memory if key.startswith("key")}
+    assert survivors <= seen
+
+
+@pytest.mark.asyncio
+async def test_scan_options(setup_handler, frozen_clock):
+    handler = setup_handler
+    handler.protocol = 2
+    handler.memory.update({"user:1": "a", "user:2": ["b"], "other": "c", "gone": "d"})
+    handler.streamstore["user:stream"] = {}
+    handler.expiration["gone"] = frozen_clock.now() - 1
+    keyspace.record_writes(handler, ["user:1", "user:2", "other", "gone", "user:stream"])
+    assert sorted(scan_all(handler)) == ["other", "user:1", "user:2", "user:stream"]
+    assert sorted(scan_all(handler, "MATCH", "user:*", "COUNT", "1")) == ["user:1", "user:2", "user:stream"]
+    assert scan_all(handler, "TYPE", "list") == ["user:2"]
+    assert scan_all(handler, "TYPE", "stream") == ["user:stream"]
+    assert run(handler, "SCAN", "x") == b"-ERR invalid cursor\r\n"
+    assert run(handler, "SCAN", "0", "COUNT") == b"-ERR syntax error\r\n"
+    assert run(handler, "SCAN", "0", "TYPE", "blob").startswith(b"-ERR unknown type name")
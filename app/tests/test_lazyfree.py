@@ -0,0 +1,67 @@
+import asyncio
+import pytest
+from app.commands import commands, registry
+from app.commands.sorted_set_commands import CoolCacheSortedSet
+from app.tests.helper import setup_handler
+from app.utils.lazyfree import LazyFreer
+
+
+async def drain(freer):
+    while freer.task is not None and not freer.task.done():
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_unlink_detaches_and_frees_in_background(setup_handler):
+    handler = setup_handler
+    handler.memory["big"] = big = set(range(5000))
+    handler.memory["small"] = "value"
+    handler.expiration["big"] = 1e12
+    unlink = registry.lookup("UNLINK").command
+    assert unlink.execute_sync(handler, ["UNLINK", "big", "small", "missing"]) == b":2\r\n"
+    assert handler.memory == {} and "big" not in handler.expiration
+    assert handler.lazyfree.pending() == 1 and len(big) == 5000
+    await drain(handler.lazyfree)
+    assert big == set() and handler.lazyfree.freed == 1
+
+
+@pytest.mark.asyncio
+async def test_nested_values_are_freed_in_chunks():
+    freer = LazyFreer(threshold=10)
+    zset = CoolCacheSortedSet()
+    for i in range(3000):
+        zset.data.add((float(i), str(i)))
+        zset.scores[str(i)] = float(i)
+    stream = {i: {j: ["field", "value"] for j in range(50)} for i in range(100)}
+    freer.free(zset)
+    freer.free(stream)
+    freer.free(list(range(5)))
+    assert freer.pending() == 2
+    await drain(freer)
+    assert len(zset.data) == 0 and stream == {}
+    assert freer.pending() == 0
+
+
+def test_small_values_and_no_loop_free_inline():
+    freer = LazyFreer()
+    freer.free(set(range(10 * freer.threshold)))
+    assert freer.pending() == 0
+
+
+@pytest.mark.asyncio
+async def test_flushall_async(setup_handler):
+    handler = setup_handler
+    for i in range(2000):
+        handler.memory[f"key{i}"] = str(i)
+        handler.expiration[f"key{i}"] = 1e12
+    handler.streamstore["stream"] = {1: {0: ["f", "v"]}}
+    flushall = commands.FlushAllCommand()
+    assert flushall.execute_sync(handler, ["FLUSHALL", "LAZY"]) == b"-ERR syntax error\r\n"
+    old_memory = handler.memory
+    assert flushall.execute_sync(handler, ["FLUSHALL", "ASYNC"]) == b"+OK\r\n"
+    assert handler.memory == {} and handler.streamstore == {} and len(handler.expiration) == 0
+    assert handler.expiration.heap == [] and handler.key_meta.used_memory == 0
+    # The flush itself only swaps in fresh dicts; the old ones are emptied in the background
+    assert handler.memory is handler.server.databases[0].memory and len(old_memory) == 2000
+    await drain(handler.lazyfree)
+    assert handler.lazyfree.pending() == 0 and old_memory == {}
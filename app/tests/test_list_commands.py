@@ -12,12 +12,12 @@ async def test_lpush_command(setup_handler):
     
     #push to non-existing list    
     response = await command.execute(setup_handler, ["LPUSH", "key", "value1", "value2"])
-    assert response == ":2\r\n"
+    assert response == b":2\r\n"
     assert setup_handler.memory["key"] == ["value2", "value1"]
     
     #push to existing list
     response = await command.execute(setup_handler, ["LPUSH", "key", "value3"])
-    assert response == ":3\r\n"
+    assert response == b":3\r\n"
     assert setup_handler.memory["key"] == ["value3", "value2", "value1"]
     
     #push to element that is not a list
@@ -41,9 +41,9 @@ async def test_lpushx_command(setup_handler):
     #push to existing list
     lpush_command = list_commands.LPushCommand()
     response = await lpush_command.execute(setup_handler, ["LPUSH", "key", "value1", "value2"])
-    assert response == ":2\r\n"
+    assert response == b":2\r\n"
     response = await command.execute(setup_handler, ["LPUSHX", "key", "value3"])
-    assert response == ":3\r\n"
+    assert response == b":3\r\n"
     assert setup_handler.memory["key"] == ["value3", "value2", "value1"]
     
     #push to element that is not a list
@@ -63,14 +63,14 @@ async def test_rpop_command(setup_handler):
     #pop from existing list
     lpush_command = list_commands.LPushCommand()
     response = await lpush_command.execute(setup_handler, ["LPUSH", "key", "value1", "value2"])
-    assert response == ":2\r\n"
+    assert response == b":2\r\n"
     response = await command.execute(setup_handler, ["RPOP", "key"])
-    assert response == "$6\r\nvalue1\r\n"
+    assert response == b"$6\r\nvalue1\r\n"
     assert setup_handler.memory["key"] == ["value2"]
     
     #pop from list with one element
     response = await command.execute(setup_handler, ["RPOP", "key"])
-    assert response == "$6\r\nvalue2\r\n"
+    assert response == b"$6\r\nvalue2\r\n"
     assert setup_handler.memory.get("key") == None
     
     #pop from element that is not a list
@@ -85,12 +85,12 @@ async def test_rpush_command(setup_handler):
     
     #push to non-existing list    
     response = await command.execute(setup_handler, ["RPUSH", "key", "value1", "value2"])
-    assert response == ":2\r\n"
+    assert response == b":2\r\n"
     assert setup_handler.memory["key"] == ["value1", "value2"]
     
     #push to existing list
     response = await command.execute(setup_handler, ["RPUSH", "key", "value3"])
-    assert response == ":3\r\n"
+    assert response == b":3\r\n"
     assert setup_handler.memory["key"] == ["value1", "value2", "value3"]
     
     #push to element that is not a list
@@ -114,9 +114,9 @@ async def test_rpushx_command(setup_handler):
     #push to existing list
     rpush_command = list_commands.RPushCommand()
     response = await rpush_command.execute(setup_handler, ["RPUSH", "key", "value1", "value2"])
-    assert response == ":2\r\n"
+    assert response == b":2\r\n"
     response = await command.execute(setup_handler, ["RPUSHX", "key", "value3"])
-    assert response == ":3\r\n"
+    assert response == b":3\r\n"
     assert setup_handler.memory["key"] == ["value1", "value2", "value3"]
     
     #push to element that is not a list
@@ -136,18 +136,18 @@ async def test_lrange_command(setup_handler):
     #range from existing list
     lpush_command = list_commands.LPushCommand()
     response = await lpush_command.execute(setup_handler, ["LPUSH", "key", "value1", "value2", "value3"])
-    assert response == ":3\r\n"
+    assert response == b":3\r\n"
     response = await command.execute(setup_handler, ["LRANGE", "key", "0", "-1"])
     print(response)
-    assert response == "*3\r\n$6\r\nvalue3\r\n$6\r\nvalue2\r\n$6\r\nvalue1\r\n"
+    assert response == b"*3\r\n$6\r\nvalue3\r\n$6\r\nvalue2\r\n$6\r\nvalue1\r\n"
     
     #range from existing list with start and stop
     response = await command.execute(setup_handler, ["LRANGE", "key", "0", "1"])
-    assert response == "*2\r\n$6\r\nvalue3\r\n$6\r\nvalue2\r\n"
+    assert response == b"*2\r\n$6\r\nvalue3\r\n$6\r\nvalue2\r\n"
     
     #range from existing list with negative stop
     response = await command.execute(setup_handler, ["LRANGE", "key", "0", "-2"])
-    assert response == "*2\r\n$6\r\nvalue3\r\n$6\r\nvalue2\r\n"
+    assert response == b"*2\r\n$6\r\nvalue3\r\n$6\r\nvalue2\r\n"
     
     #range from existing list with negative start and stop
     response = await command.execute(setup_handler, ["LRANGE", "key", "-1", "-2"])
@@ -155,7 +155,7 @@ async def test_lrange_command(setup_handler):
     
     #range from list with stop greater than length
     response = await command.execute(setup_handler, ["LRANGE", "key", "0", "10"])
-    assert response == "*3\r\n$6\r\nvalue3\r\n$6\r\nvalue2\r\n$6\r\nvalue1\r\n"
+    assert response == b"*3\r\n$6\r\nvalue3\r\n$6\r\nvalue2\r\n$6\r\nvalue1\r\n"
     
     #range from list with start greater than stop
     response = await command.execute(setup_handler, ["LRANGE", "key", "2", "1"])
@@ -178,13 +178,13 @@ async def test_lindex_command(setup_handler):
     #index from existing list
     lpush_command = list_commands.LPushCommand()
     response = await lpush_command.execute(setup_handler, ["LPUSH", "key", "value1", "value2", "value3"])
-    assert response == ":3\r\n"
+    assert response == b":3\r\n"
     response = await command.execute(setup_handler, ["LINDEX", "key", "0"])
-    assert response == "$6\r\nvalue3\r\n"
+    assert response == b"$6\r\nvalue3\r\n"
     
     #index from existing list with negative index
     response = await command.execute(setup_handler, ["LINDEX", "key", "-1"])
-    assert response == "$6\r\nvalue1\r\n"
+    assert response == b"$6\r\nvalue1\r\n"
     
     #index from existing list with index greater than length
     response = await command.execute(setup_handler, ["LINDEX", "key", "10"])
@@ -202,13 +202,13 @@ async def test_llen_command(setup_handler):
     
     #length of non-existing list
     response = await command.execute(setup_handler, ["LLEN", "key"])
-    assert response == ":0\r\n"
+    assert response == b":0\r\n"
     
     #length of existing list
     lpush_command = list_commands.LPushCommand()
     await lpush_command.execute(setup_handler, ["LPUSH", "key", "value1", "value2", "value3"])
     response = await command.execute(setup_handler, ["LLEN", "key"])
-    assert response == ":3\r\n"
+    assert response == b":3\r\n"
     
     #length of element that is not a list
     set_command = ["SET", "string_key", "value"]
@@ -227,14 +227,14 @@ async def test_lpop_command(setup_handler):
     #pop from existing list
     lpush_command = list_commands.LPushCommand()
     response = await lpush_command.execute(setup_handler, ["LPUSH", "key", "value1", "value2"])
-    assert response == ":2\r\n"
+    assert response == b":2\r\n"
     response = await command.execute(setup_handler, ["LPOP", "key"])
-    assert response == "$6\r\nvalue2\r\n"
+    assert response == b"$6\r\nvalue2\r\n"
     assert setup_handler.memory["key"] == ["value1"]
     
     #pop from list with one element
     response = await command.execute(setup_handler, ["LPOP", "key"])
-    assert response == "$6\r\nvalue1\r\n"
+    assert response == b"$6\r\nvalue1\r\n"
     assert setup_handler.memory.get("key") == None
     
     #pop from element that is not a list
@@ -255,14 +255,14 @@ async def test_lset_command(setup_handler):
     #set to existing list
     lpush_command = list_commands.LPushCommand()
     response = await lpush_command.execute(setup_handler, ["LPUSH", "key", "value1", "value2"])
-    assert response == ":2\r\n"
+    assert response == b":2\r\n"
     response = await command.execute(setup_handler, ["LSET", "key", "0", "value3"])
-    assert response == "+OK\r\n"
+    assert response == b"+OK\r\n"
     assert setup_handler.memory["key"] == ["value3", "value1"]
     
     #set to existing list with negative index
     response = await command.execute(setup_handler, ["LSET", "key", "-1", "value4"])
-    assert response == "+OK\r\n"
+    assert response == b"+OK\r\n"
     assert setup_handler.memory["key"] == ["value3", "value4"]
     
     #set to existing list with index greater than length
@@ -286,19 +286,19 @@ async def test_linsert_command(setup_handler):
     #insert to existing list
     lpush_command = list_commands.LPushCommand()
     response = await lpush_command.execute(setup_handler, ["LPUSH", "key", "value3", "value1"])
-    assert response == ":2\r\n"
+    assert response == b":2\r\n"
     response = await command.execute(setup_handler, ["LINSERT", "key", "BEFORE", "value3", "value2"])
-    assert response == ":3\r\n"
+    assert response == b":3\r\n"
     assert setup_handler.memory["key"] == ["value1", "value2", "value3"]
     
     #insert after last element
     response = await command.execute(setup_handler, ["LINSERT", "key", "AFTER", "value3", "value4"])
-    assert response == ":4\r\n"
+    assert response == b":4\r\n"
     assert setup_handler.memory["key"] == ["value1", "value2", "value3", "value4"]
     
     #insert before first element
     response = await command.execute(setup_handler, ["LINSERT", "key", "BEFORE", "value1", "value5"])
-    assert response == ":5\r\n"
+    assert response == b":5\r\n"
     assert setup_handler.memory["key"] == ["value5", "value1", "value2", "value3", "value4"]
     
     #insert after non-existing pivot
@@ -313,4 +313,19 @@ async def test_linsert_command(setup_handler):
     set_command = ["SET", "string_key", "value"]
     await string_commands.SetCommand().execute(setup_handler, set_command)
     response = await command.execute(setup_handler, ["LINSERT", "string_key", "AFTER", "value", "value"])
-    assert response == WRONG_TYPE_RESPONSE
\ No newline at end of file
+    assert response == WRONG_TYPE_RESPONSE
+
+@pytest.mark.asyncio
+async def test_list_commands_binary_values(setup_handler):
+    response = await list_commands.RPushCommand().execute(setup_handler, [b"RPUSH", b"key", b"\x00\x01", b"a\r\nb"])
+    assert response == b":2\r\n"
+    assert setup_handler.memory[b"key"] == [b"\x00\x01", b"a\r\nb"]
+
+    response = await list_commands.LRangeCommand().execute(setup_handler, [b"LRANGE", b"key", b"0", b"-1"])
+    assert response == b"*2\r\n$2\r\n\x00\x01\r\n$4\r\na\r\nb\r\n"
+
+    response = await list_commands.LInsertCommand().execute(setup_handler, [b"LINSERT", b"key", b"BEFORE", b"a\r\nb", b"\xff"])
+    assert response == b":3\r\n"
+
+    response = await list_commands.LPopCommand().execute(setup_handler, [b"LPOP", b"key"])
+    assert response == b"$2\r\n\x00\x01\r\n"
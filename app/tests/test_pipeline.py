@@ -0,0 +1,44 @@
+import pytest
+from app.client.coolcache_client import CoolClient
+from app.tests.helper import unix_server_path
+
+
+def test_pipeline_returns_replies_in_order(unix_server_path):
+    client = CoolClient(unix_socket_path=unix_server_path)
+    with client.pipeline(chunk_size=3) as pipe:
+        for i in range(10):
+            pipe.set_value(f"key{i}", str(i))
+        pipe.get_value("key7").get_value("missing")
+        replies = pipe.execute()
+    assert replies == ["OK"] * 10 + ["7", "(nil)"]
+    assert len(pipe) == 0
+
+
+def test_pipeline_executes_on_exit(unix_server_path):
+    client = CoolClient(unix_socket_path=unix_server_path)
+    with client.pipeline() as pipe:
+        pipe.set_value("key", "value")
+    assert client.get_value("key") == "value"
+
+
+def test_transaction(unix_server_path):
+    client = CoolClient(unix_socket_path=unix_server_path)
+    with client.pipeline(transaction=True) as pipe:
+        pipe.set_value("counter", "1").send_command("INCR counter")
+        assert pipe.execute() == ["OK", 2]
+
+    with pytest.raises(Exception, match="EXECABORT"):
+        with client.pipeline(transaction=True) as pipe:
+            pipe.set_value("counter", "5").send_command("NOSUCHCOMMAND")
+            pipe.execute()
+    assert client.get_value("counter") == "2"
+
+
+def test_transaction_commands_outside_multi(unix_server_path):
+    client = CoolClient(unix_socket_path=unix_server_path)
+    assert str(client.send_command("EXEC")) == "ERR EXEC without MULTI"
+    assert str(client.send_command("DISCARD")) == "ERR DISCARD without MULTI"
+    assert client.send_command("MULTI") == "OK"
+    assert client.set_value("key", "value") == "QUEUED"
+    assert client.send_command("DISCARD") == "OK"
+    assert client.get_value("key") == "(nil)"
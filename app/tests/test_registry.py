@@ -0,0 +1,37 @@
+import pytest
+from app.commands import registry
+from app.tests.helper import setup_handler
+
+
+def test_lookup_and_arity():
+    spec = registry.lookup("GET")
+    assert spec.check_arity(2)
+    assert not spec.check_arity(3)
+    spec = registry.lookup("SET")
+    assert not spec.check_arity(2)
+    assert spec.check_arity(5)
+    assert registry.lookup("NOSUCHCOMMAND") is None
+
+
+def test_get_keys():
+    assert registry.lookup("GET").get_keys(["GET", "key"]) == ["key"]
+    assert registry.lookup("MSET").get_keys(["MSET", "k1", "v1", "k2", "v2"]) == ["k1", "k2"]
+    assert registry.lookup("DEL").get_keys(["DEL", "k1", "k2", "k3"]) == ["k1", "k2", "k3"]
+    assert registry.lookup("SMOVE").get_keys(["SMOVE", "src", "dst", "member"]) == ["src", "dst"]
+    assert registry.lookup("PING").get_keys(["PING"]) == []
+
+
+@pytest.mark.asyncio
+async def test_command_command(setup_handler):
+    command = registry.CommandCommand()
+    response = await command.execute(setup_handler, ["COMMAND", "COUNT"])
+    assert response == b":%d\r\n" % len(registry.COMMAND_TABLE)
+
+    response = await command.execute(setup_handler, ["COMMAND", "INFO", "get", "nosuchcommand"])
+    assert response == b"*2\r\n*6\r\n$3\r\nget\r\n:2\r\n*1\r\n$8\r\nreadonly\r\n:1\r\n:1\r\n:1\r\n$-1\r\n"
+
+    response = await command.execute(setup_handler, ["COMMAND", "GETKEYS", "MSET", "k1", "v1", "k2", "v2"])
+    assert response == b"*2\r\n$2\r\nk1\r\n$2\r\nk2\r\n"
+
+    response = await command.execute(setup_handler, ["COMMAND", "GETKEYS", "PING"])
+    assert response == b"-ERR The command has no key arguments\r\n"
@@ -0,0 +1,49 @@
+from app.utils import resp_encoder
+
+
+def test_encode_integer():
+    assert resp_encoder.encode_integer(0) == b":0\r\n"
+    assert resp_encoder.encode_integer(-5) == b":-5\r\n"
+    assert resp_encoder.encode_integer(123456) == b":123456\r\n"
+
+
+def test_encode_bulk_string():
+    assert resp_encoder.encode_bulk_string("value") == b"$5\r\nvalue\r\n"
+    assert resp_encoder.encode_bulk_string("") == b"$0\r\n\r\n"
+    assert resp_encoder.encode_bulk_string(None) == resp_encoder.NULL_BULK_STRING
+    assert resp_encoder.encode_bulk_string("héllo") == b"$6\r\nh\xc3\xa9llo\r\n"
+    assert resp_encoder.encode_bulk_string(b"\x00" * 2000) == b"$2000\r\n" + b"\x00" * 2000 + b"\r\n"
+
+
+def test_encode_array():
+    assert resp_encoder.encode_array([]) == resp_encoder.EMPTY_ARRAY
+    assert resp_encoder.encode_array(["a", b"bc", None]) == b"*3\r\n$1\r\na\r\n$2\r\nbc\r\n$-1\r\n"
+    assert resp_encoder.encode_array(["a", None], 3) == b"*2\r\n$1\r\na\r\n_\r\n"
+    assert resp_encoder.encode_array({"x"}) == b"*1\r\n$1\r\nx\r\n"
+
+
+def test_encode_nested_array():
+    response = resp_encoder.encode_nested_array(["stream", [("1-0", ["field", "value"])], 7])
+    assert response == b"*3\r\n$6\r\nstream\r\n*1\r\n*2\r\n$3\r\n1-0\r\n*2\r\n$5\r\nfield\r\n$5\r\nvalue\r\n:7\r\n"
+
+
+def test_resp3_types_fall_back_to_resp2():
+    assert resp_encoder.encode_map({"a": "1"}, 3) == b"%1\r\n$1\r\na\r\n$1\r\n1\r\n"
+    assert resp_encoder.encode_map({"a": "1"}) == b"*2\r\n$1\r\na\r\n$1\r\n1\r\n"
+    assert resp_encoder.encode_set(["x"], 3) == b"~1\r\n$1\r\nx\r\n"
+    assert resp_encoder.encode_set(["x"]) == b"*1\r\n$1\r\nx\r\n"
+    assert resp_encoder.encode_null(3) == resp_encoder.NULL
+    assert resp_encoder.encode_null() == resp_encoder.NULL_BULK_STRING
+
+
+def test_encode_double():
+    assert resp_encoder.encode_double(1.5, 3) == b",1.5\r\n"
+    assert resp_encoder.encode_double(2.0, 3) == b",2\r\n"
+    assert resp_encoder.encode_double(float("-inf"), 3) == b",-inf\r\n"
+    assert resp_encoder.encode_double(0.1) == b"$3\r\n0.1\r\n"
+
+
+def test_encode_value_and_push():
+    response = resp_encoder.encode_value({"proto": 3, "modules": [], "score": 1.5, "missing": None}, 3)
+    assert response == b"%4\r\n$5\r\nproto\r\n:3\r\n$7\r\nmodules\r\n*0\r\n$5\r\nscore\r\n,1.5\r\n$7\r\nmissing\r\n_\r\n"
+    assert resp_encoder.encode_push(["invalidate", ["key"]]) == b">2\r\n$10\r\ninvalidate\r\n*1\r\n$3\r\nkey\r\n"
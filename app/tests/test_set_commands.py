@@ -3,8 +3,9 @@ import app.commands.set_commands as commands
 import app.commands.list_commands as list_commands
 from app.tests.helper import setup_handler
 from app.tests import helper
+from app.utils.scan_utils import SnapshotCursors
 from app.utils.constants import EMPTY_ARRAY_RESPONSE, WRONG_TYPE_RESPONSE
-from app.utils.encoding_utils import redis_array_to_list, redis_bulk_string_to_string
+from app.utils.encoding_utils import RespReplyParser, redis_array_to_list, redis_bulk_string_to_string
 
 @pytest.mark.asyncio
 async def test_sadd_command(setup_handler):
@@ -12,19 +13,19 @@ async def test_sadd_command(setup_handler):
     
     # Test adding a single value to an empty set
     response = await command.execute(setup_handler, ["SADD", "key", "value"])
-    assert response == ":1\r\n"
+    assert response == b":1\r\n"
     assert helper.get_keys_for_test(setup_handler) == ["key"]
     assert helper.get_key_value_for_test(setup_handler, "key") == {"value"}
     
     # Test adding multiple values to an existing set
     response = await command.execute(setup_handler, ["SADD", "key", "value1", "value2", "value3"])
-    assert response == ":3\r\n"
+    assert response == b":3\r\n"
     assert helper.get_keys_for_test(setup_handler) == ["key"]
     assert helper.get_key_value_for_test(setup_handler, "key") == {"value", "value1", "value2", "value3"}
     
     # Test adding a value that already exists in the set
     response = await command.execute(setup_handler, ["SADD", "key", "value1"])
-    assert response == ":0\r\n"
+    assert response == b":0\r\n"
     assert helper.get_keys_for_test(setup_handler) == ["key"]
     assert helper.get_key_value_for_test(setup_handler, "key") == {"value", "value1", "value2", "value3"}
     
@@ -65,19 +66,19 @@ async def test_srem_command(setup_handler):
     
     # Test removing a value from an empty set
     response = await command.execute(setup_handler, ["SREM", "key", "value"])
-    assert response == ":0\r\n"
+    assert response == b":0\r\n"
     
     # Test removing a value from a set
     sadd_command = commands.SAddCommand()
     await sadd_command.execute(setup_handler, ["SADD", "key", "value1", "value2", "value3"])
     response = await command.execute(setup_handler, ["SREM", "key", "value2"])
-    assert response == ":1\r\n"
+    assert response == b":1\r\n"
     assert helper.get_keys_for_test(setup_handler) == ["key"]
     assert helper.get_key_value_for_test(setup_handler, "key") == {"value1", "value3"}
     
     # Test removing a value that doesn't exist in the set
     response = await command.execute(setup_handler, ["SREM", "key", "value2"])
-    assert response == ":0\r\n"
+    assert response == b":0\r\n"
     assert helper.get_keys_for_test(setup_handler) == ["key"]
     assert helper.get_key_value_for_test(setup_handler, "key") == {"value1", "value3"}
     
@@ -95,17 +96,17 @@ async def test_sismember_command(setup_handler):
     
     # Test checking if a value is in an empty set
     response = await command.execute(setup_handler, ["SISMEMBER", "key", "value"])
-    assert response == ":0\r\n"
+    assert response == b":0\r\n"
     
     # Test checking if a value is in a set
     sadd_command = commands.SAddCommand()
     await sadd_command.execute(setup_handler, ["SADD", "key", "value1", "value2", "value3"])
     response = await command.execute(setup_handler, ["SISMEMBER", "key", "value2"])
-    assert response == ":1\r\n"
+    assert response == b":1\r\n"
     
     # Test checking if a value is not in a set
     response = await command.execute(setup_handler, ["SISMEMBER", "key", "value4"])
-    assert response == ":0\r\n"
+    assert response == b":0\r\n"
     
     # Test checking if a value is in a set that is not of type Set
     lpush_command = list_commands.LPushCommand()
@@ -120,13 +121,13 @@ async def test_scard_command(setup_handler):
     
     # Test getting the cardinality of an empty set
     response = await command.execute(setup_handler, ["SCARD", "key"])
-    assert response == ":0\r\n"
+    assert response == b":0\r\n"
     
     # Test getting the cardinality of a set
     sadd_command = commands.SAddCommand()
     await sadd_command.execute(setup_handler, ["SADD", "key", "value1", "value2", "value3"])
     response = await command.execute(setup_handler, ["SCARD", "key"])
-    assert response == ":3\r\n"
+    assert response == b":3\r\n"
     
     # Test getting the cardinality of a set that is not of type Set
     lpush_command = list_commands.LPushCommand()
@@ -140,7 +141,7 @@ async def test_spop_command(setup_handler):
     
     # Test popping a value from an empty set
     response = await command.execute(setup_handler, ["SPOP", "key"])
-    assert response == "$-1\r\n"
+    assert response == b"$-1\r\n"
     
     # Test popping a value from a set
     sadd_command = commands.SAddCommand()
@@ -174,7 +175,7 @@ async def test_sdiff_command(setup_handler):
     await sadd_command.execute(setup_handler, ["SADD", "key1", "value1", "value2", "value3"])
     await sadd_command.execute(setup_handler, ["SADD", "key2", "value2", "value3", "value4"])
     response = await command.execute(setup_handler, ["SDIFF", "key1", "key2"])
-    assert response == "*1\r\n$6\r\nvalue1\r\n"
+    assert response == b"*1\r\n$6\r\nvalue1\r\n"
     
     # Test getting the difference of two sets where one set is empty
     response = await command.execute(setup_handler, ["SDIFF", "key1", "key3"])
@@ -184,7 +185,7 @@ async def test_sdiff_command(setup_handler):
     # Test getting the difference of three sets
     await sadd_command.execute(setup_handler, ["SADD", "key3", "value3", "value4", "value5"])
     response = await command.execute(setup_handler, ["SDIFF", "key1", "key2", "key3"])
-    assert response == "*1\r\n$6\r\nvalue1\r\n"
+    assert response == b"*1\r\n$6\r\nvalue1\r\n"
     
     # Test getting the difference of two sets that are not of type Set
     lpush_command = list_commands.LPushCommand()
@@ -250,7 +251,7 @@ async def test_sinter_command(setup_handler):
     # Test getting the intersection of three sets
     await sadd_command.execute(setup_handler, ["SADD", "key3", "value3", "value4", "value5"])
     response = await command.execute(setup_handler, ["SINTER", "key1", "key2", "key3"])
-    assert response == "*1\r\n$6\r\nvalue3\r\n"
+    assert response == b"*1\r\n$6\r\nvalue3\r\n"
     
     # Test getting the intersection of two sets that are not of type Set
     lpush_command = list_commands.LPushCommand()
@@ -259,4 +260,87 @@ async def test_sinter_command(setup_handler):
     assert response == WRONG_TYPE_RESPONSE
     
     
-    
\ No newline at end of file
+    
+
+@pytest.mark.asyncio
+async def test_set_commands_binary_values(setup_handler):
+    response = await commands.SAddCommand().execute(setup_handler, [b"SADD", b"key", b"\xff\xfe", b"\xff\xfe", b"v"])
+    assert response == b":2\r\n"
+    assert setup_handler.memory[b"key"] == {b"\xff\xfe", b"v"}
+
+    response = await commands.SIsMemberCommand().execute(setup_handler, [b"SISMEMBER", b"key", b"\xff\xfe"])
+    assert response == b":1\r\n"
+
+    response = await commands.SRemCommand().execute(setup_handler, [b"SREM", b"key", b"v"])
+    assert response == b":1\r\n"
+
+    response = await commands.SMembersCommand().execute(setup_handler, [b"SMEMBERS", b"key"])
+    assert response == b"*1\r\n$2\r\n\xff\xfe\r\n"
+
+
+def read_scan(response):
+    parser = RespReplyParser()
+    parser.feed(response)
+    return parser.get_reply()
+
+
+@pytest.mark.asyncio
+async def test_sscan_command(setup_handler):
+    handler = setup_handler
+    handler.protocol = 2
+    handler.memory["small"] = {"a", "b", "c"}
+    handler.memory["large"] = {str(i) for i in range(1000)}
+    command = commands.SScanCommand()
+    cursor, members = read_scan(command.execute_sync(handler, ["SSCAN", "small", "0"]))
+    assert cursor == "0" and sorted(members) == ["a", "b", "c"]
+    seen = []
+    cursor = "0"
+    while True:
+        cursor, members = read_scan(command.execute_sync(handler, ["SSCAN", "large", cursor, "COUNT", "100", "MATCH", "1*"]))
+        seen.extend(members)
+        if cursor == "0":
+            break
+        # Members added or removed mid-iteration do not disturb the others
+        handler.memory["large"].discard("999")
+        handler.memory["large"].add(f"new{cursor}")
+    assert sorted(seen) == sorted(str(i) for i in range(1000) if str(i).startswith("1"))
+    assert command.execute_sync(handler, ["SSCAN", "large", "12345"]) == b"-ERR invalid cursor\r\n"
+    assert read_scan(command.execute_sync(handler, ["SSCAN", "missing", "0"])) == ["0", []]
+
+
+@pytest.mark.asyncio
+async def test_sscan_snapshots_are_bounded_by_elements(setup_handler):
+    handler = setup_handler
+    handler.protocol = 2
+    handler.server.scan_cursors = SnapshotCursors(max_elements=2500)
+    command = commands.SScanCommand()
+    cursors = []
+    for index in range(3):
+        handler.memory[f"set{index}"] = {str(i) for i in range(1000)}
+        cursors.append(read_scan(command.execute_sync(handler, ["SSCAN", f"set{index}", "0"]))[0])
+    # The third snapshot pushed the total over the budget, so the oldest was dropped
+    assert handler.server.scan_cursors.elements == 2000
+    assert command.execute_sync(handler, ["SSCAN", "set0", cursors[0]]) == b"-ERR invalid cursor\r\n"
+    assert read_scan(command.execute_sync(handler, ["SSCAN", "set2", cursors[2], "COUNT", "1000"]))[0] == "0"
+    assert handler.server.scan_cursors.elements == 1000
+
+
+@pytest.mark.asyncio
+async def test_sscan_pages_values_over_the_budget_without_a_snapshot(setup_handler):
+    handler = setup_handler
+    handler.protocol = 2
+    cursors = handler.server.scan_cursors = SnapshotCursors(max_elements=500)
+    handler.memory["large"] = {str(i) for i in range(1000)}
+    command = commands.SScanCommand()
+    seen, cursor, calls = set(), "0", 0
+    while True:
+        cursor, members = read_scan(command.execute_sync(handler, ["SSCAN", "large", cursor, "COUNT", "100"]))
+        assert not cursors.snapshots and cursors.elements == 0
+        seen.update(members)
+        calls += 1
+        if cursor == "0":
+            break
+        if calls == 3:
+            # A resize restarts the iteration, which may repeat members but never loses one
+            handler.memory["large"].add("new")
+    assert seen >= {str(i) for i in range(1000)} and not cursors.live
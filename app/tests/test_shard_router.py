@@ -0,0 +1,106 @@
+import asyncio
+import pytest
+from app.ShardRouter import ALL_WORKERS, CROSS_WORKER, ShardRouter, merge_array_replies, read_raw_reply
+from app.commands import registry
+from app.utils import slot_utils
+
+
+def test_key_hash_slot_matches_redis_cluster():
+    assert slot_utils.crc16(b"123456789") == 0x31C3
+    assert slot_utils.key_hash_slot("foo") == 12182
+    assert slot_utils.key_hash_slot(b"bar") == 5061
+
+
+def test_key_hash_slot_hash_tags():
+    assert slot_utils.key_hash_slot("{user1000}.following") == slot_utils.key_hash_slot("{user1000}.followers")
+    # An empty tag hashes the whole key
+    assert slot_utils.key_hash_slot("foo{}{bar}") == slot_utils.crc16(b"foo{}{bar}") % slot_utils.HASH_SLOTS
+
+
+def test_slot_ranges_partition_the_slots():
+    for num_workers in (1, 2, 3, 7):
+        slots = []
+        for worker_id in range(num_workers):
+            slot_range = slot_utils.slot_range(worker_id, num_workers)
+            assert all(slot_utils.slot_owner(slot, num_workers) == worker_id for slot in slot_range)
+            slots.extend(slot_range)
+        assert slots == list(range(slot_utils.HASH_SLOTS))
+
+
+def test_router_target():
+    router = ShardRouter(0, 2, {}, [])
+    assert router.target(["bar"]) == 0
+    assert router.target(["foo"]) == 1
+    assert router.target(["foo", "bar"]) == CROSS_WORKER
+    assert router.target(["{foo}a", "{foo}b"]) == 1
+    assert router.target([]) == 0
+    assert router.target([], all_shards=True) == ALL_WORKERS
+
+
+def test_xread_key_finder():
+    spec = registry.lookup("XREAD")
+    assert spec.get_keys(["XREAD", "BLOCK", "0", "STREAMS", "a", "b", "0-0", "0-1"]) == ["a", "b"]
+    assert spec.get_keys(["XREAD", "streams", "a", "$"]) == ["a"]
+
+
+def test_merge_array_replies():
+    assert merge_array_replies([b"*1\r\n$1\r\na\r\n", b"*0\r\n", b"*1\r\n$1\r\nb\r\n"]) == b"*2\r\n$1\r\na\r\n$1\r\nb\r\n"
+    assert merge_array_replies([b"+OK\r\n", b"+OK\r\n"]) == b"+OK\r\n"
+    assert merge_array_replies([b"+OK\r\n", b"-ERR failed\r\n"]) == b"-ERR failed\r\n"
+
+
+@pytest.mark.asyncio
+async def test_read_raw_reply():
+    reader = asyncio.StreamReader()
+    replies = [b"+OK\r\n", b"$5\r\nab\r\nc\r\n", b"$-1\r\n", b"*2\r\n*1\r\n:1\r\n$1\r\nx\r\n", b":42\r\n"]
+    reader.feed_data(b"".join(replies))
+    for reply in replies:
+        assert await read_raw_reply(reader) == reply
+
+
+@pytest.mark.asyncio
+async def test_scan_walks_every_worker():
+    from unittest.mock import MagicMock
+    from app.AsyncHandler import AsyncRequestHandler
+    from app.AsyncServer import AsyncServer
+    from app.utils import encoding_utils, keyspace
+
+    routers = ShardRouter.create_all(2)
+    servers = [AsyncServer(port=0, router=router) for router in routers]
+    for router, server in zip(routers, servers):
+        await router.start(server)
+    keys = [f"key{i}" for i in range(50)]
+    for key in keys:
+        db = servers[routers[0].owner(key)].databases[0]
+        db.memory[key] = "value"
+        keyspace.record_writes(db, [key])
+    assert all(server.databases[0].memory for server in servers)
+
+    writer = MagicMock()
+    writer.transport.get_write_buffer_limits.return_value = (0, 65536)
+    writer.transport.get_write_buffer_size.return_value = 0
+    handler = AsyncRequestHandler(MagicMock(), writer, servers[1])
+    cursor, seen = "0", []
+    while True:
+        # Pipelined with a local command, whose reply has to stay behind the forwarded one
+        await handler.handle_request(encoding_utils.encode_redis_protocol(["SCAN", cursor, "COUNT", "20"]) + encoding_utils.encode_redis_protocol(["PING"]))
+        assert writer.write.call_count == 1
+        reply = writer.write.call_args.args[0]
+        writer.write.reset_mock()
+        assert reply.endswith(b"+PONG\r\n")
+        parser = encoding_utils.RespReplyParser()
+        parser.feed(reply[:-len(b"+PONG\r\n")])
+        cursor, found = parser.get_reply()
+        seen.extend(found)
+        if cursor == "0":
+            break
+    assert sorted(seen) == sorted(keys)
+    await handler.handle_request(encoding_utils.encode_redis_protocol(["SCAN", str(2 << 48)]))
+    assert writer.write.call_args.args[0] == b"-ERR invalid cursor\r\n"
+
+    for router in routers:
+        for task in router.peer_tasks:
+            task.cancel()
+        for channel in router.shared_channels.values():
+            channel.writer.close()
+    await asyncio.gather(*(task for router in routers for task in router.peer_tasks), return_exceptions=True)
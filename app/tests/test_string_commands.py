@@ -1,16 +1,13 @@
-import datetime
-import time
-from freezegun import freeze_time
 import pytest
 from app.commands import list_commands, string_commands
-from app.tests.helper import setup_handler,  get_key_value_for_test, get_keys_for_test, get_key_expiry_for_test
+from app.tests.helper import frozen_clock, setup_handler,  get_key_value_for_test, get_keys_for_test, get_key_expiry_for_test
 from app.utils.constants import WRONG_TYPE_RESPONSE
 
 @pytest.mark.asyncio
 async def test_set_command(setup_handler):
     command = string_commands.SetCommand()
     response = await command.execute(setup_handler, ["SET", "key", "value"])
-    assert response == "+OK\r\n"
+    assert response == b"+OK\r\n"
     assert get_keys_for_test(setup_handler) == ["key"]
     assert get_key_value_for_test(setup_handler, "key") == "value"
     assert get_key_expiry_for_test(setup_handler, "key") is None
@@ -22,10 +19,10 @@ async def test_get_command(setup_handler):
     
     command = string_commands.GetCommand()
     response = await command.execute(setup_handler, ["GET", "key"])
-    assert response == "$5\r\nvalue\r\n"
+    assert response == b"$5\r\nvalue\r\n"
     
     response = await command.execute(setup_handler, ["GET", "nonexistent"])
-    assert response == "$-1\r\n"
+    assert response == b"$-1\r\n"
     
     lpush_command = list_commands.LPushCommand()
     await lpush_command.execute(setup_handler, ["LPUSH", "list", "value1"])
@@ -34,33 +31,32 @@ async def test_get_command(setup_handler):
 
 
 @pytest.mark.asyncio
-@freeze_time("2023-06-09 00:00:00 UTC")
-async def test_set_command_with_expiration(setup_handler):
+async def test_set_command_with_expiration(setup_handler, frozen_clock):
     handler = setup_handler
     command = string_commands.SetCommand()
     response = await command.execute(handler, ["SET", "key", "value", "PX", "5000"])
-    assert response == "+OK\r\n"
+    assert response == b"+OK\r\n"
     assert get_keys_for_test(handler) == ["key"]
     assert get_key_value_for_test(handler, "key") == "value"
-    assert int(get_key_expiry_for_test(handler, "key")) == datetime.datetime(2023, 6, 9, 0, 0, 5).timestamp()
+    assert get_key_expiry_for_test(handler, "key") == frozen_clock.now() + 5
 
     # Check that the value is accessible before expiration
     get_command = string_commands.GetCommand()
     response = await get_command.execute(handler, ["GET", "key"])
-    assert response == "$5\r\nvalue\r\n"
+    assert response == b"$5\r\nvalue\r\n"
 
     # Move time forward to simulate expiration
-    with freeze_time("2023-06-09 00:05:01"):
-        response = await get_command.execute(handler, ["GET", "key"])
-        assert response == "$-1\r\n"
-        assert get_keys_for_test(handler) == []
+    frozen_clock.advance(5.001)
+    response = await get_command.execute(handler, ["GET", "key"])
+    assert response == b"$-1\r\n"
+    assert get_keys_for_test(handler) == []
     
     
 @pytest.mark.asyncio
 async def test_mset_command(setup_handler):
     command = string_commands.MSetCommand()
     response = await command.execute(setup_handler, ["MSET", "key1", "value1", "key2", "value2"])
-    assert response == "+OK\r\n"
+    assert response == b"+OK\r\n"
     assert get_keys_for_test(setup_handler) == ["key1", "key2"]
     assert get_key_value_for_test(setup_handler, "key1") == "value1"
     assert get_key_value_for_test(setup_handler, "key2") == "value2"
@@ -72,16 +68,23 @@ async def test_mget_command(setup_handler):
 
     command = string_commands.MGetCommand()
     response = await command.execute(setup_handler, ["MGET", "key1", "key2"])
-    assert response == "*2\r\n$6\r\nvalue1\r\n$6\r\nvalue2\r\n"
+    assert response == b"*2\r\n$6\r\nvalue1\r\n$6\r\nvalue2\r\n"
 
     response = await command.execute(setup_handler, ["MGET", "key1", "nonexistent"])
     print(response)
-    assert response == "*2\r\n$6\r\nvalue1\r\n$-1\r\n"
+    assert response == b"*2\r\n$6\r\nvalue1\r\n$-1\r\n"
 
     lpush_command = list_commands.LPushCommand()
     await lpush_command.execute(setup_handler, ["LPUSH", "list", "value1"])
     response = await command.execute(setup_handler, ["MGET", "key1", "list"])
-    assert response == "*2\r\n$6\r\nvalue1\r\n$-1\r\n"
+    assert response == b"*2\r\n$6\r\nvalue1\r\n$-1\r\n"
+
+    # RESP3 clients get a null inside the array, as well as for a missing key on its own
+    setup_handler.protocol = 3
+    response = await command.execute(setup_handler, ["MGET", "key1", "nonexistent"])
+    assert response == b"*2\r\n$6\r\nvalue1\r\n_\r\n"
+    response = await string_commands.GetCommand().execute(setup_handler, ["GET", "nonexistent"])
+    assert response == b"_\r\n"
         
 @pytest.mark.asyncio
 async def test_incr_command(setup_handler):
@@ -90,17 +93,17 @@ async def test_incr_command(setup_handler):
 
     command = string_commands.IncrCommand()
     response = await command.execute(setup_handler, ["INCR", "counter"])
-    assert response == ":11\r\n"
+    assert response == b":11\r\n"
     assert get_keys_for_test(setup_handler) == ["counter"]
     assert get_key_value_for_test(setup_handler, "counter") == "11"
 
     response = await command.execute(setup_handler, ["INCR", "nonexistent"])
-    assert response == ":1\r\n"
+    assert response == b":1\r\n"
     assert get_keys_for_test(setup_handler) == ["counter", "nonexistent"]
     assert get_key_value_for_test(setup_handler, "nonexistent") == "1"
 
     response = await command.execute(setup_handler, ["INCR", "counter"])
-    assert response == ":12\r\n"
+    assert response == b":12\r\n"
     assert get_keys_for_test(setup_handler) == ["counter", "nonexistent"]
     assert get_key_value_for_test(setup_handler, "counter") == "12"
     
@@ -118,17 +121,17 @@ async def test_incrby_command(setup_handler):
 
     command = string_commands.IncrByCommand()
     response = await command.execute(setup_handler, ["INCRBY", "counter", "5"])
-    assert response == ":15\r\n"
+    assert response == b":15\r\n"
     assert get_keys_for_test(setup_handler) == ["counter"]
     assert get_key_value_for_test(setup_handler, "counter") == "15"
 
     response = await command.execute(setup_handler, ["INCRBY", "nonexistent", "5"])
-    assert response == ":5\r\n"
+    assert response == b":5\r\n"
     assert get_keys_for_test(setup_handler) == ["counter", "nonexistent"]
     assert get_key_value_for_test(setup_handler, "nonexistent") == "5"
 
     response = await command.execute(setup_handler, ["INCRBY", "counter", "2"])
-    assert response == ":17\r\n"
+    assert response == b":17\r\n"
     assert get_keys_for_test(setup_handler) == ["counter", "nonexistent"]
     assert get_key_value_for_test(setup_handler, "counter") == "17"
     
@@ -149,17 +152,17 @@ async def test_decr_command(setup_handler):
 
     command = string_commands.DecrCommand()
     response = await command.execute(setup_handler, ["DECR", "counter"])
-    assert response == ":9\r\n"
+    assert response == b":9\r\n"
     assert get_keys_for_test(setup_handler) == ["counter"]
     assert get_key_value_for_test(setup_handler, "counter") == "9"
 
     response = await command.execute(setup_handler, ["DECR", "nonexistent"])
-    assert response == ":-1\r\n"
+    assert response == b":-1\r\n"
     assert get_keys_for_test(setup_handler) == ["counter", "nonexistent"]
     assert get_key_value_for_test(setup_handler, "nonexistent") == "-1"
 
     response = await command.execute(setup_handler, ["DECR", "counter"])
-    assert response == ":8\r\n"
+    assert response == b":8\r\n"
     assert get_keys_for_test(setup_handler) == ["counter", "nonexistent"]
     assert get_key_value_for_test(setup_handler, "counter") == "8"
 
@@ -174,15 +177,15 @@ async def test_decrby_command(setup_handler):
     
     assert get_keys_for_test(setup_handler) == ["counter"]
     assert get_key_value_for_test(setup_handler, "counter") == "5"
-    assert response == ":5\r\n"
+    assert response == b":5\r\n"
 
     response = await command.execute(setup_handler, ["DECRBY", "nonexistent", "5"])
-    assert response == ":-5\r\n"
+    assert response == b":-5\r\n"
     assert get_keys_for_test(setup_handler) == ["counter", "nonexistent"]
     assert get_key_value_for_test(setup_handler, "nonexistent") == "-5"
 
     response = await command.execute(setup_handler, ["DECRBY", "counter", "2"])
-    assert response == ":3\r\n"
+    assert response == b":3\r\n"
     assert get_keys_for_test(setup_handler) == ["counter", "nonexistent"]
     assert get_key_value_for_test(setup_handler, "counter") == "3"
     
@@ -204,13 +207,13 @@ async def test_append_command(setup_handler):
 
     command = string_commands.AppendCommand()
     response = await command.execute(setup_handler, ["APPEND", "key", " World"])
-    assert response == ":11\r\n"
+    assert response == b":11\r\n"
 
     response = await command.execute(setup_handler, ["APPEND", "nonexistent", " World"])
-    assert response == ":6\r\n"
+    assert response == b":6\r\n"
 
     response = await command.execute(setup_handler, ["APPEND", "key", "!"])
-    assert response == ":12\r\n"
+    assert response == b":12\r\n"
 
     assert get_keys_for_test(setup_handler) == ["key", "nonexistent"]
     assert get_key_value_for_test(setup_handler, "key") == "Hello World!"
@@ -223,4 +226,32 @@ async def test_append_command(setup_handler):
     assert get_keys_for_test(setup_handler) == ["key", "nonexistent", "list"]
     assert get_key_value_for_test(setup_handler, "list") == ["value1"]
     
-    
\ No newline at end of file
+    
+
+@pytest.mark.asyncio
+async def test_set_get_binary_values(setup_handler):
+    set_command = string_commands.SetCommand()
+    response = await set_command.execute(setup_handler, [b"SET", b"key", b"\xff\x00\r\nvalue"])
+    assert response == b"+OK\r\n"
+    assert get_key_value_for_test(setup_handler, b"key") == b"\xff\x00\r\nvalue"
+
+    get_command = string_commands.GetCommand()
+    response = await get_command.execute(setup_handler, [b"GET", b"key"])
+    assert response == b"$9\r\n\xff\x00\r\nvalue\r\n"
+
+    response = await get_command.execute(setup_handler, [b"GET", b"nonexistent"])
+    assert response == b"$-1\r\n"
+
+    incr_command = string_commands.IncrByCommand()
+    await set_command.execute(setup_handler, [b"SET", b"counter", b"10"])
+    response = await incr_command.execute(setup_handler, [b"INCRBY", b"counter", b"5"])
+    assert response == b":15\r\n"
+    assert get_key_value_for_test(setup_handler, b"counter") == b"15"
+
+    append_command = string_commands.AppendCommand()
+    response = await append_command.execute(setup_handler, [b"APPEND", b"key", b"\xfe"])
+    assert response == b":10\r\n"
+
+    # Options are not binary-safe: one that is not UTF-8 is just not recognised
+    response = await set_command.execute(setup_handler, [b"SET", b"key", b"value", b"\xff\xfe", b"1"])
+    assert response == b"+OK\r\n"
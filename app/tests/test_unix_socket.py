@@ -0,0 +1,26 @@
+import asyncio
+import socket
+import pytest
+from app.AsyncServer import AsyncServer
+from app.utils.resp_encoder import encode_array
+
+
+@pytest.mark.asyncio
+async def test_unix_socket_serves_commands(tmp_path):
+    path = str(tmp_path / "coolcache.sock")
+    # A socket file left behind by an earlier run must not stop the server from binding
+    stale = socket.socket(socket.AF_UNIX)
+    stale.bind(path)
+    stale.close()
+
+    server = AsyncServer(port=0, unixsocket=path)
+    unix_server = await server.start_unix()
+    try:
+        reader, writer = await asyncio.open_unix_connection(path)
+        writer.write(encode_array(["SET", "key", "value"]) + encode_array(["GET", "key"]))
+        await writer.drain()
+        assert await reader.readexactly(16) == b"+OK\r\n$5\r\nvalue\r\n"
+        writer.close()
+    finally:
+        unix_server.close()
+        await unix_server.wait_closed()
@@ -0,0 +1,62 @@
+import time
+
+
+class Clock:
+    """Unix time in seconds, read once per event loop iteration.
+
+    The server calls tick() when it starts handling a batch of requests and on
+    every cron tick, and now() returns that cached value, so checking the TTLs
+    of many keys costs no clock reads. Time is the wall clock at startup
+    advanced by the monotonic clock, which keeps it from ever going backwards
+    when the system clock is adjusted.
+    """
+
+    def __init__(self):
+        self.offset = time.time() - time.monotonic()
+        self.cached = self.read()
+
+    def read(self) -> float:
+        return self.offset + time.monotonic()
+
+    def tick(self) -> float:
+        self.cached = self.read()
+        return self.cached
+
+    def now(self) -> float:
+        return self.cached
+
+
+class FrozenClock(Clock):
+    # Stands still until a test moves it with advance()
+    def __init__(self, now: float = 1686268800.0):
+        self.offset = 0
+        self.cached = now
+
+    def read(self) -> float:
+        return self.cached
+
+    def advance(self, seconds: float) -> float:
+        self.cached += seconds
+        return self.cached
+
+
+_clock = Clock()
+
+
+def now() -> float:
+    return _clock.cached
+
+
+def now_ms() -> int:
+    return int(_clock.cached * 1000)
+
+
+def tick() -> float:
+    return _clock.tick()
+
+
+def use_clock(clock: Clock) -> Clock:
+    # Installs clock for every module and returns the one it replaced
+    global _clock
+    previous, _clock = _clock, clock
+    return previous
@@ -1,58 +1,43 @@
 import random
 import string
-from typing import List
-
-from app.utils.constants import EMPTY_ARRAY_RESPONSE, NOT_FOUND_RESPONSE, WRONG_TYPE_RESPONSE
-
-
-def generate_redis_array(string: str = "", lst: List[str] = []) -> str:
-    redis_array = []
-    if(string):
-        redis_array.append(as_bulk_string(string))
-    if(lst != None):
-        if(len(lst) == 0):
-            return EMPTY_ARRAY_RESPONSE
-        redis_array.append(f"*{len(lst)}\r\n")
-        for element in lst:
-            if element == WRONG_TYPE_RESPONSE:
-                element = None
-            redis_array.append(as_bulk_string(element))
-    return ''.join(redis_array)
-
-def as_bulk_string(payload: str) -> str:
-    if not payload or payload == NOT_FOUND_RESPONSE:
-        return NOT_FOUND_RESPONSE
-    if payload == WRONG_TYPE_RESPONSE:
-        return WRONG_TYPE_RESPONSE
-    return f"${len(payload)}\r\n{payload}\r\n"
+from typing import List, Tuple
+
+from app.utils import resp_encoder
+from app.utils.constants import NOT_FOUND_RESPONSE, WRONG_TYPE_RESPONSE
+
+
+def as_str(value: str|bytes) -> str:
+    # For command names and options; only keys and values are binary-safe, so anything else that
+    # is not UTF-8 just fails to match and gets the usual error reply
+    if isinstance(value, bytes):
+        return value.decode('utf-8', errors='replace')
+    return value
 
-def redis_bulk_string_to_string(data: str) -> str:
+def as_type_of(text: str, reference: str|bytes) -> str|bytes:
+    # Return text in the same representation (str or bytes) the client sent reference in
+    if isinstance(reference, bytes):
+        return text.encode()
+    return text
+
+def redis_bulk_string_to_string(data: bytes) -> str:
     if data == NOT_FOUND_RESPONSE:
         return NOT_FOUND_RESPONSE
     if data == WRONG_TYPE_RESPONSE:
         return WRONG_TYPE_RESPONSE
-    return data.split('\r\n')[1]
+    return as_str(data).split('\r\n')[1]
 
-def redis_array_to_list(data: str) -> List[str]:
+def redis_array_to_list(data: bytes) -> List[str]:
     if data == NOT_FOUND_RESPONSE:
         return NOT_FOUND_RESPONSE
     if data == WRONG_TYPE_RESPONSE:
         return WRONG_TYPE_RESPONSE
-    elements = data.split('\r\n')
-    print(f"Elements: {elements}")
+    elements = as_str(data).split('\r\n')
     if elements[0] == '*0':
         return []
-    print(elements[2::2])
     return elements[2::2]
 
-def encode_redis_protocol(data: List[str]) -> bytes:
-    encoded_data = []
-    encoded_data.append(f"*{len(data)}\r\n")
-    
-    for element in data:
-        encoded_data.append(f"${len(element)}\r\n{element}\r\n")
-    
-    return ''.join(encoded_data).encode()
+def encode_redis_protocol(data: List[str|bytes]) -> bytes:
+    return resp_encoder.encode_array(data)
 
 def parse_redis_protocol(data: bytes):
     try:
@@ -87,54 +72,243 @@ def parse_redis_protocol(data: bytes):
     except (IndexError, ValueError):
         return [], []  # Return empty arrays if there was an error
 
-    
+
+class ProtocolError(ValueError):
+    pass
+
+
+class RespParser:
+    """Incremental RESP request parser holding one connection's unconsumed bytes.
+
+    feed() appends newly read data and returns every complete command in the
+    buffer together with the number of bytes each command occupied. Partial
+    frames stay buffered, and a partially parsed array keeps its progress so a
+    large request arriving over many reads is only scanned once.
+
+    With inline on, a line that is not a RESP array is a command whose
+    arguments are separated by spaces, as typed into telnet. Otherwise such
+    lines are skipped: on a master link they are replies to the replica's
+    handshake.
+    """
+
+    def __init__(self, decode: bool = True, inline: bool = False):
+        self.decode = decode
+        self.inline = inline
+        self.buffer = bytearray()
+        self._elements = None  # arguments of the array currently being parsed
+        self._remaining = 0
+        self._frame_length = 0
+
+    def feed(self, data: bytes) -> Tuple[List[List[str]], List[int]]:
+        buffer = self.buffer
+        buffer += data
+        commands = []
+        lengths = []
+        end = len(buffer)
+        pos = 0
+        while pos < end:
+            if self._elements is None:
+                line_end = buffer.find(b'\r\n', pos)
+                if line_end == -1:
+                    break
+                prefix = buffer[pos]
+                if prefix == 42:  # '*'
+                    count = self._parse_length(buffer, pos, line_end)
+                    self._elements = []
+                    self._remaining = count
+                    self._frame_length = line_end + 2 - pos
+                    pos = line_end + 2
+                elif self.inline:
+                    arguments = bytes(buffer[pos:line_end]).split()
+                    if arguments:
+                        commands.append([self._decode(argument) for argument in arguments] if self.decode else arguments)
+                        lengths.append(line_end + 2 - pos)
+                    pos = line_end + 2
+                    continue
+                elif prefix == 36:  # '$' outside an array: the RDB payload sent after FULLRESYNC, no trailing CRLF
+                    length = self._parse_length(buffer, pos, line_end)
+                    if line_end + 2 + length > end:
+                        break
+                    pos = line_end + 2 + length
+                    continue
+                else:
+                    # Simple strings, errors and integers from a master link
+                    pos = line_end + 2
+                    continue
+
+            while self._remaining > 0:
+                if pos >= end or buffer[pos] != 36:
+                    if pos < end:
+                        raise ProtocolError(f"expected '$', got '{chr(buffer[pos])}'")
+                    break
+                line_end = buffer.find(b'\r\n', pos)
+                if line_end == -1:
+                    break
+                length = self._parse_length(buffer, pos, line_end)
+                start = line_end + 2
+                stop = start + length
+                if stop + 2 > end:
+                    break
+                element = bytes(buffer[start:stop])
+                self._elements.append(self._decode(element) if self.decode else element)
+                self._frame_length += stop + 2 - pos
+                self._remaining -= 1
+                pos = stop + 2
+            if self._remaining > 0:
+                break
+
+            if self._elements:
+                commands.append(self._elements)
+                lengths.append(self._frame_length)
+            self._elements = None
+            self._frame_length = 0
+        del buffer[:pos]
+        return commands, lengths
+
+    @staticmethod
+    def _decode(element: bytes) -> str:
+        try:
+            return element.decode('utf-8')
+        except UnicodeDecodeError:
+            raise ProtocolError("invalid UTF-8 in argument, which needs --bytes-mode")
+
+    @staticmethod
+    def _parse_length(buffer: bytearray, pos: int, line_end: int) -> int:
+        try:
+            length = int(buffer[pos + 1:line_end])
+        except ValueError:
+            raise ProtocolError(f"invalid length {bytes(buffer[pos + 1:line_end])!r}")
+        if length < 0:
+            raise ProtocolError(f"invalid length {length}")
+        return length
+
+
 def generate_random_string(length: int) -> str:
     return ''.join(random.choices(string.ascii_letters + string.digits, k=length))
 
 
+class PushMessage(list):
+    # RESP3 out-of-band message, kept distinct from a regular array reply
+    pass
+
+
+class IncompleteReply(Exception):
+    pass
+
+
+# Returned by _parse_reply when the data ends before the reply does
+INCOMPLETE = object()
+_AGGREGATE_TYPES = frozenset(b"*%~>|")
+_BLOB_TYPES = frozenset(b"$=!")
+
+
+def _build_aggregate(kind: int, items: List):
+    if kind == ord('%') or kind == ord('|'):
+        return dict(zip(items[::2], items[1::2]))
+    if kind == ord('~'):
+        try:
+            return set(items)
+        except TypeError:
+            return items
+    if kind == ord('>'):
+        return PushMessage(items)
+    return items
+
+def _parse_reply(data: bytes|bytearray, index: int, stack: List[list]):
+    # Iterative so that deeply nested replies cannot hit the recursion limit. Aggregates still being
+    # filled live on stack as [type, items left, items]; if the data runs out, INCOMPLETE is returned
+    # with the index of the first unconsumed element, and calling again with more data and the same
+    # stack resumes from there.
+    while True:
+        end = data.find(b"\r\n", index)
+        if end == -1:
+            return INCOMPLETE, index
+        kind = data[index]
+        line = data[index + 1:end]
+        if kind in _BLOB_TYPES:
+            length = int(line)
+            if length == -1:
+                value = "(nil)"
+            else:
+                if len(data) < end + 4 + length:
+                    return INCOMPLETE, index
+                value = data[end + 2:end + 2 + length].decode()
+                end += length + 2
+                if kind == ord('='):
+                    value = value[4:]  # drop the three-letter format and its colon, e.g. "txt:"
+                elif kind == ord('!'):
+                    value = Exception(value)
+        elif kind in _AGGREGATE_TYPES:
+            length = int(line)
+            index = end + 2
+            if length > 0:
+                stack.append([kind, length * 2 if kind == ord('%') or kind == ord('|') else length, []])
+                continue
+            if kind == ord('|'):
+                # An empty attribute is dropped in place, like one that has been filled
+                continue
+            value = None if length == -1 else _build_aggregate(kind, [])
+        elif kind == ord('+'):
+            value = line.decode()
+        elif kind == ord('-'):
+            value = Exception(line.decode())
+        elif kind == ord(':') or kind == ord('('):
+            value = int(line)
+        elif kind == ord(','):
+            value = float(line)
+        elif kind == ord('#'):
+            value = line == b"t"
+        elif kind == ord('_'):
+            value = "(nil)"
+        else:
+            raise ProtocolError(f"unknown reply type {chr(kind)!r}")
+        index = end + 2
+
+        while stack:
+            frame = stack[-1]
+            frame[2].append(value)
+            frame[1] -= 1
+            if frame[1]:
+                break
+            stack.pop()
+            if frame[0] == ord('|'):
+                # Attributes describe the reply that follows them and are dropped
+                break
+            value = _build_aggregate(frame[0], frame[2])
+        else:
+            return value, index
+
 def parse_element(data: bytes, index: int):
-    if data[index] == ord(b'+'):
-        return parse_simple_string(data, index)
-    if data[index] == ord(b'-'):
-        return parse_error(data, index)
-    if data[index] == ord(b':'):
-        return parse_integer(data, index)
-    if data[index] == ord(b'$'):
-        return parse_bulk_string(data, index)
-    if data[index] == ord(b'*'):
-        return parse_array(data, index)
-    return None, index
-
-
-def parse_error(data: bytes, index: int):
-    end = data.index(b'\r\n', index)
-    return Exception(data[index + 1:end].decode()), end + 2
-    
-def parse_integer(data: bytes, index: int):
-    end = data.index(b'\r\n', index)
-    return int(data[index + 1:end]), end + 2
-
-def parse_bulk_string(data: bytes, index: int):
-    end = data.index(b'\r\n', index)
-    length = int(data[index + 1:end])
-    if length == -1:
-        return "(nil)", end + 2
-    start = end + 2
-    end = start + length
-    return data[start:end].decode(), end + 2
-
-def parse_simple_string(data: bytes, index: int):
-    end = data.index(b'\r\n', index)
-    return data[index + 1:end].decode(), end + 2
-
-def parse_array(data: bytes, index: int):
-    end = data.index(b'\r\n', index)
-    length = int(data[index + 1:end])
-    if length == -1:
-        return None, end + 2
-    start = end + 2
-    elements = []
-    for _ in range(length):
-        element, start = parse_element(data, start)
-        elements.append(element)
-    return elements, start
\ No newline at end of file
+    value, index = _parse_reply(data, index, [])
+    if value is INCOMPLETE:
+        raise IncompleteReply("data ends before the reply is complete")
+    return value, index
+
+
+# Consumed bytes are only dropped from the reply buffer once this many pile up, so many small replies don't each copy the remainder
+READ_COMPACT_THRESHOLD = 65536
+
+
+class RespReplyParser:
+    """Client-side reader of server replies, fed with whatever the socket returns.
+
+    Partially received aggregates stay on the parser's stack between feeds, so a
+    large reply arriving in many chunks is only scanned once.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self._index = 0
+        self._stack = []
+
+    def feed(self, data: bytes) -> None:
+        self.buffer += data
+
+    def get_reply(self):
+        if self._index >= len(self.buffer):
+            return INCOMPLETE
+        value, self._index = _parse_reply(self.buffer, self._index, self._stack)
+        if value is not INCOMPLETE and (self._index == len(self.buffer) or self._index > READ_COMPACT_THRESHOLD):
+            del self.buffer[:self._index]
+            self._index = 0
+        return value
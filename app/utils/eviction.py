@@ -0,0 +1,132 @@
+import bisect
+import heapq
+from typing import TYPE_CHECKING, List, Tuple
+
+from app.utils import keyspace
+from app.utils.keyspace import ACCESS_MASK
+from app.utils.logging_utils import server_logger
+
+if TYPE_CHECKING:
+    from app.AsyncServer import AsyncServer
+    from app.utils.keyspace import Database
+
+POLICIES = ("noeviction", "allkeys-lru", "volatile-lru", "allkeys-lfu", "volatile-lfu", "allkeys-random", "volatile-random", "volatile-ttl")
+OOM_RESPONSE = b"-OOM command not allowed when used memory > 'maxmemory'.\r\n"
+# Keys sampled per eviction and best candidates kept between evictions, as in Redis
+EVICTION_SAMPLES = 5
+EVICTION_POOL_SIZE = 16
+
+
+class Evictor:
+    """Keeps the estimated dataset size under maxmemory by evicting keys before writes.
+
+    LRU and LFU are approximated the Redis way: each eviction samples a few
+    keys, merges them into a small pool of the best candidates seen so far and
+    evicts the best one, so no per-key ordering has to be maintained.
+    volatile-ttl takes the key that expires soonest from the expiry index,
+    which orders keys by expiry already. maxmemory covers every database
+    together, and every database is sampled. Samples come from random scan
+    slots, or from random expiry heap entries for the volatile policies, so
+    the keyspace is never copied and new keys are candidates at once.
+    """
+
+    def __init__(self, server: 'AsyncServer', maxmemory: int = 0, policy: str = "noeviction"):
+        self.server = server
+        self.maxmemory = maxmemory
+        self.policy = None
+        # (score, db index, key) entries sorted by score; the highest score is evicted first
+        self.pool = []
+        # Random eviction takes its keys from one database after another
+        self.next_db = 0
+        self.set_policy(policy)
+
+    def set_policy(self, policy: str) -> None:
+        if policy not in POLICIES:
+            raise ValueError(f"unknown maxmemory policy '{policy}'")
+        if policy != self.policy:
+            self.policy = policy
+            self.volatile = policy.startswith("volatile-")
+            self.pool = []
+            for db in self.server.databases:
+                db.key_meta.set_policy(policy.endswith("-lfu"))
+
+    def used_memory(self) -> int:
+        return keyspace.used_memory(self.server.databases)
+
+    def make_room(self) -> bool:
+        # False when the write has to be refused: over the limit and nothing (more) can be evicted
+        if not self.maxmemory or self.used_memory() <= self.maxmemory:
+            return True
+        evicted = 0
+        while self.used_memory() > self.maxmemory:
+            victim = self.select_victim()
+            if victim is None:
+                break
+            db, key = victim
+            keyspace.delete_key(db, key, lazy=True)
+            evicted += 1
+        if evicted:
+            self.server.stats.evicted += evicted
+            server_logger.debug("Evicted %d keys to stay under maxmemory", evicted)
+        return self.used_memory() <= self.maxmemory
+
+    def candidates(self, db: 'Database') -> dict:
+        return db.expiration if self.volatile else db.key_meta
+
+    def sample(self, db: 'Database') -> List:
+        if self.volatile:
+            return db.expiration.sample(EVICTION_SAMPLES)
+        return db.key_meta.slots.sample(EVICTION_SAMPLES)
+
+    def select_victim(self) -> Tuple['Database', object]|None:
+        if self.policy == "noeviction":
+            return None
+        if self.policy == "volatile-ttl":
+            return self.soonest_expiring()
+        databases = [db for db in self.server.databases if self.candidates(db)]
+        if not databases:
+            return None
+        if self.policy.endswith("-random"):
+            db = min(databases, key=lambda db: (db.index - self.next_db) % len(self.server.databases))
+            self.next_db = db.index + 1
+            sampled = self.sample(db)
+            # Only stale expiry heap entries were drawn
+            return db, sampled[0] if sampled else next(iter(self.candidates(db)))
+        for db in databases:
+            self.populate_pool(db)
+        while self.pool:
+            _, index, key = self.pool.pop()
+            db = self.server.databases[index]
+            if key in self.candidates(db):
+                return db, key
+        return databases[0], next(iter(self.candidates(databases[0])))
+
+    def populate_pool(self, db: 'Database') -> None:
+        key_meta = db.key_meta
+        candidates = self.candidates(db)
+        lfu = key_meta.lfu
+        now = keyspace.lru_clock()
+        for key in self.sample(db):
+            meta = key_meta.get(key)
+            if meta is None or key not in candidates:
+                continue
+            access = meta & ACCESS_MASK
+            # Higher scores are better candidates: longer idle for LRU, lower frequency for LFU
+            score = 255 - keyspace.lfu_counter(access) if lfu else (now - access) & ACCESS_MASK
+            if any(pooled == key and pooled_db == db.index for _, pooled_db, pooled in self.pool):
+                continue
+            bisect.insort(self.pool, (score, db.index, key), key=lambda entry: entry[0])
+            if len(self.pool) > EVICTION_POOL_SIZE:
+                self.pool.pop(0)
+
+    def soonest_expiring(self) -> Tuple['Database', object]|None:
+        soonest = None
+        for db in self.server.databases:
+            expiration = db.expiration
+            heap = expiration.heap
+            # Entries for keys whose TTL changed or that are gone are skipped and dropped
+            while heap and expiration.get(heap[0][1]) != heap[0][0]:
+                heapq.heappop(heap)
+            if heap and (soonest is None or heap[0][0] < soonest[0]):
+                soonest = (heap[0][0], db, heap[0][1])
+        return soonest[1:] if soonest else None
@@ -0,0 +1,123 @@
+import heapq
+import random
+import time
+from typing import TYPE_CHECKING, Any, List
+
+from app.utils import clock
+from app.utils.logging_utils import server_logger
+
+if TYPE_CHECKING:
+    from app.AsyncServer import AsyncServer
+
+# Keys popped between checks of the cycle's time budget
+KEYS_PER_LOOP = 20
+# The heap is rebuilt once stale entries outnumber live ones by this factor
+COMPACT_FACTOR = 2
+COMPACT_MIN_SIZE = 1024
+
+
+class ExpiryIndex(dict):
+    """Expiry times (unix seconds) of the keys that have a TTL, and only those.
+
+    Reads, `in`, pop and clear work as on the plain dict it replaces. Alongside
+    it a min-heap of (expires_at, key) orders the keys by expiry. Entries are
+    not removed from the heap when a key is deleted or its TTL changes;
+    pop_due skips any entry that no longer matches the dict, and the heap is
+    rebuilt when such stale entries pile up.
+    """
+
+    def __init__(self, items: Any = ()):
+        super().__init__()
+        self.heap = []
+        self.update(items)
+
+    def __setitem__(self, key, expires_at):
+        if expires_at is None:
+            # No TTL: the key is simply not in the index
+            self.pop(key, None)
+            return
+        super().__setitem__(key, expires_at)
+        heapq.heappush(self.heap, (expires_at, key))
+        if len(self.heap) > COMPACT_MIN_SIZE and len(self.heap) > COMPACT_FACTOR * len(self):
+            self.compact()
+
+    def update(self, items: Any = (), **kwargs):
+        for key, expires_at in (items.items() if hasattr(items, "items") else items):
+            self[key] = expires_at
+        for key, expires_at in kwargs.items():
+            self[key] = expires_at
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self.get(key)
+
+    def clear(self):
+        super().clear()
+        self.heap.clear()
+
+    def compact(self):
+        self.heap = [(expires_at, key) for key, expires_at in self.items()]
+        heapq.heapify(self.heap)
+
+    def sample(self, count: int) -> List:
+        # Up to count keys from random heap entries, for eviction; stale entries are passed over
+        heap = self.heap
+        if not heap:
+            return []
+        entries = (heap[random.randrange(len(heap))] for _ in range(count))
+        return [key for expires_at, key in entries if self.get(key) == expires_at]
+
+    def pop_due(self, now: float, limit: int) -> List:
+        # Removes and returns up to limit keys that expired before now, earliest first
+        due = []
+        heap = self.heap
+        while heap and len(due) < limit and heap[0][0] < now:
+            expires_at, key = heapq.heappop(heap)
+            if self.get(key) == expires_at:
+                super().__delitem__(key)
+                due.append(key)
+        return due
+
+
+class ActiveExpirer:
+    """Deletes expired keys that nobody reads, a bounded slice at a time.
+
+    Each cycle pops the keys that are due from each database's ExpiryIndex,
+    earliest first, until none are left or the cycle's time budget is spent;
+    keys that stay due are picked up by the next cycle, which starts on the
+    database this one stopped in. Keys without a TTL are never looked at, so
+    the work is proportional to the number of keys that actually expire.
+    """
+
+    def __init__(self, server: 'AsyncServer', time_budget: float = 0.025):
+        self.server = server
+        self.time_budget = time_budget
+        self.next_db = 0
+
+    def run_cycle(self, now: float = None) -> int:
+        server = self.server
+        databases, lazyfree = server.databases, server.lazyfree
+        now = clock.tick() if now is None else now
+        deadline = time.perf_counter() + self.time_budget
+        expired_total = 0
+        for step in range(len(databases)):
+            # Read from the database each time since SWAPDB exchanges the dicts
+            db = databases[(self.next_db + step) % len(databases)]
+            memory, expiration, streamstore, key_meta = db.memory, db.expiration, db.streamstore, db.key_meta
+            while expiration:
+                due = expiration.pop_due(now, KEYS_PER_LOOP)
+                for key in due:
+                    lazyfree.free(memory.pop(key, None))
+                    lazyfree.free(streamstore.pop(key, None))
+                    key_meta.forget(key)
+                expired_total += len(due)
+                if len(due) < KEYS_PER_LOOP or time.perf_counter() >= deadline:
+                    break
+            if time.perf_counter() >= deadline:
+                self.next_db = db.index
+                break
+        if expired_total:
+            server.stats.expired += expired_total
+            server_logger.debug("Active expiry removed %d keys", expired_total)
+        return expired_total
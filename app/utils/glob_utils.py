@@ -0,0 +1,87 @@
+import functools
+import re
+from typing import Callable
+
+# Redis glob syntax: * and ? wildcards, [abc], [^abc] and [a-z] classes, and \ to escape the next character
+SPECIAL = "*?[\\"
+
+
+def literal_prefix(pattern: str|bytes) -> str|bytes:
+    # The part every match must start with, up to the first wildcard
+    text = pattern.decode("latin-1") if isinstance(pattern, bytes) else pattern
+    prefix = []
+    index = 0
+    while index < len(text):
+        char = text[index]
+        if char == "\\" and index + 1 < len(text):
+            prefix.append(text[index + 1])
+            index += 2
+            continue
+        if char in SPECIAL:
+            break
+        prefix.append(char)
+        index += 1
+    prefix = "".join(prefix)
+    return prefix.encode("latin-1") if isinstance(pattern, bytes) else prefix
+
+
+def is_literal(pattern: str|bytes) -> bool:
+    text = pattern.decode("latin-1") if isinstance(pattern, bytes) else pattern
+    return not any(char in SPECIAL for char in text)
+
+
+def translate(text: str) -> str:
+    parts = []
+    index = 0
+    while index < len(text):
+        char = text[index]
+        index += 1
+        if char == "*":
+            # Runs of stars match the same as one, and collapsing them keeps the regex linear
+            while index < len(text) and text[index] == "*":
+                index += 1
+            parts.append(".*")
+        elif char == "?":
+            parts.append(".")
+        elif char == "\\" and index < len(text):
+            parts.append(re.escape(text[index]))
+            index += 1
+        elif char == "[":
+            negate = text[index:index + 1] == "^"
+            if negate:
+                index += 1
+            members = []
+            while index < len(text) and text[index] != "]":
+                if text[index] == "\\" and index + 1 < len(text):
+                    members.append(re.escape(text[index + 1]))
+                    index += 2
+                elif index + 2 < len(text) and text[index + 1] == "-" and text[index + 2] != "]":
+                    low, high = sorted((text[index], text[index + 2]))
+                    members.append(f"{re.escape(low)}-{re.escape(high)}")
+                    index += 3
+                else:
+                    members.append(re.escape(text[index]))
+                    index += 1
+            # A class left open at the end of the pattern still matches one of its characters, like Redis
+            index += 1
+            if members:
+                parts.append(f"[{'^' if negate else ''}{''.join(members)}]")
+            else:
+                parts.append("." if negate else "(?!)")
+        else:
+            parts.append(re.escape(char))
+    return "".join(parts)
+
+
+@functools.lru_cache(maxsize=256)
+def compile_glob(pattern: str|bytes) -> Callable[[str|bytes], bool]:
+    """A function telling whether a key matches pattern.
+
+    Compiled once per pattern to an anchored regex; keys of the same type as
+    the pattern are expected, so bytes patterns match bytes keys.
+    """
+    if isinstance(pattern, bytes):
+        regex = re.compile(translate(pattern.decode("latin-1")).encode("latin-1"), re.DOTALL)
+    else:
+        regex = re.compile(translate(pattern), re.DOTALL)
+    return lambda key: regex.fullmatch(key) is not None
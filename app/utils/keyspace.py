@@ -0,0 +1,346 @@
+import itertools
+import random
+from typing import TYPE_CHECKING, Any, Iterable, List, Tuple, Type
+
+from sortedcontainers import SortedList
+
+from app.utils import clock, glob_utils
+from app.utils.constants import WRONG_TYPE_RESPONSE
+from app.utils.expiry_utils import ExpiryIndex
+from app.utils.memory_utils import STREAM_TYPE, TYPE_NAMES, estimate_size, type_of
+from app.utils.scan_utils import ScanSlots
+
+if TYPE_CHECKING:
+    from app.AsyncHandler import AsyncRequestHandler
+
+# TTL and PTTL replies for a missing key and for a key without a TTL
+KEY_MISSING = -2
+NO_TTL = -1
+
+# Per-key metadata packs the key's scan slot, its estimated size, a 3-bit type and a 24-bit access field into one
+# int, as in Redis' object header. The access field is the LRU clock in seconds, or for LFU the time in minutes
+# (16 bits) and a counter (8 bits).
+ACCESS_BITS = 24
+ACCESS_MASK = (1 << ACCESS_BITS) - 1
+TYPE_BITS = 3
+TYPE_MASK = (1 << TYPE_BITS) - 1
+HEADER_BITS = ACCESS_BITS + TYPE_BITS
+SIZE_BITS = 40
+SIZE_MASK = (1 << SIZE_BITS) - 1
+SLOT_SHIFT = HEADER_BITS + SIZE_BITS
+LFU_INIT_VAL = 5
+LFU_LOG_FACTOR = 10
+# Minutes for an LFU counter to drop by one
+LFU_DECAY_TIME = 1
+
+# Functions here take a Database, or a handler standing for the database it has selected: both expose
+# memory, expiration, streamstore, stats, key_meta and lazyfree.
+
+
+class KeyspaceStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+
+class Database:
+    """One numbered keyspace: the dicts a connection works on once it has selected it.
+
+    Stats and the lazy freer are shared by every database of a server.
+    Handlers alias a database's dicts, so swap() and a lazy flush() leave
+    them on the old ones, and the affected handlers then re-select.
+    """
+
+    def __init__(self, index: int, stats: KeyspaceStats, lazyfree, keys_index: bool = False):
+        self.index = index
+        self.memory = {}
+        self.expiration = ExpiryIndex()
+        self.streamstore = {}
+        self.key_meta = KeyMetadata(index=keys_index)
+        self.stats = stats
+        self.lazyfree = lazyfree
+
+    def swap(self, other: 'Database') -> None:
+        self.memory, other.memory = other.memory, self.memory
+        self.expiration, other.expiration = other.expiration, self.expiration
+        self.streamstore, other.streamstore = other.streamstore, self.streamstore
+        self.key_meta, other.key_meta = other.key_meta, self.key_meta
+
+    def flush(self, lazy: bool = False) -> None:
+        if lazy:
+            # The database takes fresh dicts at once and the old ones go to the lazy freer untouched;
+            # handlers still alias the old ones until they are re-selected
+            memory, streamstore, expiration, key_meta = self.memory, self.streamstore, self.expiration, self.key_meta
+            self.memory, self.streamstore = {}, {}
+            self.expiration = ExpiryIndex()
+            self.key_meta = KeyMetadata(index=key_meta.index is not None)
+            self.key_meta.set_policy(key_meta.lfu)
+            for store in (memory, streamstore, expiration, expiration.heap, key_meta, key_meta.slots.blocks, key_meta.index):
+                self.lazyfree.free(store)
+            return
+        self.memory.clear()
+        self.streamstore.clear()
+        self.expiration.clear()
+        self.key_meta.clear()
+
+    def load(self, memory: dict, expiration: dict) -> None:
+        self.memory.update(memory)
+        self.expiration.update(expiration)
+        record_writes(self, list(memory))
+
+    def size(self) -> int:
+        return len(self.memory) + len(self.streamstore)
+
+
+def reselect(clients: Iterable['AsyncRequestHandler'], indexes: Iterable[int]) -> None:
+    # Clients on any of these databases re-alias the dicts it now holds
+    indexes = set(indexes)
+    for client in clients:
+        if client.db_index in indexes:
+            client.select(client.db_index)
+
+
+def used_memory(databases: Iterable[Database]) -> int:
+    return sum(db.key_meta.used_memory for db in databases)
+
+
+def lru_clock() -> int:
+    return int(clock.now()) & ACCESS_MASK
+
+
+def lfu_minutes() -> int:
+    return (int(clock.now()) // 60) & 0xFFFF
+
+
+def lfu_counter(access: int) -> int:
+    # The counter as of now: it loses one for every LFU_DECAY_TIME minutes since the key was last touched
+    elapsed = (lfu_minutes() - (access >> 8)) & 0xFFFF
+    return max(0, (access & 0xFF) - elapsed // LFU_DECAY_TIME)
+
+
+class KeyMetadata(dict):
+    """Key -> one int holding the key's scan slot, estimated size, type and access field.
+
+    Sizes are estimated when a write command has run and summed in
+    used_memory and, per type, in type_memory. The access field is read by
+    eviction; lfu says which of the two formats it holds. Every key also
+    holds a slot in slots, which SCAN walks. With index on, the keys are
+    also kept sorted, for KEYS patterns with a literal prefix.
+    """
+
+    def __init__(self, index: bool = False):
+        super().__init__()
+        self.used_memory = 0
+        self.type_memory = [0] * len(TYPE_NAMES)
+        self.lfu = False
+        self.index = SortedList() if index else None
+        self.slots = ScanSlots()
+
+    def fresh_access(self) -> int:
+        return (lfu_minutes() << 8) | LFU_INIT_VAL if self.lfu else lru_clock()
+
+    def touch(self, key) -> None:
+        meta = self.get(key)
+        if meta is None:
+            return
+        if not self.lfu:
+            self[key] = (meta >> ACCESS_BITS << ACCESS_BITS) | lru_clock()
+            return
+        counter = lfu_counter(meta & ACCESS_MASK)
+        # Logarithmic: the more accesses a key has had, the less likely another one is to count
+        if counter < 255 and random.random() < 1 / (max(0, counter - LFU_INIT_VAL) * LFU_LOG_FACTOR + 1):
+            counter += 1
+        self[key] = (meta >> ACCESS_BITS << ACCESS_BITS) | (lfu_minutes() << 8) | counter
+
+    def record_size(self, key, size: int, value_type: int = 0) -> None:
+        meta = self.get(key)
+        if meta is None:
+            access = self.fresh_access()
+            slot = self.slots.add(key)
+            if self.index is not None:
+                self.index.add(key)
+        else:
+            access = meta & ACCESS_MASK
+            slot = meta >> SLOT_SHIFT
+            self.discount(meta)
+        size = min(size, SIZE_MASK)
+        self[key] = (slot << SLOT_SHIFT) | (size << HEADER_BITS) | (value_type << ACCESS_BITS) | access
+        self.used_memory += size
+        self.type_memory[value_type] += size
+
+    def forget(self, key) -> None:
+        meta = self.pop(key, None)
+        if meta is not None:
+            self.discount(meta)
+            for moved, slot in self.slots.remove(key, meta >> SLOT_SHIFT):
+                self[moved] = (slot << SLOT_SHIFT) | (self[moved] & ((1 << SLOT_SHIFT) - 1))
+            if self.index is not None:
+                self.index.discard(key)
+
+    def discount(self, meta: int) -> None:
+        size = (meta >> HEADER_BITS) & SIZE_MASK
+        self.used_memory -= size
+        self.type_memory[(meta >> ACCESS_BITS) & TYPE_MASK] -= size
+
+    def size_of(self, key) -> int:
+        return (self.get(key, 0) >> HEADER_BITS) & SIZE_MASK
+
+    def set_policy(self, lfu: bool) -> None:
+        # The access fields of the old format mean nothing in the new one, so every key starts afresh
+        if lfu != self.lfu:
+            self.lfu = lfu
+            access = self.fresh_access()
+            for key, meta in self.items():
+                self[key] = (meta >> ACCESS_BITS << ACCESS_BITS) | access
+
+    def clear(self) -> None:
+        super().clear()
+        self.used_memory = 0
+        self.type_memory = [0] * len(TYPE_NAMES)
+        self.slots.clear()
+        if self.index is not None:
+            self.index = SortedList()
+
+
+def lookup(db: 'AsyncRequestHandler', key, value_type: Type|Tuple[Type, ...] = None) -> Any:
+    """The value stored at key, or None if there is none or it has expired.
+
+    Returns WRONG_TYPE_RESPONSE when value_type is given and the value is not
+    an instance of it. Expired keys are deleted here, and every lookup is
+    counted as a hit or a miss and updates the key's access field for
+    eviction. The common case of a key without a TTL costs one probe of
+    memory plus the metadata update; the expiration table is only consulted
+    when it is not empty.
+    """
+    value = db.memory.get(key)
+    if value is None:
+        db.stats.misses += 1
+        return None
+    now = clock.now()
+    expiration = db.expiration
+    if expiration:
+        expires_at = expiration.get(key)
+        if expires_at is not None and expires_at < now:
+            delete_key(db, key, lazy=True)
+            db.stats.expired += 1
+            db.stats.misses += 1
+            return None
+    db.stats.hits += 1
+    db.key_meta.touch(key)
+    if value_type is not None and not isinstance(value, value_type):
+        return WRONG_TYPE_RESPONSE
+    return value
+
+
+def match_keys(db: 'AsyncRequestHandler', pattern) -> List:
+    """Live keys matching a Redis glob pattern.
+
+    Expired keys are skipped but left for expiry to delete, so the keyspace
+    is not changed while it is iterated. A pattern with a literal prefix
+    walks only that range of the key index when there is one; otherwise
+    every key is tested.
+    """
+    now = clock.now()
+    expiration = db.expiration
+    if glob_utils.is_literal(pattern):
+        return [pattern] if key_exists(db, pattern) else []
+    prefix = glob_utils.literal_prefix(pattern)
+    index = db.key_meta.index
+    if prefix and index is not None:
+        candidates = itertools.takewhile(lambda key: key.startswith(prefix), index.irange(minimum=prefix))
+        candidates = [key for key in candidates if key in db.memory or key in db.streamstore]
+    else:
+        candidates = itertools.chain(db.memory, db.streamstore)
+        if prefix:
+            candidates = (key for key in candidates if key.startswith(prefix))
+    if pattern != "*" and pattern != b"*":
+        matches = glob_utils.compile_glob(pattern)
+        candidates = filter(matches, candidates)
+    if not expiration:
+        return list(candidates)
+    return [key for key in candidates if (expires_at := expiration.get(key)) is None or expires_at >= now]
+
+
+def expire_if_needed(db: 'AsyncRequestHandler', key) -> bool:
+    # Lazy expiry: every command checks a key here before using it
+    expires_at = db.expiration.get(key)
+    if expires_at is None or expires_at >= clock.now():
+        return False
+    delete_key(db, key, lazy=True)
+    db.stats.expired += 1
+    return True
+
+
+def key_exists(db: 'AsyncRequestHandler', key) -> bool:
+    expire_if_needed(db, key)
+    return key in db.memory or key in db.streamstore
+
+
+def record_writes(db: 'AsyncRequestHandler', keys: Iterable) -> None:
+    # Called after a write command with the keys it named, to keep their sizes and used_memory current
+    key_meta = db.key_meta
+    for key in keys:
+        value = db.memory.get(key)
+        if value is not None:
+            key_meta.record_size(key, estimate_size(key, value), type_of(value))
+            continue
+        value = db.streamstore.get(key)
+        if value is not None:
+            key_meta.record_size(key, estimate_size(key, value), STREAM_TYPE)
+        else:
+            key_meta.forget(key)
+
+
+def delete_key(db: 'AsyncRequestHandler', key, lazy: bool = False) -> bool:
+    # lazy only detaches the value and leaves large ones to the background freer
+    db.expiration.pop(key, None)
+    db.key_meta.forget(key)
+    value = db.memory.pop(key, None)
+    stream = db.streamstore.pop(key, None)
+    if lazy:
+        db.lazyfree.free(value)
+        db.lazyfree.free(stream)
+    return value is not None or stream is not None
+
+
+def move_key(source: 'AsyncRequestHandler', target: Database, key) -> bool:
+    # The value and its TTL change database; False when key is missing from source or already in target
+    if not key_exists(source, key) or key_exists(target, key):
+        return False
+    expires_at = source.expiration.pop(key, None)
+    source.key_meta.forget(key)
+    if key in source.memory:
+        target.memory[key] = source.memory.pop(key)
+    else:
+        target.streamstore[key] = source.streamstore.pop(key)
+    if expires_at is not None:
+        target.expiration[key] = expires_at
+    record_writes(target, [key])
+    return True
+
+
+def set_expiry(db: 'AsyncRequestHandler', key, expires_at: float) -> None:
+    # A time already in the past deletes the key straight away, as Redis does
+    if expires_at < clock.now():
+        delete_key(db, key)
+    else:
+        db.expiration[key] = expires_at
+
+
+def persist(db: 'AsyncRequestHandler', key) -> bool:
+    return db.expiration.pop(key, None) is not None
+
+
+def get_expiry(db: 'AsyncRequestHandler', key) -> float|None:
+    return db.expiration.get(key)
+
+
+def get_ttl_ms(db: 'AsyncRequestHandler', key) -> int:
+    if not key_exists(db, key):
+        return KEY_MISSING
+    expires_at = db.expiration.get(key)
+    if expires_at is None:
+        return NO_TTL
+    return max(0, round((expires_at - clock.now()) * 1000))
@@ -0,0 +1,91 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any
+
+from sortedcontainers import SortedList, SortedSet
+
+from app.utils.logging_utils import server_logger
+
+# Values with more elements than this are freed in the background
+LAZYFREE_THRESHOLD = 1024
+# Elements released per step, and the share of each loop iteration the freer may take
+LAZYFREE_CHUNK = 1000
+LAZYFREE_TIME_BUDGET = 0.002
+
+
+def free_effort(value: Any) -> int:
+    # Roughly the number of objects a value drops when freed; strings and numbers count as one
+    if isinstance(value, (str, bytes, int, float)) or value is None:
+        return 1
+    scores = getattr(value, "scores", None)
+    if isinstance(scores, dict):
+        return 2 * len(scores)
+    try:
+        return len(value)
+    except TypeError:
+        return 1
+
+
+class LazyFreer:
+    """Releases large values a chunk at a time on the event loop.
+
+    A worker thread would not help here: tearing down one container is a
+    single C call that holds the GIL until it finishes. Instead, values
+    above threshold elements are queued once they have been detached from
+    the keyspace. A background task empties them a chunk at a time, for at
+    most LAZYFREE_TIME_BUDGET per loop iteration, so the deallocation is
+    spread between client requests. Without a running loop, as in tests,
+    everything is freed inline.
+    """
+
+    def __init__(self, threshold: int = LAZYFREE_THRESHOLD):
+        self.threshold = threshold
+        self.queue = deque()
+        self.freed = 0
+        self.task = None
+
+    def free(self, value: Any) -> None:
+        if value is None or free_effort(value) <= self.threshold:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self.queue.append(value)
+        if self.task is None or self.task.done():
+            self.task = loop.create_task(self.run())
+
+    async def run(self) -> None:
+        while self.queue:
+            deadline = time.perf_counter() + LAZYFREE_TIME_BUDGET
+            try:
+                while self.queue and time.perf_counter() < deadline:
+                    self.free_chunk()
+            except Exception:
+                server_logger.exception("Lazy free failed")
+                self.queue.popleft()
+            await asyncio.sleep(0)
+
+    def free_chunk(self) -> None:
+        value = self.queue[0]
+        if isinstance(value, list):
+            del value[-LAZYFREE_CHUNK:]
+        elif isinstance(value, dict):
+            for _ in range(min(LAZYFREE_CHUNK, len(value))):
+                _, item = value.popitem()
+                # Nested containers, such as a stream's entries, get their own turn in the queue
+                if free_effort(item) > self.threshold:
+                    self.queue.append(item)
+        elif isinstance(value, (set, SortedSet, SortedList)):
+            for _ in range(min(LAZYFREE_CHUNK, len(value))):
+                value.pop()
+        elif isinstance(getattr(value, "scores", None), dict):
+            self.queue.extend((value.scores, value.data))
+            value.scores, value.data = {}, SortedSet()
+        if not free_effort(value) or not isinstance(value, (list, dict, set, SortedSet, SortedList)):
+            self.queue.popleft()
+            self.freed += 1
+
+    def pending(self) -> int:
+        return len(self.queue)
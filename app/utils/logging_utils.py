@@ -0,0 +1,16 @@
+import logging
+
+LOG_LEVELS = ("debug", "info", "warning", "error")
+LOG_FORMAT = "%(asctime)s %(process)d %(name)s %(levelname)s %(message)s"
+
+# One logger per subsystem so each can be turned up on its own, e.g.
+# logging.getLogger("coolcache.streams").setLevel(logging.DEBUG)
+server_logger = logging.getLogger("coolcache.server")
+protocol_logger = logging.getLogger("coolcache.protocol")
+replication_logger = logging.getLogger("coolcache.replication")
+streams_logger = logging.getLogger("coolcache.streams")
+persistence_logger = logging.getLogger("coolcache.persistence")
+
+
+def configure_logging(level: str = "info") -> None:
+    logging.basicConfig(level=level.upper(), format=LOG_FORMAT)
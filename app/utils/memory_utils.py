@@ -0,0 +1,77 @@
+import itertools
+import re
+from sys import getsizeof
+from typing import Any
+
+# Containers are sized from this many elements, as Redis' MEMORY USAGE does by default
+DEFAULT_SAMPLES = 5
+# Slots for the key in the keyspace dict and in the per-key metadata dict
+KEY_OVERHEAD = 2 * 3 * 8
+# A sorted set member is also held in a (score, member) tuple in the ordered index
+SORTED_SET_ENTRY_OVERHEAD = getsizeof((0.0, "")) + 2 * 8
+
+# Value types as numbered in per-key metadata; streams live in their own store, so they are never told apart by value
+TYPE_NAMES = ("string", "list", "set", "hash", "zset", "stream")
+STREAM_TYPE = TYPE_NAMES.index("stream")
+
+MEMORY_UNITS = {"": 1, "b": 1, "k": 1000, "kb": 1024, "m": 1000 ** 2, "mb": 1024 ** 2, "g": 1000 ** 3, "gb": 1024 ** 3}
+
+
+def parse_memory(text: str) -> int:
+    # Redis notation: 100mb, 1gb, 5k, or plain bytes
+    match = re.fullmatch(r"(\d+)([a-z]*)", str(text).strip().lower())
+    if not match or match.group(2) not in MEMORY_UNITS:
+        raise ValueError(f"invalid memory amount '{text}'")
+    return int(match.group(1)) * MEMORY_UNITS[match.group(2)]
+
+
+def format_memory(amount: int) -> str:
+    # As in INFO's *_human fields: 1.50M
+    for unit in ("B", "K", "M", "G"):
+        if abs(amount) < 1024 or unit == "G":
+            return f"{amount}{unit}" if unit == "B" else f"{amount:.2f}{unit}"
+        amount /= 1024
+
+
+def type_of(value: Any) -> int:
+    if isinstance(value, list):
+        return 1
+    if isinstance(value, set):
+        return 2
+    if isinstance(value, dict):
+        return 3
+    if isinstance(getattr(value, "scores", None), dict):
+        return 4
+    return 0
+
+
+def estimate_size(key, value, samples: int = DEFAULT_SAMPLES) -> int:
+    """Approximate bytes used by a key and its value.
+
+    Strings are measured exactly. Containers are measured from their first
+    samples elements scaled up to their length, so the cost does not grow with
+    the size of the value; samples=0 measures every element.
+    """
+    return KEY_OVERHEAD + getsizeof(key) + sizeof(value, samples)
+
+
+def sizeof(value: Any, samples: int = DEFAULT_SAMPLES) -> int:
+    if isinstance(value, (str, bytes, int, float)):
+        return getsizeof(value)
+    if isinstance(value, dict):
+        if not value:
+            return getsizeof(value)
+        sample = list(itertools.islice(value.items(), samples or None))
+        per_item = sum(sizeof(k, samples) + sizeof(v, samples) for k, v in sample) / len(sample)
+        return getsizeof(value) + int(per_item * len(value))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        if not value:
+            return getsizeof(value)
+        sample = list(itertools.islice(value, samples or None))
+        per_item = sum(sizeof(item, samples) for item in sample) / len(sample)
+        return getsizeof(value) + int(per_item * len(value))
+    scores = getattr(value, "scores", None)
+    if isinstance(scores, dict):
+        # Sorted set: the member to score dict plus the ordered index of (score, member) tuples
+        return sizeof(scores, samples) + len(scores) * SORTED_SET_ENTRY_OVERHEAD
+    return getsizeof(value)
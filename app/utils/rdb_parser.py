@@ -1,91 +1,261 @@
-import time
-from typing import Any, BinaryIO, Dict, Tuple
-
-
-
-def read_encoded_value(file: BinaryIO, value_type: bytes) -> Any:
-    if value_type == b"\x00":
-        # String value
-        value_length = int.from_bytes(file.read(1), byteorder="little")
-        return file.read(value_length)        
-    else:
-        # Unknown value type
-        return None
-
-def handle_database_selector(file):
-    db_number = int.from_bytes(file.read(1), byteorder="little")
-    # Skip resizedb field
-    file.read(2)
-
-def handle_key_value_pair_with_expiry_seconds(file):
-    expiry_time = int.from_bytes(file.read(4), byteorder="little")
-    value_type = file.read(1)
-    key_length = int.from_bytes(file.read(1), byteorder="little")
-    key = file.read(key_length)
-    value = read_encoded_value(file, value_type)
-    if expiry_time > 0 and expiry_time < time.time():
-        return None, None, 0
-    return key, value, expiry_time
-
-def handle_key_value_pair_with_expiry_milliseconds(file):
-    expiry_time = int.from_bytes(file.read(8), byteorder="little")
-    value_type = file.read(1)
-    key_length = int.from_bytes(file.read(1), byteorder="little")
-    key = file.read(key_length)
-    value = read_encoded_value(file, value_type)
-    if expiry_time > 0 and expiry_time < time.time() * 1000:
-        return None, None, 0
-    expiry_time = expiry_time / 1000
-    return key, value, expiry_time
-
-def handle_key_value_pair_without_expiry(file, value_type):
-    key_length = int.from_bytes(file.read(1), byteorder="little")
-    key = file.read(key_length)
-    value = read_encoded_value(file, value_type)
-    return key, value, 0
-
-field_handlers = {
-    b"\xFE": handle_database_selector,
-    b"\xFD": handle_key_value_pair_with_expiry_seconds,
-    b"\xFC": handle_key_value_pair_with_expiry_milliseconds,
-}
-
-def parse_redis_file(file_path: str) -> Tuple[Dict[str, str], Dict[str, float]]:
-    hash_map = {}
-    expiry_times = {}
+import struct
+from app.utils import clock
+from typing import Any, BinaryIO, Callable, Dict, List, Tuple
+from app.utils.logging_utils import persistence_logger
+
+# Opcodes that can appear where a key's value type would otherwise be
+OPCODE_SLOT_INFO = 0xF4
+OPCODE_IDLE = 0xF8
+OPCODE_FREQ = 0xF9
+OPCODE_AUX = 0xFA
+OPCODE_RESIZEDB = 0xFB
+OPCODE_EXPIRETIME_MS = 0xFC
+OPCODE_EXPIRETIME = 0xFD
+OPCODE_SELECTDB = 0xFE
+OPCODE_EOF = 0xFF
+
+TYPE_STRING = 0
+TYPE_LIST = 1
+TYPE_SET = 2
+TYPE_ZSET = 3
+TYPE_HASH = 4
+TYPE_ZSET_2 = 5
+TYPE_SET_INTSET = 11
+TYPE_HASH_LISTPACK = 16
+TYPE_ZSET_LISTPACK = 17
+TYPE_LIST_QUICKLIST_2 = 18
+TYPE_SET_LISTPACK = 20
+
+# Special string encodings, flagged by the top two bits of a length being 11
+ENCODING_INT8 = 0
+ENCODING_INT16 = 1
+ENCODING_INT32 = 2
+ENCODING_LZF = 3
+
+QUICKLIST_NODE_PLAIN = 1
+
+
+def read_length(file: BinaryIO) -> Tuple[int, bool]:
+    # Returns the length and whether it is really one of the special string encodings
+    first = file.read(1)[0]
+    kind = first >> 6
+    if kind == 0:
+        return first & 0x3F, False
+    if kind == 1:
+        return ((first & 0x3F) << 8) | file.read(1)[0], False
+    if kind == 3:
+        return first & 0x3F, True
+    if first == 0x80:
+        return int.from_bytes(file.read(4), "big"), False
+    if first == 0x81:
+        return int.from_bytes(file.read(8), "big"), False
+    raise ValueError(f"unknown length encoding {first:#x}")
+
+
+def lzf_decompress(data: bytes, expected_length: int) -> bytes:
+    output = bytearray()
+    index = 0
+    while index < len(data):
+        control = data[index]
+        index += 1
+        if control < 32:
+            # A run of control + 1 literal bytes
+            output += data[index:index + control + 1]
+            index += control + 1
+            continue
+        # A back reference: length and distance are packed into the control byte and the ones after it
+        length = control >> 5
+        if length == 7:
+            length += data[index]
+            index += 1
+        start = len(output) - ((control & 0x1F) << 8) - data[index] - 1
+        index += 1
+        for offset in range(length + 2):
+            output.append(output[start + offset])
+    if len(output) != expected_length:
+        raise ValueError("LZF data does not decompress to its stated length")
+    return bytes(output)
+
+
+def read_string(file: BinaryIO) -> bytes:
+    length, encoded = read_length(file)
+    if not encoded:
+        return file.read(length)
+    if length == ENCODING_INT8:
+        return str(int.from_bytes(file.read(1), "little", signed=True)).encode()
+    if length == ENCODING_INT16:
+        return str(int.from_bytes(file.read(2), "little", signed=True)).encode()
+    if length == ENCODING_INT32:
+        return str(int.from_bytes(file.read(4), "little", signed=True)).encode()
+    if length == ENCODING_LZF:
+        compressed_length, _ = read_length(file)
+        raw_length, _ = read_length(file)
+        return lzf_decompress(file.read(compressed_length), raw_length)
+    raise ValueError(f"unknown string encoding {length}")
+
+
+def read_double(file: BinaryIO) -> float:
+    # The old ZSET format stores scores as text, behind a length byte with three special values
+    length = file.read(1)[0]
+    if length == 253:
+        return float("nan")
+    if length == 254:
+        return float("inf")
+    if length == 255:
+        return float("-inf")
+    return float(file.read(length))
+
+
+def backlen_size(entry_length: int) -> int:
+    # Each listpack entry ends with its own length, for iterating backwards, in 1 to 5 bytes
+    for size, limit in enumerate((127, 16383, 2097151, 268435455), 1):
+        if entry_length <= limit:
+            return size
+    return 5
+
+
+def parse_listpack(blob: bytes) -> List[bytes]:
+    """The elements of a listpack: Redis' compact encoding of small lists, hashes, sets and sorted sets.
+
+    Integers are returned as their decimal text, as Redis would return them.
+    """
+    elements = []
+    # Skipping the total byte count and the element count
+    index = 6
+    while blob[index] != 0xFF:
+        start = index
+        first = blob[index]
+        if first < 0x80:
+            element = str(first).encode()
+            index += 1
+        elif first < 0xC0:
+            length = first & 0x3F
+            element = blob[index + 1:index + 1 + length]
+            index += 1 + length
+        elif first < 0xE0:
+            value = ((first & 0x1F) << 8) | blob[index + 1]
+            element = str(value - (1 << 13) if value >= 1 << 12 else value).encode()
+            index += 2
+        elif first < 0xF0:
+            length = ((first & 0x0F) << 8) | blob[index + 1]
+            element = blob[index + 2:index + 2 + length]
+            index += 2 + length
+        elif first == 0xF0:
+            length = int.from_bytes(blob[index + 1:index + 5], "little")
+            element = blob[index + 5:index + 5 + length]
+            index += 5 + length
+        else:
+            width = {0xF1: 2, 0xF2: 3, 0xF3: 4, 0xF4: 8}[first]
+            element = str(int.from_bytes(blob[index + 1:index + 1 + width], "little", signed=True)).encode()
+            index += 1 + width
+        elements.append(element)
+        index += backlen_size(index - start)
+    return elements
+
+
+def parse_intset(blob: bytes) -> List[bytes]:
+    width = int.from_bytes(blob[0:4], "little")
+    count = int.from_bytes(blob[4:8], "little")
+    return [str(int.from_bytes(blob[8 + i * width:8 + (i + 1) * width], "little", signed=True)).encode() for i in range(count)]
+
+
+def make_sorted_set(pairs: List[Tuple[Any, float]]) -> Any:
+    from app.commands.sorted_set_commands import CoolCacheSortedSet
+
+    sorted_set = CoolCacheSortedSet()
+    for member, score in pairs:
+        sorted_set.zadd(score, member)
+    return sorted_set
+
+
+def read_encoded_value(file: BinaryIO, value_type: int, text: Callable[[bytes], Any]) -> Any:
+    if value_type == TYPE_STRING:
+        return text(read_string(file))
+    if value_type in (TYPE_LIST, TYPE_SET, TYPE_HASH, TYPE_ZSET, TYPE_ZSET_2):
+        count, _ = read_length(file)
+        if value_type == TYPE_LIST:
+            return [text(read_string(file)) for _ in range(count)]
+        if value_type == TYPE_SET:
+            return {text(read_string(file)) for _ in range(count)}
+        if value_type == TYPE_HASH:
+            return {text(read_string(file)): text(read_string(file)) for _ in range(count)}
+        if value_type == TYPE_ZSET:
+            return make_sorted_set([(text(read_string(file)), read_double(file)) for _ in range(count)])
+        return make_sorted_set([(text(read_string(file)), struct.unpack("<d", file.read(8))[0]) for _ in range(count)])
+    if value_type == TYPE_LIST_QUICKLIST_2:
+        nodes, _ = read_length(file)
+        elements = []
+        for _ in range(nodes):
+            container, _ = read_length(file)
+            blob = read_string(file)
+            elements.extend([blob] if container == QUICKLIST_NODE_PLAIN else parse_listpack(blob))
+        return [text(element) for element in elements]
+    if value_type in (TYPE_SET_INTSET, TYPE_SET_LISTPACK):
+        blob = read_string(file)
+        return {text(element) for element in (parse_intset(blob) if value_type == TYPE_SET_INTSET else parse_listpack(blob))}
+    if value_type in (TYPE_HASH_LISTPACK, TYPE_ZSET_LISTPACK):
+        elements = parse_listpack(read_string(file))
+        pairs = zip(elements[::2], elements[1::2])
+        if value_type == TYPE_HASH_LISTPACK:
+            return {text(field): text(value) for field, value in pairs}
+        return make_sorted_set([(text(member), float(score)) for member, score in pairs])
+    raise ValueError(f"unsupported RDB value type {value_type}")
+
+
+def parse_redis_file(file_path: str, decode: bool = True) -> Dict[int, Tuple[Dict[str, Any], Dict[str, float]]]:
+    """The keys of an RDB file by database number, each as (values, expiry times in unix seconds).
+
+    Keys that have already expired are left out. A file that cannot be
+    fully parsed keeps whatever was read before the error.
+    """
+    databases = {}
+    text = (lambda raw: raw.decode()) if decode else (lambda raw: raw)
 
     try:
         with open(file_path, "rb") as file:
             magic_string = file.read(5)
             rdb_version = file.read(4)
+            if magic_string != b"REDIS":
+                raise ValueError("not an RDB file")
+            persistence_logger.debug("Loading RDB version %s from %s", rdb_version.decode(errors="replace"), file_path)
+            hash_map, expiry_times = databases.setdefault(0, ({}, {}))
+            expiry_time = None
             while True:
-                byte = file.read(1)
-                if not byte:
-                    break
-                if byte == b"\xFE":
-                    for _ in range(4):
-                        print(file.read(1))
-                    break
-
-            while True:
-                field_type = file.read(1)
-                if field_type == b"\xFF":
+                opcode = file.read(1)[0]
+                if opcode == OPCODE_EOF:
                     break
-                key, value, expiry_time = None, None, None
-
-                if field_type in field_handlers:
-                    key, value, expiry_time = field_handlers[field_type](file)
+                if opcode == OPCODE_SELECTDB:
+                    db_number, _ = read_length(file)
+                    hash_map, expiry_times = databases.setdefault(db_number, ({}, {}))
+                elif opcode == OPCODE_RESIZEDB:
+                    read_length(file)
+                    read_length(file)
+                elif opcode == OPCODE_AUX:
+                    key, value = read_string(file), read_string(file)
+                    persistence_logger.debug("RDB aux field %r: %r", key, value)
+                elif opcode == OPCODE_EXPIRETIME_MS:
+                    expiry_time = int.from_bytes(file.read(8), "little") / 1000
+                elif opcode == OPCODE_EXPIRETIME:
+                    expiry_time = int.from_bytes(file.read(4), "little")
+                elif opcode == OPCODE_IDLE:
+                    read_length(file)
+                elif opcode == OPCODE_FREQ:
+                    file.read(1)
+                elif opcode == OPCODE_SLOT_INFO:
+                    for _ in range(3):
+                        read_length(file)
                 else:
-                    key, value, expiry_time = handle_key_value_pair_without_expiry(file, field_type)
-
-                if key is not None and value is not None:
-                    hash_map[key.decode()] = value.decode()
-                if key is not None and expiry_time is not None:
-                    expiry_times[key.decode()] = expiry_time
+                    key = text(read_string(file))
+                    value = read_encoded_value(file, opcode, text)
+                    if expiry_time is None or expiry_time >= clock.now():
+                        hash_map[key] = value
+                        if expiry_time is not None:
+                            expiry_times[key] = expiry_time
+                    expiry_time = None
 
     except FileNotFoundError:
-        print(f"File not found: {file_path}")
+        persistence_logger.info("RDB file %s not found, starting empty", file_path)
     except Exception as e:
-        print(f"Error occurred while parsing the file: {str(e)}")
+        persistence_logger.error("Error occurred while parsing %s: %s", file_path, e)
 
-    return hash_map, expiry_times
\ No newline at end of file
+    return {db_number: loaded for db_number, loaded in databases.items() if loaded[0]}
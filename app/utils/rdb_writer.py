@@ -0,0 +1,93 @@
+import os
+import struct
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, BinaryIO, Iterable
+
+from app.utils import clock
+from app.utils.logging_utils import persistence_logger
+from app.utils.memory_utils import type_of
+from app.utils.rdb_parser import (OPCODE_AUX, OPCODE_EOF, OPCODE_EXPIRETIME_MS, OPCODE_RESIZEDB, OPCODE_SELECTDB,
+                                  TYPE_HASH, TYPE_LIST, TYPE_SET, TYPE_STRING, TYPE_ZSET_2)
+
+if TYPE_CHECKING:
+    from app.utils.keyspace import Database
+
+RDB_VERSION = b"REDIS0011"
+# RDB value types by the type numbers of per-key metadata
+RDB_TYPES = (TYPE_STRING, TYPE_LIST, TYPE_SET, TYPE_HASH, TYPE_ZSET_2)
+
+
+def encode_length(length: int) -> bytes:
+    if length < 1 << 6:
+        return bytes((length,))
+    if length < 1 << 14:
+        return bytes((0x40 | (length >> 8), length & 0xFF))
+    if length < 1 << 32:
+        return b"\x80" + length.to_bytes(4, "big")
+    return b"\x81" + length.to_bytes(8, "big")
+
+
+def encode_string(value: str|bytes) -> bytes:
+    raw = value.encode() if isinstance(value, str) else value
+    return encode_length(len(raw)) + raw
+
+
+def encode_value(value: Any) -> bytes:
+    # Always the plain encodings: any Redis reads them, whatever its compact encodings
+    value_type = type_of(value)
+    if value_type == 0:
+        return encode_string(value)
+    if value_type == 1 or value_type == 2:
+        return encode_length(len(value)) + b"".join(encode_string(element) for element in value)
+    if value_type == 3:
+        return encode_length(len(value)) + b"".join(encode_string(field) + encode_string(item) for field, item in value.items())
+    scores = value.scores
+    return encode_length(len(scores)) + b"".join(encode_string(member) + struct.pack("<d", score) for member, score in scores.items())
+
+
+def write_database(file: BinaryIO, db: 'Database') -> None:
+    file.write(bytes((OPCODE_SELECTDB,)) + encode_length(db.index))
+    file.write(bytes((OPCODE_RESIZEDB,)) + encode_length(len(db.memory)) + encode_length(len(db.expiration)))
+    now = clock.now()
+    for key, value in db.memory.items():
+        expires_at = db.expiration.get(key)
+        if expires_at is not None:
+            if expires_at < now:
+                continue
+            file.write(bytes((OPCODE_EXPIRETIME_MS,)) + round(expires_at * 1000).to_bytes(8, "little"))
+        file.write(bytes((RDB_TYPES[type_of(value)],)) + encode_string(key) + encode_value(value))
+
+
+def write_redis_file(file_path: str|Path, databases: Iterable['Database']) -> None:
+    """Writes every non-empty database to an RDB file that Redis and parse_redis_file can load.
+
+    The file is written next to its final path and renamed over it, so a
+    crash never leaves a half-written file behind. Streams are not written.
+    The checksum is left at zero, which readers take to mean it was not
+    computed.
+    """
+    file_path = Path(file_path)
+    fd, temp_path = tempfile.mkstemp(prefix="temp-", suffix=".rdb", dir=file_path.parent)
+    try:
+        # mkstemp makes the file private to its owner; dump files are normally readable
+        os.chmod(temp_path, 0o644)
+        with os.fdopen(fd, "wb") as file:
+            file.write(RDB_VERSION)
+            for field, value in (("redis-ver", "7.2.0"), ("redis-bits", "64"), ("ctime", str(int(clock.now())))):
+                file.write(bytes((OPCODE_AUX,)) + encode_string(field) + encode_string(value))
+            skipped_streams = 0
+            for db in databases:
+                skipped_streams += len(db.streamstore)
+                if db.memory:
+                    write_database(file, db)
+            file.write(bytes((OPCODE_EOF,)) + bytes(8))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    if skipped_streams:
+        persistence_logger.warning("Streams are not saved to RDB files; %d stream keys were left out", skipped_streams)
+    persistence_logger.info("Saved the dataset to %s", file_path)
@@ -0,0 +1,157 @@
+import math
+from typing import Any, Dict, Iterable, List
+
+CRLF = b"\r\n"
+OK = b"+OK\r\n"
+PONG = b"+PONG\r\n"
+NULL_BULK_STRING = b"$-1\r\n"
+NULL_ARRAY = b"*-1\r\n"
+EMPTY_ARRAY = b"*0\r\n"
+# RESP3 null, sent instead of the RESP2 null bulk string and null array once a client negotiates HELLO 3
+NULL = b"_\r\n"
+
+# Length prefixes and small integers cover nearly every reply, so they are built once at import time
+PREFIX_CACHE_SIZE = 1024
+_BULK_PREFIXES = [b"$%d\r\n" % i for i in range(PREFIX_CACHE_SIZE)]
+_ARRAY_PREFIXES = [b"*%d\r\n" % i for i in range(PREFIX_CACHE_SIZE)]
+_INTEGERS = [b":%d\r\n" % i for i in range(PREFIX_CACHE_SIZE)]
+
+
+def to_bytes(value: Any) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return value.encode()
+    return str(value).encode()
+
+def bulk_prefix(length: int) -> bytes:
+    if length < PREFIX_CACHE_SIZE:
+        return _BULK_PREFIXES[length]
+    return b"$%d\r\n" % length
+
+def array_prefix(length: int) -> bytes:
+    if length < PREFIX_CACHE_SIZE:
+        return _ARRAY_PREFIXES[length]
+    return b"*%d\r\n" % length
+
+def map_prefix(length: int, protocol: int = 2) -> bytes:
+    # RESP2 clients get maps as a flat array of alternating keys and values
+    if protocol == 3:
+        return b"%%%d\r\n" % length
+    return array_prefix(2 * length)
+
+def set_prefix(length: int, protocol: int = 2) -> bytes:
+    if protocol == 3:
+        return b"~%d\r\n" % length
+    return array_prefix(length)
+
+def encode_integer(value: int) -> bytes:
+    if 0 <= value < PREFIX_CACHE_SIZE:
+        return _INTEGERS[value]
+    return b":%d\r\n" % value
+
+def encode_simple_string(value: str|bytes) -> bytes:
+    return b"+" + to_bytes(value) + CRLF
+
+def encode_error(message: str) -> bytes:
+    return b"-" + to_bytes(message) + CRLF
+
+def format_double(value: float) -> bytes:
+    # Shortest round-tripping form, with integral values printed without a trailing ".0" as Redis does
+    if math.isinf(value):
+        return b"inf" if value > 0 else b"-inf"
+    if math.isnan(value):
+        return b"nan"
+    text = repr(value)
+    if text.endswith(".0"):
+        text = text[:-2]
+    return text.encode()
+
+def encode_double(value: float, protocol: int = 2) -> bytes:
+    # RESP2 has no double type, so the value is sent as a bulk string
+    if protocol == 3:
+        return b"," + format_double(value) + CRLF
+    return encode_bulk_string(format_double(value))
+
+def encode_null(protocol: int = 2) -> bytes:
+    return NULL if protocol == 3 else NULL_BULK_STRING
+
+def encode_bulk_string(value: Any) -> bytes:
+    if value is None:
+        return NULL_BULK_STRING
+    value = to_bytes(value)
+    return b"".join((bulk_prefix(len(value)), value, CRLF))
+
+def _append_bulk_string(parts: List[bytes], value: Any, protocol: int = 2) -> None:
+    if value is None:
+        parts.append(encode_null(protocol))
+        return
+    value = to_bytes(value)
+    parts.append(bulk_prefix(len(value)))
+    parts.append(value)
+    parts.append(CRLF)
+
+def encode_array(items: Iterable[Any], protocol: int = 2) -> bytes:
+    # Flat array of bulk strings; None items become nulls of the client's protocol
+    items = items if isinstance(items, (list, tuple)) else list(items)
+    parts = [array_prefix(len(items))]
+    for item in items:
+        _append_bulk_string(parts, item, protocol)
+    return b"".join(parts)
+
+def encode_map(mapping: Dict[Any, Any], protocol: int = 2) -> bytes:
+    # Keys and values are bulk strings; use encode_value for maps holding other types
+    parts = [map_prefix(len(mapping), protocol)]
+    for key, value in mapping.items():
+        _append_bulk_string(parts, key, protocol)
+        _append_bulk_string(parts, value, protocol)
+    return b"".join(parts)
+
+def encode_set(items: Iterable[Any], protocol: int = 2) -> bytes:
+    items = items if isinstance(items, (list, tuple, set, frozenset)) else list(items)
+    parts = [set_prefix(len(items), protocol)]
+    for item in items:
+        _append_bulk_string(parts, item, protocol)
+    return b"".join(parts)
+
+def encode_push(items: Iterable[Any]) -> bytes:
+    # Out-of-band message for RESP3 clients (pub/sub messages, invalidations); there is no RESP2 form
+    items = items if isinstance(items, (list, tuple)) else list(items)
+    parts = [b">%d\r\n" % len(items)]
+    for item in items:
+        _append_nested(parts, item, 3)
+    return b"".join(parts)
+
+def _append_nested(parts: List[bytes], item: Any, protocol: int = 2) -> None:
+    if isinstance(item, (list, tuple)):
+        parts.append(array_prefix(len(item)))
+        for element in item:
+            _append_nested(parts, element, protocol)
+    elif isinstance(item, dict):
+        parts.append(map_prefix(len(item), protocol))
+        for key, value in item.items():
+            _append_nested(parts, key, protocol)
+            _append_nested(parts, value, protocol)
+    elif isinstance(item, (set, frozenset)):
+        parts.append(set_prefix(len(item), protocol))
+        for element in item:
+            _append_nested(parts, element, protocol)
+    elif isinstance(item, int) and not isinstance(item, bool):
+        parts.append(encode_integer(item))
+    elif isinstance(item, float):
+        parts.append(encode_double(item, protocol))
+    elif item is None:
+        parts.append(encode_null(protocol))
+    else:
+        _append_bulk_string(parts, item, protocol)
+
+def encode_value(item: Any, protocol: int = 2) -> bytes:
+    # Lists and tuples become arrays, dicts maps, sets sets, ints integers, floats doubles and None null;
+    # everything else is a bulk string. Maps, sets and doubles fall back to their RESP2 forms.
+    parts = []
+    _append_nested(parts, item, protocol)
+    return b"".join(parts)
+
+def encode_nested_array(items: Iterable[Any]) -> bytes:
+    items = items if isinstance(items, (list, tuple)) else list(items)
+    return encode_value(items)
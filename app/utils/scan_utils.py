@@ -0,0 +1,270 @@
+import itertools
+import random
+from collections import OrderedDict
+from typing import Any, Iterable, List, Tuple
+
+from app.utils import glob_utils
+from app.utils.constants import NON_INT_ERROR, SYNTAX_ERROR
+from app.utils.encoding_utils import as_str
+
+# Slots per block of the keyspace scan table; a block that falls below a quarter full is compacted
+SLOT_BLOCK_SIZE = 1024
+# SCAN visits at most this many slots per requested key, as Redis bounds its empty bucket visits
+SCAN_VISITS_PER_COUNT = 10
+DEFAULT_COUNT = 10
+# Hashes, sets and sorted sets this small are returned whole with cursor 0, like Redis' compact encodings
+SCAN_SMALL_VALUE = 128
+# Elements held across every SCAN snapshot; the least recently used ones are dropped beyond it
+MAX_SNAPSHOT_ELEMENTS = 1 << 20
+# Values too large to snapshot are paged through live iterators instead, this many at a time
+MAX_LIVE_ITERATIONS = 16
+SNAPSHOT_STRIDE = 1 << 32
+
+INVALID_CURSOR = b"-ERR invalid cursor\r\n"
+
+
+class ScanSlots:
+    """Numbered slots for the keys of a keyspace, giving SCAN a cursor that survives resizes.
+
+    Every new key takes the next slot number, and a SCAN cursor is the
+    slot to continue from. Slots live in blocks of SLOT_BLOCK_SIZE. A
+    deleted key leaves an empty slot behind. A block that falls below a
+    quarter full has its keys moved to new slots at the end and is then
+    freed. Keys only ever move to higher slots, so a key that is present
+    for a whole iteration is always reached: either before its move or
+    again after it. The worst case is that a key is returned twice, which
+    SCAN allows.
+    """
+
+    def __init__(self):
+        self.blocks = []
+        self.live = []
+        self.next_slot = 0
+        # The numbers of the blocks not yet freed, and each one's place in that list, for sampling
+        self.occupied = []
+        self.positions = {}
+
+    def add(self, key) -> int:
+        slot = self.next_slot
+        block, offset = divmod(slot, SLOT_BLOCK_SIZE)
+        if offset == 0:
+            self.blocks.append([None] * SLOT_BLOCK_SIZE)
+            self.live.append(0)
+            self.positions[block] = len(self.occupied)
+            self.occupied.append(block)
+        self.blocks[block][offset] = key
+        self.live[block] += 1
+        self.next_slot += 1
+        return slot
+
+    def remove(self, key, slot: int) -> List[Tuple[Any, int]]:
+        # Returns the (key, new slot) pairs of any keys moved by compacting the slot's block
+        block, offset = divmod(slot, SLOT_BLOCK_SIZE)
+        keys = self.blocks[block] if block < len(self.blocks) else None
+        if keys is None or keys[offset] != key:
+            return []
+        keys[offset] = None
+        self.live[block] -= 1
+        if block == len(self.blocks) - 1 or self.live[block] >= SLOT_BLOCK_SIZE // 4:
+            return []
+        self.blocks[block] = None
+        self.live[block] = 0
+        # The last occupied block takes the freed one's place
+        last = self.occupied.pop()
+        if last != block:
+            position = self.positions[block]
+            self.occupied[position] = last
+            self.positions[last] = position
+        del self.positions[block]
+        return [(moved, self.add(moved)) for moved in keys if moved is not None]
+
+    def sample(self, count: int) -> List:
+        """Up to count keys from random slots, without walking the keyspace.
+
+        Each draw picks a block that is not freed and takes the first key at
+        or after a random offset in it. Blocks other than the newest are at
+        least a quarter full, so that key is close by. Keys are not equally
+        likely and may repeat, which approximate eviction does not mind.
+        """
+        keys = []
+        for _ in range(count):
+            block_keys = self.blocks[random.choice(self.occupied)] if self.occupied else None
+            if not block_keys:
+                break
+            start = random.randrange(SLOT_BLOCK_SIZE)
+            key = next((key for key in itertools.chain(block_keys[start:], block_keys[:start]) if key is not None), None)
+            if key is not None:
+                keys.append(key)
+        return keys
+
+    def scan(self, cursor: int, count: int) -> Tuple[int, List]:
+        # Returns the next cursor, 0 once every slot has been visited, and the keys found
+        keys = []
+        slot = cursor
+        visits = count * SCAN_VISITS_PER_COUNT
+        while slot < self.next_slot and len(keys) < count and visits > 0:
+            block, offset = divmod(slot, SLOT_BLOCK_SIZE)
+            block_keys = self.blocks[block]
+            if block_keys is None:
+                slot = (block + 1) * SLOT_BLOCK_SIZE
+                visits -= 1
+                continue
+            end = min(offset + count - len(keys), SLOT_BLOCK_SIZE, self.next_slot - block * SLOT_BLOCK_SIZE)
+            keys.extend(key for key in block_keys[offset:end] if key is not None)
+            visits -= end - offset
+            slot = block * SLOT_BLOCK_SIZE + end
+        return (0 if slot >= self.next_slot else slot), keys
+
+    def clear(self) -> None:
+        self.blocks = []
+        self.live = []
+        self.next_slot = 0
+        self.occupied = []
+        self.positions = {}
+
+
+class SnapshotCursors:
+    """Cursors over hashes, sets and sorted sets, which have no stable order to resume from.
+
+    The first call over a large value copies its elements into a list, a
+    single C-level copy. Later calls page through that list, so every
+    element present for the whole iteration is returned exactly once. A
+    cursor packs the snapshot id above the offset. Snapshots together hold
+    at most MAX_SNAPSHOT_ELEMENTS elements: the least recently used ones are
+    dropped to make room, and their cursors become invalid.
+
+    A value with more elements than that is never copied. It is paged
+    through an iterator over the value itself, which costs nothing up
+    front. If the value is resized between calls, the iterator restarts
+    from the beginning, so elements may come back twice, which SCAN
+    allows. Every element present throughout is still returned by the
+    last pass.
+    """
+
+    def __init__(self, max_elements: int = MAX_SNAPSHOT_ELEMENTS):
+        self.snapshots = OrderedDict()
+        self.live = OrderedDict()
+        self.ids = itertools.count(1)
+        self.max_elements = max_elements
+        self.elements = 0
+
+    def page(self, key, cursor: int, elements: Iterable, count: int) -> Tuple[int, List]|None:
+        # elements is only read to start a new snapshot; None means the cursor is not one of key's
+        if cursor == 0 and len(elements) > self.max_elements:
+            snapshot_id = next(self.ids)
+            self.live[snapshot_id] = (key, elements, iter(elements))
+            if len(self.live) > MAX_LIVE_ITERATIONS:
+                self.live.popitem(last=False)
+            return self.page_live(snapshot_id, elements, count)
+        if cursor == 0:
+            snapshot_id, offset = next(self.ids), 0
+            self.snapshots[snapshot_id] = (key, list(elements))
+            self.elements += len(self.snapshots[snapshot_id][1])
+            while self.elements > self.max_elements and len(self.snapshots) > 1:
+                self.drop(next(iter(self.snapshots)))
+        else:
+            snapshot_id, offset = divmod(cursor, SNAPSHOT_STRIDE)
+            if self.live.get(snapshot_id, (None,))[0] == key:
+                return self.page_live(snapshot_id, elements, count)
+            if self.snapshots.get(snapshot_id, (None,))[0] != key:
+                return None
+            self.snapshots.move_to_end(snapshot_id)
+        snapshot = self.snapshots[snapshot_id][1]
+        page = snapshot[offset:offset + count]
+        offset += count
+        if offset >= len(snapshot):
+            self.drop(snapshot_id)
+            return 0, page
+        return snapshot_id * SNAPSHOT_STRIDE + offset, page
+
+    def page_live(self, snapshot_id: int, elements: Iterable, count: int) -> Tuple[int, List]:
+        key, source, iterator = self.live[snapshot_id]
+        self.live.move_to_end(snapshot_id)
+        page = None
+        # A key that was replaced since the iteration started is iterated afresh
+        if source is elements:
+            try:
+                page = list(itertools.islice(iterator, count))
+            except RuntimeError:
+                # Resized while being iterated over
+                pass
+        if page is None:
+            iterator = iter(elements)
+            page = list(itertools.islice(iterator, count))
+            self.live[snapshot_id] = (key, elements, iterator)
+        if len(page) < count:
+            del self.live[snapshot_id]
+            return 0, page
+        return snapshot_id * SNAPSHOT_STRIDE, page
+
+    def drop(self, snapshot_id: int) -> None:
+        _, snapshot = self.snapshots.pop(snapshot_id)
+        self.elements -= len(snapshot)
+
+
+def parse_cursor(text) -> int|None:
+    try:
+        cursor = int(text)
+    except ValueError:
+        return None
+    return cursor if cursor >= 0 else None
+
+
+def parse_scan_options(options: List, allow_type: bool = False) -> Tuple[Any, int, str|None]|bytes:
+    # MATCH pattern, COUNT n and, for SCAN, TYPE name; returns (pattern, count, type) or an error reply
+    pattern, count, type_name = None, DEFAULT_COUNT, None
+    if len(options) % 2:
+        return SYNTAX_ERROR
+    for index in range(0, len(options), 2):
+        option, value = as_str(options[index]).upper(), options[index + 1]
+        if option == "MATCH":
+            pattern = value
+        elif option == "COUNT":
+            try:
+                count = int(value)
+            except ValueError:
+                return NON_INT_ERROR
+            if count < 1:
+                return SYNTAX_ERROR
+        elif option == "TYPE" and allow_type:
+            type_name = as_str(value).lower()
+        else:
+            return SYNTAX_ERROR
+    return pattern, count, type_name
+
+
+def matcher(pattern):
+    # None when every element matches, so callers can skip filtering
+    if pattern is None or pattern in ("*", b"*"):
+        return None
+    return glob_utils.compile_glob(pattern)
+
+
+def page_elements(cursors: SnapshotCursors, key, cursor: int, elements, count: int) -> Tuple[int, List]|None:
+    # Small values come back whole; larger ones are paged through a snapshot of their elements
+    if cursor == 0 and len(elements) <= max(count, SCAN_SMALL_VALUE):
+        return 0, list(elements)
+    return cursors.page(key, cursor, elements, count)
+
+
+def scan_members(handler, command: List, members) -> Tuple[int, List]|bytes:
+    """The next page of HSCAN, SSCAN or ZSCAN over members: a hash, a set or a sorted set's scores dict.
+
+    Returns the next cursor and the matching members still present, or an
+    error reply. members is None when the key does not exist.
+    """
+    cursor = parse_cursor(command[2])
+    if cursor is None:
+        return INVALID_CURSOR
+    options = parse_scan_options(command[3:])
+    if isinstance(options, bytes):
+        return options
+    pattern, count, _ = options
+    if members is None:
+        return 0, []
+    page = page_elements(handler.server.scan_cursors, command[1], cursor, members, count)
+    if page is None:
+        return INVALID_CURSOR
+    cursor, found = page
+    matches = matcher(pattern)
+    return cursor, [member for member in found if member in members and (matches is None or matches(member))]
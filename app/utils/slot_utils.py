@@ -0,0 +1,28 @@
+import binascii
+
+HASH_SLOTS = 16384
+
+
+def crc16(data: bytes) -> int:
+    # CRC16-CCITT (XMODEM), the variant Redis Cluster uses for key hash slots; crc_hqx computes it in C
+    return binascii.crc_hqx(data, 0)
+
+def key_hash_slot(key: str|bytes) -> int:
+    if isinstance(key, str):
+        key = key.encode()
+    # Only the part inside the first non-empty {...} is hashed, so related keys can share a slot
+    start = key.find(b"{")
+    if start != -1:
+        end = key.find(b"}", start + 1)
+        if end > start + 1:
+            key = key[start + 1:end]
+    return crc16(key) % HASH_SLOTS
+
+def slot_owner(slot: int, num_workers: int) -> int:
+    return slot * num_workers // HASH_SLOTS
+
+def slot_range(worker_id: int, num_workers: int) -> range:
+    # Inverse of slot_owner: the contiguous block of slots a worker is responsible for
+    start = -(-worker_id * HASH_SLOTS // num_workers)
+    end = -(-(worker_id + 1) * HASH_SLOTS // num_workers)
+    return range(start, end)
@@ -4,6 +4,9 @@ import re
 import time
 from typing import Dict, List, Tuple
 from .. import AsyncServer
+from app.utils import keyspace, resp_encoder
+from app.utils.encoding_utils import as_str
+from app.utils.logging_utils import streams_logger
 
 def validate_stream_id(stream_key: str, stream_id: str, server: AsyncServer) -> str:
         
@@ -14,7 +17,6 @@ def validate_stream_id(stream_key: str, stream_id: str, server: AsyncServer) ->
             return ""
         
         last_entry_number = int(list(server.streamstore[stream_key].keys())[-1])
-        print(f"Last entry number: {last_entry_number}")
         last_entry_sequence = int(list(server.streamstore[stream_key][last_entry_number].keys())[-1])
 
         current_entry_number = int(stream_id.split("-")[0])
@@ -78,7 +80,7 @@ async def block_read(block_time: int, command: List[str], server: AsyncServer) -
         while not found:
             for stream_key, stream_id in zip(stream_keys, stream_ids):
                 response = get_one_xread_response(stream_key, stream_id, server)
-                if response != "$-1\r\n":
+                if response != resp_encoder.NULL_BULK_STRING:
                     found = True
                     break
             await asyncio.sleep(0.05)
@@ -86,19 +88,30 @@ async def block_read(block_time: int, command: List[str], server: AsyncServer) -
 
 def _get_stream_keys_and_ids(command: List[str], server: AsyncServer) -> Tuple[List[str], List[str]]:
     stream_keys, stream_ids = None, None
+    # Options and ids are matched on the decoded arguments, while keys keep the representation they are stored under
+    text = [as_str(arg) for arg in command]
     start_index = 2
-    if command[1].lower() == "block":
+    if text[1].lower() == "block":
         start_index += 2
-    if command[len(command) - 1] == "$":
-        stream_keys = command[start_index:command.index(next(filter(lambda x: re.match(r'\$', x), command)))] # Rest of the array except last $ is stream_keys
+    if text[len(text) - 1] == "$":
+        stream_keys = command[start_index:text.index(next(filter(lambda x: re.match(r'\$', x), text)))] # Rest of the array except last $ is stream_keys
         stream_ids = [get_last_stream_id(stream_key, server) for stream_key in stream_keys]
     else:
-        stream_keys = command[start_index:command.index(next(filter(lambda x: re.match(r'\d+-\d+', x), command)))] # We have stream keys until the first stream id
-        stream_ids = [x for x in command[start_index:] if re.match(r'\d+-\d+', x)]
+        stream_keys = command[start_index:text.index(next(filter(lambda x: re.match(r'\d+-\d+', x), text)))] # We have stream keys until the first stream id
+        stream_ids = [x for x in text[start_index:] if re.match(r'\d+-\d+', x)]
     
     return stream_keys, stream_ids
 
 
+def get_xread_keys(command: List[str]) -> List[str]:
+    # Keys are the first half of the arguments after STREAMS
+    text = [as_str(arg).upper() for arg in command]
+    if "STREAMS" not in text:
+        return []
+    arguments = command[text.index("STREAMS") + 1:]
+    return arguments[:len(arguments) // 2]
+
+
 def get_last_stream_id(stream_key: str, server: AsyncServer) -> str:
     if stream_key in server.streamstore:
         streamstore = server.streamstore[stream_key]
@@ -109,13 +122,14 @@ def get_last_stream_id(stream_key: str, server: AsyncServer) -> str:
             return f"{last_entry_number}-{last_entry_sequence}"
     return ""
 
-def get_one_xread_response(stream_key: str, stream_id: str, server: AsyncServer) -> str:
+def get_one_xread_response(stream_key: str, stream_id: str, server: AsyncServer, protocol: int = 2) -> bytes:
     stream_id_parts = stream_id.split("-")
 
     entry_number = int(stream_id_parts[0])
     sequence_number = int(stream_id_parts[1])
-    none_string = "$-1\r\n"
+    none_string = resp_encoder.encode_null(protocol)
     
+    keyspace.expire_if_needed(server, stream_key)
     if stream_key not in server.streamstore:
         return none_string
     
@@ -132,24 +146,20 @@ def get_one_xread_response(stream_key: str, stream_id: str, server: AsyncServer)
     upper_outer, upper_inner = int(upper.split("-")[0]), int(upper.split("-")[1])
     
     start_index, end_index = find_outer_indices(keys, lower_outer, upper_outer)
-    print(f"Start index: {start_index}, End index: {end_index}")
+    streams_logger.debug("Outer indices: %d to %d", start_index, end_index)
     if start_index == -1 or end_index == -1 or start_index >= len(keys) or end_index < 0 or start_index > end_index:
-        print("Invalid range indices")
+        streams_logger.debug("Invalid range indices")
         return none_string
     
     streamstore_start_index = find_inner_start_index(streamstore, keys, start_index, lower_outer, lower_inner)
     streamstore_end_index = find_inner_end_index(streamstore, keys, end_index, upper_outer, upper_inner)
-    print(f"Streamstore start index: {streamstore_start_index}, Streamstore end index: {streamstore_end_index}")
+    streams_logger.debug("Inner indices: %d to %d", streamstore_start_index, streamstore_end_index)
     if streamstore_start_index == -1 or streamstore_end_index == -1:
-        print("Invalid inner indices")
+        streams_logger.debug("Invalid inner indices")
         return none_string
 
     elements = extract_elements(streamstore, keys, start_index, end_index, streamstore_start_index, streamstore_end_index)
-    ret_string = f"*2\r\n${len(stream_key)}\r\n{stream_key}\r\n*{len(elements)}\r\n"
-    for key, value in elements.items():
-        ret_string += f"*2\r\n${len(key)}\r\n{key}\r\n{server.as_array(value)}"
-    print(f"Ret string: {ret_string}")
-    return ret_string
+    return resp_encoder.encode_nested_array([stream_key, [(key, value) for key, value in elements.items()]])
 
 def find_outer_indices(keys: List[str], lower_outer: str, upper_outer: str) -> Tuple[int, int]:
     start_index = bisect.bisect_left(keys, lower_outer)
@@ -184,7 +194,6 @@ def find_inner_end_index(streamstore: Dict[str, Dict[str, str]], keys: List[str]
 
 def extract_elements(streamstore: Dict[str, List[str]], keys: List[str], start_index: int, end_index: int, streamstore_start_index: int, streamstore_end_index: int) -> Dict[str, List[str]]:
     ret_dict = {}
-    print(f"streamstore: {streamstore}, keys: {keys}, start_index: {start_index}, end_index: {end_index}, streamstore_start_index: {streamstore_start_index}, streamstore_end_index: {streamstore_end_index}")
     if start_index == end_index:
         current_key = keys[start_index]
         streamstore_keys = list(streamstore[current_key].keys())
@@ -14,9 +14,10 @@ setup(
     entry_points={
         'console_scripts': [
             'coolcache-cli = app.client.client_main:main',
+            'coolcache-benchmark = app.client.benchmark:main',
             'coolcache-server = app.main:main',
         ],
         
     },
-    python_requires='>=3.6',  # Specify the Python version compatibility
+    python_requires='>=3.10',  # X|None annotations and bisect's key= need 3.10
 )
\ No newline at end of file